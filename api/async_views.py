@@ -0,0 +1,153 @@
+"""
+Async versions of the busiest read endpoints in api.views (the profile, a
+parent's children and the dashboard statistics), routed in their place when
+ASYNC_VIEWS is set.
+
+DRF views are synchronous, so these are plain Django async views wrapped by
+`async_api_view`, which does for them what DRF would: authenticate with the
+API's classes (the cached JWT snapshot, then the session), answer 401 or
+405 in DRF's format and render with DRF's JSON renderer. Queries go through
+the async ORM; the responses match the sync views.
+"""
+from functools import wraps
+
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+
+from users.models import User, Role
+from clinic.models import Clinic
+from therapy.models import TherapistProfile, ParentProfile, Child, Assignment
+from .authentication import CachedJWTAuthentication
+from .serializers import UserSerializer, ChildSerializer
+from .views import _children
+
+_renderer = JSONRenderer()
+_jwt_authentication = CachedJWTAuthentication()
+
+
+def render(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+def _error(exc, headers=None):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return render(data, status=exc.status_code, headers=headers)
+
+
+async def authenticate(request):
+    """The request's user as DEFAULT_AUTHENTICATION_CLASSES would find it, or None"""
+    result = await _jwt_authentication.aauthenticate(request)
+    if result is not None:
+        user = result[0]
+    else:
+        user = await request.auser()
+        if not user.is_active:
+            return None
+    # Views read the role; snapshot users come with it, session users don't
+    if user.role_id is not None and not User.role.is_cached(user):
+        user.role = await Role.objects.aget(pk=user.role_id)
+    return user
+
+
+def async_api_view(view):
+    """
+    @api_view(['GET']) with IsAuthenticated for an async view: `view` runs
+    with `request.user` set and returns its response (see render()).
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _error(exceptions.MethodNotAllowed(request.method), headers={'Allow': 'GET, HEAD'})
+        challenge = {'WWW-Authenticate': _jwt_authentication.authenticate_header(request)}
+        try:
+            user = await authenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return _error(exc, headers=challenge)
+        if user is None:
+            return _error(exceptions.NotAuthenticated(), headers=challenge)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@async_api_view
+async def user_profile(request):
+    """
+    Get current user's profile information
+    """
+    return render(UserSerializer(request.user).data)
+
+
+@async_api_view
+async def parent_children(request):
+    """
+    Get children for the current parent
+    """
+    role = getattr(getattr(request.user, "role", None), "name", "").lower()
+    if role != "parent":
+        return render({'error': 'Only parents can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+
+    parent = await ParentProfile.objects.filter(parent_email=request.user.email).afirst()
+    if not parent:
+        return render({'error': 'Parent profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    children = [child async for child in _children().filter(parent=parent)]
+    return render(ChildSerializer(children, many=True).data)
+
+
+@async_api_view
+async def dashboard_stats(request):
+    """
+    Get dashboard statistics based on user role
+    """
+    user = request.user
+    role = getattr(getattr(user, "role", None), "name", "").lower()
+
+    stats = {}
+
+    if user.is_superuser:
+        stats = {
+            'total_clinics': await Clinic.objects.acount(),
+            'total_therapists': await TherapistProfile.objects.acount(),
+            'total_clients': await ParentProfile.objects.acount(),
+            'total_children': await Child.objects.acount(),
+            'total_assignments': await Assignment.objects.acount(),
+            'active_assignments': await Assignment.objects.filter(completed=False).acount(),
+        }
+    elif role == "clinic admin":
+        try:
+            clinic = await Clinic.objects.aget(clinic_admin=user)
+            stats = {
+                'clinic_name': clinic.name,
+                'therapists_count': await TherapistProfile.objects.filter(clinic=clinic).acount(),
+                'clients_count': await ParentProfile.objects.filter(clinic=clinic).acount(),
+                'children_count': await Child.objects.filter(clinic=clinic).acount(),
+            }
+        except Clinic.DoesNotExist:
+            stats = {'error': 'Clinic not found'}
+    elif role == "therapist":
+        therapist = await TherapistProfile.objects.filter(email=user.email).afirst()
+        if therapist:
+            assignments = Assignment.objects.filter(therapist=therapist)
+            stats = {
+                'therapist_name': f"{therapist.first_name} {therapist.last_name}",
+                'assigned_clients': await ParentProfile.objects.filter(assigned_therapist=therapist).acount(),
+                'total_assignments': await assignments.acount(),
+                'pending_assignments': await assignments.filter(completed=False).acount(),
+                'completed_assignments': await assignments.filter(completed=True).acount(),
+            }
+    elif role == "parent":
+        parent = await ParentProfile.objects.filter(parent_email=user.email).afirst()
+        if parent:
+            children = parent.children.all()
+            total_assignments = Assignment.objects.filter(child__in=children)
+            stats = {
+                'parent_name': f"{parent.first_name} {parent.last_name}",
+                'children_count': await children.acount(),
+                'total_assignments': await total_assignments.acount(),
+                'pending_assignments': await total_assignments.filter(completed=False).acount(),
+                'completed_assignments': await total_assignments.filter(completed=True).acount(),
+            }
+
+    return render(stats)
@@ -0,0 +1,224 @@
+"""
+JWT authentication without a user-table query per request.
+
+Tokens issued by `api.tokens.BufferedRefreshToken` carry the user's role,
+clinic id, therapist/parent profile ids and an auth version (`ver`): an HMAC
+over the password hash, active/staff/superuser flags, role and profile ids.
+
+`CachedJWTAuthentication` builds `request.user` from a snapshot of those
+fields kept in the cache for AUTH_USER_CACHE_TIMEOUT seconds. Saving a user,
+clinic or profile drops the affected snapshot in this process only, so a
+token whose `ver` doesn't match the cached snapshot is checked against a
+snapshot reloaded from the database, and rejected (password, role or access
+changed) only if that doesn't match either. Tokens issued by another process
+after a change are accepted at once; revoked ones cost that query.
+
+`aauthenticate()` is the same check for async views: a cached snapshot is
+read without leaving the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.crypto import salted_hmac
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import Role, canonicalize_email
+from clinic.models import Clinic
+from therapy.models import TherapistProfile, ParentProfile
+from neuvii_backend.metrics import record_cache_lookup
+
+User = get_user_model()
+
+SNAPSHOT_FIELDS = [
+    'id', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'is_superuser', 'password_reset_required', 'role_id', 'created_at',
+]
+
+
+def _cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def auth_version(user, snapshot):
+    """Changes whenever the password, access flags, role or profiles change"""
+    value = '|'.join(str(part) for part in (
+        user.password, user.is_active, user.is_staff, user.is_superuser, user.role_id,
+        snapshot['clinic_id'], snapshot['therapist_profile_id'], snapshot['parent_profile_id'],
+    ))
+    return salted_hmac('api.authentication.auth_version', value).hexdigest()[:16]
+
+
+def build_user_snapshot(user):
+    """
+    Cacheable dict describing `user`; one query for the role's profile
+    (none for superusers or users without a role) if `role` is already loaded.
+    """
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    snapshot.update(role_name=user.role.name if user.role_id else None,
+                    clinic_id=None, therapist_profile_id=None, parent_profile_id=None)
+
+    role = (snapshot['role_name'] or '').lower()
+    if role == 'clinic admin':
+        snapshot['clinic_id'] = Clinic.objects.filter(clinic_admin=user).values_list('id', flat=True).first()
+    elif role == 'therapist':
+        profile = TherapistProfile.objects.filter(email=user.email).values('id', 'clinic_id').first()
+        if profile:
+            snapshot['therapist_profile_id'], snapshot['clinic_id'] = profile['id'], profile['clinic_id']
+    elif role == 'parent':
+        profile = ParentProfile.objects.filter(parent_email=user.email).values('id', 'clinic_id').first()
+        if profile:
+            snapshot['parent_profile_id'], snapshot['clinic_id'] = profile['id'], profile['clinic_id']
+
+    snapshot['ver'] = auth_version(user, snapshot)
+    return snapshot
+
+
+def _store_snapshot(snapshot):
+    cache.set(_cache_key(snapshot['id']), snapshot, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+
+
+def cache_user_snapshot(user):
+    """Snapshot `user` for token claims, caching it once the transaction commits"""
+    snapshot = build_user_snapshot(user)
+    # Tokens are issued after changes such as a new password; never cache
+    # state a rollback could still undo
+    transaction.on_commit(lambda: _store_snapshot(snapshot))
+    return snapshot
+
+
+def load_user_snapshot(user_id):
+    """Snapshot `user_id` from the database and cache it; None if the user is gone"""
+    try:
+        user = User.objects.select_related('role').get(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+    snapshot = build_user_snapshot(user)
+    _store_snapshot(snapshot)
+    return snapshot
+
+
+def get_user_snapshot(user_id, ver=None):
+    """
+    Cached snapshot for `user_id`, loaded and cached on a miss; None if the
+    user is gone. With `ver`, a cached snapshot of another version is
+    reloaded once: the user may have changed in another process.
+    """
+    snapshot = cache.get(_cache_key(user_id))
+    record_cache_lookup('auth_user', snapshot is not None)
+    if snapshot is None or (ver is not None and snapshot['ver'] != ver):
+        snapshot = load_user_snapshot(user_id)
+    return snapshot
+
+
+async def aget_user_snapshot(user_id, ver=None):
+    """get_user_snapshot() for async code; only a database load runs in a thread"""
+    snapshot = await cache.aget(_cache_key(user_id))
+    record_cache_lookup('auth_user', snapshot is not None)
+    if snapshot is None or (ver is not None and snapshot['ver'] != ver):
+        snapshot = await sync_to_async(load_user_snapshot)(user_id)
+    return snapshot
+
+
+def token_claims(snapshot):
+    return {
+        'role': snapshot['role_name'],
+        'clinic_id': snapshot['clinic_id'],
+        'therapist_profile_id': snapshot['therapist_profile_id'],
+        'parent_profile_id': snapshot['parent_profile_id'],
+        'ver': snapshot['ver'],
+    }
+
+
+def _read_only_save(*args, **kwargs):
+    raise RuntimeError('request.user is a cached snapshot; load the User from the database to modify it')
+
+
+def user_from_snapshot(snapshot):
+    """An unsaved-looking User built without touching the database"""
+    user = User(**{field: snapshot[field] for field in SNAPSHOT_FIELDS})
+    user._state.adding = False
+    user._state.db = 'default'
+    if snapshot['role_id']:
+        user.role = Role(id=snapshot['role_id'], name=snapshot['role_name'])
+    user.clinic_id = snapshot['clinic_id']
+    user.therapist_profile_id = snapshot['therapist_profile_id']
+    user.parent_profile_id = snapshot['parent_profile_id']
+    user.save = _read_only_save
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if validated_token.get('ver') is None:
+            # Token issued before claims were added
+            return super().get_user(validated_token)
+        snapshot = get_user_snapshot(self._user_id(validated_token), ver=validated_token['ver'])
+        return self._snapshot_user(validated_token, snapshot)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views; returns (user, token) or None"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if validated_token.get('ver') is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+        else:
+            snapshot = await aget_user_snapshot(self._user_id(validated_token), ver=validated_token['ver'])
+            user = self._snapshot_user(validated_token, snapshot)
+        return user, validated_token
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+
+    def _snapshot_user(self, validated_token, snapshot):
+        if snapshot is None:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+        if not snapshot['is_active']:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+        if snapshot['ver'] != validated_token['ver']:
+            raise exceptions.AuthenticationFailed('Token is no longer valid', code='token_not_valid')
+        return user_from_snapshot(snapshot)
+
+
+def invalidate_user_snapshot(user_id):
+    if user_id:
+        cache.delete(_cache_key(user_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Clinic)
+def invalidate_clinic_admin(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.clinic_admin_id)
+
+
+@receiver([post_save, post_delete], sender=TherapistProfile)
+@receiver([post_save, post_delete], sender=ParentProfile)
+def invalidate_profile_user(sender, instance, **kwargs):
+    email = instance.email if sender is TherapistProfile else instance.parent_email
+    if email:
+        # Users are matched on the canonical email; the exact one covers
+        # accounts left without it by a canonical collision
+        match = Q(email=email)
+        canonical = canonicalize_email(email)
+        if canonical:
+            match |= Q(email_canonical=canonical)
+        for user_id in User.objects.filter(match).values_list('id', flat=True):
+            invalidate_user_snapshot(user_id)
@@ -0,0 +1,331 @@
+"""
+Benchmark harness for the REST API and the therapy AJAX endpoints.
+
+Builds a fixture dataset at a configurable scale, replays every route in
+`api/urls.py`, `therapy/urls.py` and `reports/urls.py` as each of the four
+roles and records latency, query count and response size. Reports are plain JSON so they can
+be stored as a baseline and compared on later runs.
+"""
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+
+from users.models import User
+from clinic.models import Clinic
+from therapy.models import TherapistProfile, ParentProfile, Child, Assignment
+from api.tokens import BufferedRefreshToken
+from therapy.synthetic import SyntheticDataGenerator, SYNTHETIC_DOMAIN, SYNTHETIC_CLINIC_PREFIX
+from reports.models import RenderJob
+
+BENCHMARK_PASSWORD = 'benchmark-pass-123'
+
+ROLES = ['super admin', 'clinic admin', 'therapist', 'parent']
+
+# URL prefixes the app URLconfs are mounted under in neuvii_backend/urls.py
+ROUTE_MODULES = [
+    ('/api/', 'api.urls'),
+    ('/therapy/', 'therapy.urls'),
+    ('/api/reports/', 'reports.urls'),
+]
+
+
+class BenchmarkFixtures:
+    """Handles to the objects each role-scoped request is made against"""
+
+    def __init__(self):
+        self.users = {}
+        self.clinic = None
+        self.therapist = None
+        self.parent = None
+        self.child = None
+        self.assignment = None
+        self.speech_area = None
+        self.long_term_goal = None
+        self.short_term_goal = None
+        self.task = None
+
+
+def build_fixtures(clinics=2, therapists=3, clients=5, assignments=10):
+    """
+    Create a dataset of `clinics` x `therapists` x `clients` x `assignments`.
+
+    Uses the synthetic data generator with exact (uniform) counts so that
+    two runs at the same scale issue comparable requests.
+    """
+    fixtures = BenchmarkFixtures()
+    generator = SyntheticDataGenerator(
+        clinics=clinics,
+        therapists_per_clinic=therapists,
+        clients_per_therapist=clients,
+        assignments_per_child=assignments,
+        speech_areas=2, long_term_goals=2, short_term_goals=2, tasks_per_goal=3,
+        realistic=False,
+        password=BENCHMARK_PASSWORD,
+    )
+    generator.run()
+
+    User.objects.bulk_create([User(
+        email=f'superadmin@{SYNTHETIC_DOMAIN}',
+        first_name='Super',
+        last_name='Admin',
+        role=generator.roles['super admin'],
+        password=generator.password_hash,
+        is_staff=True,
+        is_superuser=True,
+        password_reset_required=False,
+    )])
+
+    fixtures.clinic = Clinic.objects.filter(name__startswith=SYNTHETIC_CLINIC_PREFIX).order_by('id').first()
+    fixtures.therapist = TherapistProfile.objects.filter(clinic=fixtures.clinic).order_by('id').first()
+    fixtures.parent = ParentProfile.objects.filter(assigned_therapist=fixtures.therapist).order_by('id').first()
+    fixtures.child = Child.objects.filter(parent=fixtures.parent).order_by('id').first()
+    fixtures.assignment = Assignment.objects.filter(child=fixtures.child).order_by('id').first()
+    fixtures.task = fixtures.assignment.task
+    fixtures.short_term_goal = fixtures.task.short_term_goal
+    fixtures.long_term_goal = fixtures.short_term_goal.long_term_goal
+    fixtures.speech_area = fixtures.long_term_goal.speech_area
+
+    fixtures.users = {
+        'super admin': User.objects.get(email=f'superadmin@{SYNTHETIC_DOMAIN}'),
+        'clinic admin': fixtures.clinic.clinic_admin,
+        'therapist': User.objects.get(email=fixtures.therapist.email),
+        'parent': User.objects.get(email=fixtures.parent.parent_email),
+    }
+    return fixtures
+
+
+def _render_job(fixtures, user):
+    job, _ = RenderJob.objects.get_or_create(
+        kind='child', subject_id=fixtures.child.pk, format='html', requested_by=user,
+        defaults={'weeks': 12, 'window': 4},
+    )
+    return job
+
+
+# Per-route request overrides. Routes not listed here are sent as a plain
+# GET; detail routes get their `pk` from `DETAIL_OBJECTS`.
+DETAIL_OBJECTS = {
+    'api_user_detail': lambda fx, user: user,
+    'api_clinic_detail': lambda fx, user: fx.clinic,
+    'api_therapist_detail': lambda fx, user: fx.therapist,
+    'api_client_detail': lambda fx, user: fx.parent,
+    'api_child_detail': lambda fx, user: fx.child,
+    'api_speech_area_detail': lambda fx, user: fx.speech_area,
+    'api_long_term_goal_detail': lambda fx, user: fx.long_term_goal,
+    'api_short_term_goal_detail': lambda fx, user: fx.short_term_goal,
+    'api_task_detail': lambda fx, user: fx.task,
+    'api_assignment_detail': lambda fx, user: fx.assignment,
+    'api_assignment_events': lambda fx, user: fx.assignment,
+    'api_child_report': lambda fx, user: fx.child,
+    'api_therapist_report': lambda fx, user: fx.therapist,
+    'api_clinic_report': lambda fx, user: fx.clinic,
+    'api_report_render_detail': _render_job,
+    'api_report_render_download': _render_job,
+}
+
+REQUEST_SPECS = {
+    'api_login': {
+        'method': 'post',
+        'data': lambda fx, user: {'email': user.email, 'password': BENCHMARK_PASSWORD},
+    },
+    'api_logout': {
+        'method': 'post',
+        'data': lambda fx, user: {'refresh': str(BufferedRefreshToken.for_user(user))},
+    },
+    'api_token_refresh': {
+        'method': 'post',
+        'data': lambda fx, user: {'refresh': str(BufferedRefreshToken.for_user(user))},
+    },
+    'api_change_password': {
+        'method': 'post',
+        'data': lambda fx, user: {
+            'old_password': BENCHMARK_PASSWORD,
+            'new_password': BENCHMARK_PASSWORD,
+            'confirm_password': BENCHMARK_PASSWORD,
+        },
+    },
+    'api_assign_tasks': {
+        'method': 'post',
+        'data': lambda fx, user: {'parent_id': fx.parent.id, 'selected_tasks': [fx.task.id]},
+    },
+    'api_report_renders': {
+        'method': 'post',
+        'data': lambda fx, user: {'kind': 'child', 'subject_id': fx.child.id, 'format': 'html'},
+    },
+    'assign_task_wizard': {
+        'query': lambda fx, user: {'parent_id': fx.parent.id},
+    },
+    'get_long_term_goals': {
+        'query': lambda fx, user: {'speech_area_id': fx.speech_area.id},
+    },
+    'get_short_term_goals': {
+        'query': lambda fx, user: {'long_term_goal_id': fx.long_term_goal.id},
+    },
+    'get_tasks': {
+        'query': lambda fx, user: {'short_term_goal_id': fx.short_term_goal.id},
+    },
+    'assign_tasks': {
+        'method': 'post',
+        'data': lambda fx, user: {'parent_id': fx.parent.id, 'selected_tasks': [fx.task.id]},
+    },
+    'create_speech_area': {
+        'method': 'post',
+        'format': 'form',
+        'data': lambda fx, user: {'name': 'Benchmark New Area'},
+    },
+    'create_long_term_goal': {
+        'method': 'post',
+        'format': 'form',
+        'data': lambda fx, user: {'title': 'Benchmark goal', 'speech_area_id': fx.speech_area.id},
+    },
+    'create_short_term_goal': {
+        'method': 'post',
+        'format': 'form',
+        'data': lambda fx, user: {'title': 'Benchmark goal', 'long_term_goal_id': fx.long_term_goal.id},
+    },
+    'create_task': {
+        'method': 'post',
+        'format': 'form',
+        'data': lambda fx, user: {
+            'title': 'Benchmark task', 'difficulty': 'beginner',
+            'short_term_goal_id': fx.short_term_goal.id,
+        },
+    },
+}
+
+
+def iter_routes():
+    """Yield (name, route) for every named URL pattern in the benchmarked URLconfs"""
+    from importlib import import_module
+
+    for prefix, module_name in ROUTE_MODULES:
+        for pattern in import_module(module_name).urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield pattern.name, prefix + str(pattern.pattern)
+
+
+def build_request(name, route, fixtures, user):
+    """Return (method, path, data, content_type) for a single route"""
+    spec = REQUEST_SPECS.get(name, {})
+    path = route
+    if '<int:pk>' in path:
+        path = path.replace('<int:pk>', str(DETAIL_OBJECTS[name](fixtures, user).pk))
+
+    method = spec.get('method', 'get')
+    if method == 'get':
+        query = spec['query'](fixtures, user) if 'query' in spec else {}
+        return method, path, query, None
+
+    data = spec['data'](fixtures, user) if 'data' in spec else {}
+    if spec.get('format') == 'form':
+        return method, path, data, None
+    return method, path, json.dumps(data), 'application/json'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(client, method, path, data, content_type, repeat):
+    """Send one request `repeat` times, rolling back any writes after each run"""
+    timings = []
+    queries = 0
+    status_code = None
+    size = 0
+
+    for _ in range(repeat):
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    kwargs = {'content_type': content_type} if content_type else {}
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path, data, **kwargs)
+                    timings.append((time.perf_counter() - start) * 1000)
+                raise _Rollback
+        except _Rollback:
+            pass
+        queries = len(ctx.captured_queries)
+        status_code = response.status_code
+        size = len(response.content)
+
+    timings.sort()
+    return {
+        'status': status_code,
+        'queries': queries,
+        'bytes': size,
+        'latency_ms_p50': round(statistics.median(timings), 3),
+        'latency_ms_p95': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def run_benchmark(fixtures, repeat=5, roles=None, routes=None):
+    """Replay every route as every role and return the result mapping"""
+    results = {}
+    for role in roles or ROLES:
+        user = fixtures.users[role]
+        client = Client(
+            raise_request_exception=False,
+            HTTP_AUTHORIZATION=f'Bearer {BufferedRefreshToken.for_user(user).access_token}',
+        )
+        client.force_login(user)
+
+        for name, route in iter_routes():
+            if routes and name not in routes:
+                continue
+            method, path, data, content_type = build_request(name, route, fixtures, user)
+            # One unmeasured warm-up request fills URL resolver and template caches
+            measure(client, method, path, data, content_type, 1)
+            results[f'{role}:{name}'] = dict(
+                measure(client, method, path, data, content_type, repeat),
+                method=method.upper(),
+                path=path,
+            )
+    return results
+
+
+def build_report(results, scale, repeat):
+    return {
+        'meta': {
+            'scale': scale,
+            'repeat': repeat,
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'results': results,
+    }
+
+
+def compare_reports(report, baseline, tolerance=0.10, latency_tolerance=None, latency_floor_ms=2.0):
+    """
+    Compare a report against a stored baseline and return regression messages.
+
+    Query counts must not grow at all, response size may grow by `tolerance`
+    and latency is only checked when `latency_tolerance` is given, since it
+    depends on the machine the baseline was recorded on.
+    """
+    regressions = []
+    for key, current in report['results'].items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous:
+            continue
+        if current['status'] != previous['status']:
+            regressions.append(f"{key}: status {previous['status']} -> {current['status']}")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{key}: queries {previous['queries']} -> {current['queries']}")
+        if current['bytes'] > previous['bytes'] * (1 + tolerance):
+            regressions.append(f"{key}: bytes {previous['bytes']} -> {current['bytes']}")
+        if latency_tolerance is not None:
+            limit = max(previous['latency_ms_p50'] * (1 + latency_tolerance),
+                        previous['latency_ms_p50'] + latency_floor_ms)
+            if current['latency_ms_p50'] > limit:
+                regressions.append(
+                    f"{key}: p50 latency {previous['latency_ms_p50']}ms -> {current['latency_ms_p50']}ms"
+                )
+    return regressions
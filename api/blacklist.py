@@ -0,0 +1,149 @@
+"""
+Fast refresh-token blacklist checks.
+
+simplejwt answers "is this refresh token blacklisted?" with a join against
+the blacklist tables on every refresh. `BlacklistIndex` keeps a per-process
+Bloom filter of blacklisted JTIs instead:
+
+* a JTI the filter has never seen is not blacklisted, provided the filter
+  caught up with the table within JWT_BLACKLIST_SYNC_SECONDS; catching up
+  re-reads the rows blacklisted since the last sync, less
+  JWT_BLACKLIST_SYNC_OVERLAP_SECONDS, since ids and timestamps are taken
+  before commit and rows can become visible out of order;
+* a token issued within that overlap is confirmed against the database
+  even on a miss, as its blacklist row may not be visible to a sync yet;
+* tokens blacklisted by this process are added immediately and marked in
+  the cache, so a shared cache makes them visible to other workers at once;
+* a filter hit is confirmed against the database, so false positives only
+  cost the query the check used to make anyway.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from neuvii_backend.metrics import record_cache_lookup
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def _marker_key(jti):
+    return f'jwt:blacklisted:{jti}'
+
+
+class BlacklistIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        # Rows read within the overlap window, so re-reading them on the next
+        # sync doesn't count them twice: {row id: blacklisted_at}
+        self._recent = {}
+        self._since = None
+        self._synced_at = 0.0
+
+    @staticmethod
+    def _overlap():
+        return timedelta(seconds=getattr(settings, 'JWT_BLACKLIST_SYNC_OVERLAP_SECONDS', 60))
+
+    def _remember(self, rows, now):
+        for row_id, jti, blacklisted_at in rows:
+            if row_id not in self._recent:
+                self._filter.add(jti)
+            self._recent[row_id] = blacklisted_at
+        cutoff = now - self._overlap()
+        self._recent = {row_id: at for row_id, at in self._recent.items() if at >= cutoff}
+        self._since = now
+
+    def _rebuild(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        now = aware_utcnow()
+        rows = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            .values_list('id', 'token__jti', 'blacklisted_at')
+        )
+        capacity = max(getattr(settings, 'JWT_BLACKLIST_FILTER_CAPACITY', 100_000), len(rows) * 2)
+        self._filter = BloomFilter(capacity)
+        self._recent = {}
+        self._remember(rows, now)
+
+    def _sync(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        if self._filter is None:
+            self._rebuild()
+        else:
+            now = aware_utcnow()
+            self._remember(
+                BlacklistedToken.objects.filter(blacklisted_at__gte=self._since - self._overlap())
+                .values_list('id', 'token__jti', 'blacklisted_at'),
+                now,
+            )
+            if self._filter.count > self._filter.capacity:
+                self._rebuild()
+        self._synced_at = time.monotonic()
+
+    def is_blacklisted(self, jti, issued_at=None):
+        """`issued_at` (the token's iat) lets recently issued tokens skip the filter on a miss"""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        if connection.in_atomic_block:
+            # The filter may only learn committed rows
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+        max_age = getattr(settings, 'JWT_BLACKLIST_SYNC_SECONDS', 2)
+        with self._lock:
+            if self._filter is None or time.monotonic() - self._synced_at > max_age:
+                self._sync()
+            in_filter = jti in self._filter
+        recent = issued_at is not None and issued_at >= aware_utcnow() - self._overlap()
+        # A hit here means the filter answered without the blacklist tables
+        record_cache_lookup('jwt_blacklist_filter', not (in_filter or recent))
+        if in_filter or recent:
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        return cache.get(_marker_key(jti)) is not None
+
+    def add(self, jti, expires_at):
+        """Record a blacklisted token once the blacklist row is committed"""
+        def remember():
+            timeout = max(int((expires_at - aware_utcnow()).total_seconds()), 1)
+            cache.set(_marker_key(jti), True, timeout)
+            with self._lock:
+                if self._filter is not None:
+                    self._filter.add(jti)
+
+        transaction.on_commit(remember)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+
+blacklist_index = BlacklistIndex()
@@ -0,0 +1,201 @@
+"""
+Slow-client concurrency benchmark: one worker process serving many mobile
+connections, WSGI on a thread pool versus ASGI on an event loop.
+
+`clients` simulated clients each send `requests` GETs one after another,
+cycling through the read endpoints that have async versions, and read each
+response slowly (`drain_seconds`, a phone on a poor network). The requests
+go straight into Django's handlers, with no sockets in between:
+
+- `run_wsgi()`: the WSGIHandler on `threads` threads, like a threaded
+  Gunicorn worker. A thread stays busy until its client has read the
+  response, so other clients queue for it.
+- `run_asgi()`: the ASGIHandler on one event loop, like a Uvicorn worker.
+  A client reading slowly only holds a coroutine.
+
+Which views answer depends on ASYNC_VIEWS when the URLconfs are imported,
+so `benchmark_concurrency` runs each mode in its own process.
+"""
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+
+from .benchmark import build_request, iter_routes
+from .tokens import BufferedRefreshToken
+
+# The endpoints with async versions (api.async_views, therapy.async_views)
+ROUTES = [
+    'api_user_profile', 'api_parent_children', 'api_dashboard_stats',
+    'get_speech_areas', 'get_long_term_goals', 'get_short_term_goals', 'get_tasks',
+]
+
+
+def build_plan(fixtures, role='parent', routes=None):
+    """(path, query string) per route and the headers that sign `role` in by JWT and session"""
+    user = fixtures.users[role]
+    wanted = routes or ROUTES
+    plan = []
+    for name, route in iter_routes():
+        if name in wanted:
+            method, path, query, _ = build_request(name, route, fixtures, user)
+            plan.append((path, urlencode(query)))
+
+    # The catalog lookups are session views, the API ones take the token
+    client = Client()
+    client.force_login(user)
+    headers = {
+        'Authorization': f'Bearer {BufferedRefreshToken.for_user(user).access_token}',
+        'Cookie': f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}',
+    }
+    return plan, headers
+
+
+class _Tracker:
+    """Latencies, statuses and the peak requests in flight and threads alive"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.peak_threads = threading.active_count()
+        self.latencies = []
+        self.errors = 0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+
+    def finished(self, status, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(seconds)
+            self.errors += status != 200
+
+    def result(self, mode, elapsed, **extra):
+        latencies = sorted(self.latencies)
+        return {
+            'mode': mode,
+            'requests': len(latencies),
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_sec': round(len(latencies) / elapsed, 1),
+            'latency_ms_p50': round(statistics.median(latencies) * 1000, 1),
+            'latency_ms_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            'peak_in_flight': self.peak_in_flight,
+            'peak_threads': self.peak_threads,
+            **extra,
+        }
+
+
+def _environ(path, query, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    environ.update({f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()})
+    return environ
+
+
+def run_wsgi(plan, headers, clients=200, requests=5, threads=8, drain_seconds=0.25):
+    handler = WSGIHandler()
+    tracker = _Tracker()
+    pool = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+    served = threading.Semaphore(0)
+
+    def serve(index, number, sent_at):
+        path, query = plan[(index + number) % len(plan)]
+        tracker.started()
+        statuses = []
+        try:
+            body = handler(_environ(path, query, headers), lambda status, *args: statuses.append(status))
+            try:
+                for _ in body:
+                    # The thread writes to a client that reads slowly
+                    time.sleep(drain_seconds)
+            finally:
+                body.close()
+        finally:
+            tracker.finished(int(statuses[0].split()[0]) if statuses else 500, time.perf_counter() - sent_at)
+            # The client sends its next request once it has read this one;
+            # until a thread is free it waits in the queue
+            if number + 1 < requests:
+                pool.submit(serve, index, number + 1, time.perf_counter())
+            served.release()
+
+    start = time.perf_counter()
+    for index in range(clients):
+        pool.submit(serve, index, 0, start)
+    for _ in range(clients * requests):
+        served.acquire()
+    pool.shutdown()
+    return tracker.result('wsgi', time.perf_counter() - start, threads=threads)
+
+
+async def _asgi_request(application, tracker, path, query, headers, drain_seconds):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+    }
+    disconnected = asyncio.Event()
+    received = False
+    status = None
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body' and message.get('body'):
+            # The client reads slowly; only this coroutine waits
+            await asyncio.sleep(drain_seconds)
+
+    start = time.perf_counter()
+    tracker.started()
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    tracker.finished(status, time.perf_counter() - start)
+
+
+def run_asgi(plan, headers, clients=200, requests=5, drain_seconds=0.25):
+    application = ASGIHandler()
+    tracker = _Tracker()
+
+    async def client(index):
+        for number in range(requests):
+            path, query = plan[(index + number) % len(plan)]
+            await _asgi_request(application, tracker, path, query, headers, drain_seconds)
+
+    async def main():
+        await asyncio.gather(*(client(index) for index in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return tracker.result('asgi', time.perf_counter() - start)
@@ -1,8 +1,17 @@
 import django_filters
-from therapy.models import Assignment, Task, ParentProfile, TherapistProfile
+from therapy.models import Assignment, Task, ParentProfile, TherapistProfile, SpeechArea
+from therapy.search import matching_documents, search_scope
 from clinic.models import Clinic
 
 
+def search_filter(kind, queryset, value, request):
+    """`queryset` narrowed to the `kind` documents matching `value` that the requester may find"""
+    scope = search_scope(request.user) if request is not None else None
+    if request is not None and scope is None:
+        return queryset.none()
+    return queryset.filter(id__in=matching_documents(kind, value, scope=scope))
+
+
 class AssignmentFilter(django_filters.FilterSet):
     """Filter assignments by various criteria"""
     completed = django_filters.BooleanFilter()
@@ -10,7 +19,8 @@ class AssignmentFilter(django_filters.FilterSet):
     child_id = django_filters.NumberFilter(field_name='child__id')
     parent_id = django_filters.NumberFilter(field_name='child__parent__id')
     difficulty = django_filters.CharFilter(field_name='task__difficulty')
-    speech_area = django_filters.CharFilter(field_name='task__short_term_goal__long_term_goal__speech_area__name', lookup_expr='icontains')
+    speech_area = django_filters.CharFilter(method='filter_by_speech_area')
+    speech_area_id = django_filters.NumberFilter(field_name='task__speech_area_id')
     assigned_date_from = django_filters.DateFilter(field_name='assigned_date', lookup_expr='gte')
     assigned_date_to = django_filters.DateFilter(field_name='assigned_date', lookup_expr='lte')
     due_date_from = django_filters.DateFilter(field_name='due_date', lookup_expr='gte')
@@ -18,21 +28,30 @@ class AssignmentFilter(django_filters.FilterSet):
 
     class Meta:
         model = Assignment
-        fields = ['completed', 'therapist_id', 'child_id', 'parent_id', 'difficulty', 'speech_area']
+        fields = ['completed', 'therapist_id', 'child_id', 'parent_id', 'difficulty', 'speech_area', 'speech_area_id']
+
+    def filter_by_speech_area(self, queryset, name, value):
+        # Resolve the (few) matching areas first so assignments are filtered
+        # on the task's denormalized speech_area_id
+        areas = SpeechArea.all_objects.filter(name__icontains=value).values('id')
+        return queryset.filter(task__speech_area_id__in=areas)
 
 
 class TaskFilter(django_filters.FilterSet):
     """Filter tasks by various criteria"""
     difficulty = django_filters.CharFilter()
-    speech_area_id = django_filters.NumberFilter(field_name='short_term_goal__long_term_goal__speech_area__id')
-    long_term_goal_id = django_filters.NumberFilter(field_name='short_term_goal__long_term_goal__id')
-    short_term_goal_id = django_filters.NumberFilter(field_name='short_term_goal__id')
-    title = django_filters.CharFilter(lookup_expr='icontains')
+    speech_area_id = django_filters.NumberFilter(field_name='speech_area_id')
+    long_term_goal_id = django_filters.NumberFilter(field_name='long_term_goal_id')
+    short_term_goal_id = django_filters.NumberFilter(field_name='short_term_goal_id')
+    title = django_filters.CharFilter(method='filter_by_title')
 
     class Meta:
         model = Task
         fields = ['difficulty', 'speech_area_id', 'long_term_goal_id', 'short_term_goal_id', 'title']
 
+    def filter_by_title(self, queryset, name, value):
+        return search_filter('task', queryset, value, self.request)
+
 
 class ParentProfileFilter(django_filters.FilterSet):
     """Filter parent profiles by various criteria"""
@@ -48,10 +67,7 @@ class ParentProfileFilter(django_filters.FilterSet):
         fields = ['clinic_id', 'therapist_id', 'fscd_approval', 'age_min', 'age_max']
 
     def filter_by_name(self, queryset, name, value):
-        return queryset.filter(
-            models.Q(first_name__icontains=value) | 
-            models.Q(last_name__icontains=value)
-        )
+        return search_filter('client', queryset, value, self.request)
 
 
 class TherapistProfileFilter(django_filters.FilterSet):
@@ -64,7 +80,4 @@ class TherapistProfileFilter(django_filters.FilterSet):
         fields = ['clinic_id']
 
     def filter_by_name(self, queryset, name, value):
-        return queryset.filter(
-            models.Q(first_name__icontains=value) | 
-            models.Q(last_name__icontains=value)
-        )
\ No newline at end of file
+        return search_filter('therapist', queryset, value, self.request)
\ No newline at end of file
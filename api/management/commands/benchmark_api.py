@@ -0,0 +1,109 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmark import (
+    ROLES, build_fixtures, run_benchmark, build_report, compare_reports
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, query count and response size of every API/therapy route for every role'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinics', type=int, default=2, help='Number of clinics to create')
+        parser.add_argument('--therapists', type=int, default=3, help='Therapists per clinic')
+        parser.add_argument('--clients', type=int, default=5, help='Clients per therapist')
+        parser.add_argument('--assignments', type=int, default=10, help='Assignments per client')
+        parser.add_argument('--repeat', type=int, default=5, help='Measured requests per route')
+        parser.add_argument('--role', action='append', choices=ROLES, help='Only benchmark these roles')
+        parser.add_argument('--route', action='append', help='Only benchmark these URL names')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmarks', 'api_baseline.json'),
+            help='Baseline report to compare against'
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed response size growth (ratio)')
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=None,
+            help='Allowed p50 latency growth (ratio); latency is not checked unless set'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run')
+
+    def handle(self, *args, **options):
+        scale = {
+            'clinics': options['clinics'],
+            'therapists': options['therapists'],
+            'clients': options['clients'],
+            'assignments': options['assignments'],
+        }
+
+        # Run against a throwaway test database so fixtures never touch real data
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            self.stdout.write(
+                'Building fixtures: {clinics} clinics x {therapists} therapists x '
+                '{clients} clients x {assignments} assignments...'.format(**scale)
+            )
+            fixtures = build_fixtures(**scale)
+            results = run_benchmark(
+                fixtures,
+                repeat=options['repeat'],
+                roles=options['role'],
+                routes=options['route'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = build_report(results, scale, options['repeat'])
+
+        for key, result in sorted(results.items()):
+            self.stdout.write(
+                f"{key:55} {result['status']:>4} {result['queries']:>4}q "
+                f"{result['bytes']:>8}B {result['latency_ms_p50']:>9.2f}ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(baseline_path) or '.', exist_ok=True)
+            with open(baseline_path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(f'No baseline at {baseline_path}; skipping regression check')
+            return
+
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        if baseline.get('meta', {}).get('scale') != scale:
+            self.stdout.write(self.style.WARNING('Baseline was recorded at a different scale'))
+
+        regressions = compare_reports(
+            report, baseline,
+            tolerance=options['tolerance'],
+            latency_tolerance=options['latency_tolerance'],
+        )
+        if regressions:
+            for message in regressions:
+                self.stderr.write(message)
+            raise CommandError(f'{len(regressions)} performance regression(s) against {baseline_path}')
+
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmark import ROLES, build_fixtures
+from api.concurrency import build_plan, run_asgi, run_wsgi
+
+MODES = ['wsgi', 'asgi']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare how one worker serves many slow clients on the read endpoints with async versions: '
+        'WSGI on a thread pool against ASGI with the async views'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help='Run one mode in this process (default: both, each in its own)')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=5, help='Requests each client sends, one after another')
+        parser.add_argument('--threads', type=int, default=8, help='Threads of the WSGI worker')
+        parser.add_argument('--drain-ms', type=int, default=250, help='Time each client takes to read a response')
+        parser.add_argument('--role', choices=ROLES, default='parent', help='Role the clients sign in as')
+        parser.add_argument('--route', action='append', help='Only request these URL names')
+        parser.add_argument('--clinics', type=int, default=1, help='Number of clinics to create')
+        parser.add_argument('--therapists', type=int, default=2, help='Therapists per clinic')
+        parser.add_argument('--assignments', type=int, default=10, help='Assignments per client')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError('--clients, --requests and --threads must be positive')
+        if options['mode']:
+            result = self.run_mode(options)
+            results = [result]
+        else:
+            results = [self.run_subprocess(mode, options) for mode in MODES]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(
+            f"{options['clients']} clients x {options['requests']} requests, "
+            f"{options['drain_ms']}ms to read each response"
+        )
+        for result in results:
+            label = f"{result['mode']} ({result['threads']} threads)" if 'threads' in result else result['mode']
+            self.stdout.write(
+                f"{label:18} {result['requests_per_sec']:>8.1f} req/s  "
+                f"p50 {result['latency_ms_p50']:>8.1f}ms  p95 {result['latency_ms_p95']:>8.1f}ms  "
+                f"{result['peak_in_flight']:>4} in flight  {result['peak_threads']:>4} threads  "
+                f"{result['errors']} errors"
+            )
+
+    def run_mode(self, options):
+        if (options['mode'] == 'asgi') != settings.ASYNC_VIEWS:
+            raise CommandError(f"--mode {options['mode']} needs ASYNC_VIEWS={int(options['mode'] == 'asgi')}")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            fixtures = build_fixtures(
+                clinics=options['clinics'], therapists=options['therapists'],
+                clients=1, assignments=options['assignments'],
+            )
+            plan, headers = build_plan(fixtures, options['role'], options['route'])
+            if not plan:
+                raise CommandError('No routes to request')
+            drain_seconds = options['drain_ms'] / 1000
+            if options['mode'] == 'wsgi':
+                return run_wsgi(
+                    plan, headers, options['clients'], options['requests'], options['threads'], drain_seconds
+                )
+            return run_asgi(plan, headers, options['clients'], options['requests'], drain_seconds)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_subprocess(self, mode, options):
+        """Run `mode` in a fresh process, with ASYNC_VIEWS set to match, and return its result"""
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_concurrency',
+            '--mode', mode, '--json',
+            '--clients', str(options['clients']), '--requests', str(options['requests']),
+            '--threads', str(options['threads']), '--drain-ms', str(options['drain_ms']),
+            '--role', options['role'], '--clinics', str(options['clinics']),
+            '--therapists', str(options['therapists']), '--assignments', str(options['assignments']),
+        ]
+        for route in options['route'] or []:
+            command += ['--route', route]
+        env = dict(os.environ, ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            self.stderr.write(completed.stderr)
+            raise CommandError(f'The {mode} run failed')
+        return json.loads(completed.stdout.strip().splitlines()[-1])[0]
@@ -0,0 +1,100 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, check_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment, CaptureQueriesContext
+
+from api.benchmark import BENCHMARK_PASSWORD
+from api.tokens import outstanding_tokens
+from users.models import User, Role
+
+
+class Command(BaseCommand):
+    help = 'Measure sequential logins/sec through /api/auth/login/ (one worker) and queries per login'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Distinct users to log in as')
+        parser.add_argument('--logins', type=int, default=200, help='Measured login requests')
+        parser.add_argument(
+            '--iterations', type=int,
+            help='PBKDF2 iterations for this run (defaults to PASSWORD_HASH_ITERATIONS)'
+        )
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['logins'] < 1:
+            raise CommandError('--users and --logins must be positive')
+        if options['iterations']:
+            settings.PASSWORD_HASH_ITERATIONS = options['iterations']
+        # Measure the login path itself, not the login throttles
+        settings.THROTTLE_RATES = {}
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            result = self.run(options['users'], options['logins'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{result['logins']} logins in {result['elapsed_s']:.2f}s: "
+            f"{result['logins_per_sec']:.1f} logins/sec, "
+            f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms, "
+            f"{result['queries_per_login']:.1f} queries/login "
+            f"(password hash {result['hash_ms']:.1f}ms, {result['failures']} failures)"
+        )
+
+    def run(self, user_count, logins):
+        role, _ = Role.objects.get_or_create(name='therapist')
+        encoded = make_password(BENCHMARK_PASSWORD)
+        User.objects.bulk_create([
+            User(
+                email=f'login-bench-{i}@benchmark.local', email_canonical=f'login-bench-{i}@benchmark.local',
+                first_name='Login', last_name=str(i),
+                role=role, is_staff=True, password=encoded, password_reset_required=False,
+            )
+            for i in range(user_count)
+        ])
+
+        start = time.perf_counter()
+        check_password(BENCHMARK_PASSWORD, encoded)
+        hash_ms = (time.perf_counter() - start) * 1000
+
+        client = Client(raise_request_exception=False)
+        timings = []
+        queries = 0
+        failures = 0
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            for i in range(logins):
+                before = len(ctx.captured_queries)
+                t0 = time.perf_counter()
+                response = client.post(
+                    '/api/auth/login/',
+                    {'email': f'login-bench-{i % user_count}@benchmark.local', 'password': BENCHMARK_PASSWORD},
+                    content_type='application/json',
+                )
+                timings.append((time.perf_counter() - t0) * 1000)
+                queries += len(ctx.captured_queries) - before
+                failures += response.status_code != 200
+            elapsed = time.perf_counter() - started
+        outstanding_tokens.flush()
+
+        timings.sort()
+        return {
+            'logins': logins,
+            'elapsed_s': elapsed,
+            'logins_per_sec': logins / elapsed,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            'queries_per_login': queries / logins,
+            'hash_ms': hash_ms,
+            'failures': failures,
+        }
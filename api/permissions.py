@@ -47,6 +47,21 @@ class IsClinicAdminOrReadOnly(permissions.BasePermission):
         return role == "clinic admin"
 
 
+class IsSuperAdmin(permissions.BasePermission):
+    """
+    Superusers and users with the super admin role (catalog-wide changes)
+    """
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+
+        if request.user.is_superuser:
+            return True
+
+        role = getattr(getattr(request.user, "role", None), "name", "").lower()
+        return role == "super admin"
+
+
 class IsParentOrReadOnly(permissions.BasePermission):
     """
     Custom permission for parent-specific actions
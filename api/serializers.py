@@ -1,11 +1,17 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from users.models import User, Role
 from clinic.models import Clinic
 from therapy.models import (
-    TherapistProfile, ParentProfile, Child, Assignment,
+    TherapistProfile, ParentProfile, Child, Assignment, AssignmentEvent,
     SpeechArea, LongTermGoal, ShortTermGoal, Task
 )
+from therapy.duplicates import find_existing
+from .authentication import get_user_snapshot
+from .tokens import BufferedRefreshToken
 
 
 # Authentication Serializers
@@ -30,6 +36,38 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that checks the user against the cached auth snapshot
+    instead of loading the user row, rejects refresh tokens issued before a
+    password/role change, and writes blacklist/outstanding rows through
+    BufferedRefreshToken.
+    """
+    token_class = BufferedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        snapshot = get_user_snapshot(refresh.payload.get(api_settings.USER_ID_CLAIM), ver=refresh.payload.get('ver'))
+        if snapshot is None or not snapshot['is_active']:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        if 'ver' in refresh.payload and refresh['ver'] != snapshot['ver']:
+            raise AuthenticationFailed('Token is no longer valid', 'token_not_valid')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
+
+
 class UserSerializer(serializers.ModelSerializer):
     role_name = serializers.CharField(source='role.name', read_only=True)
     full_name = serializers.CharField(source='get_full_name', read_only=True)
@@ -74,6 +112,9 @@ class TherapistProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_added']
 
     def get_assigned_clients_count(self, obj):
+        # Views annotate the count to avoid one COUNT query per row
+        if hasattr(obj, 'assigned_clients_total'):
+            return obj.assigned_clients_total
         return obj.assigned_clients.count()
 
 
@@ -111,7 +152,31 @@ class ParentProfileSerializer(serializers.ModelSerializer):
 
 
 # Speech Therapy Structure Serializers
-class SpeechAreaSerializer(serializers.ModelSerializer):
+class CatalogTitleMixin:
+    """
+    Rejects a title that normalizes like another child's of the same parent
+    (the model's unique title_key constraint) with a 400 instead of an
+    IntegrityError.
+    """
+    parent_field = None
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        model = self.Meta.model
+        source = model.title_source
+        title = attrs.get(source, getattr(self.instance, source, None))
+        parent = {}
+        if self.parent_field:
+            parent[self.parent_field] = attrs.get(self.parent_field, getattr(self.instance, self.parent_field, None))
+        existing = find_existing(model, title, **parent)
+        if existing is not None and (self.instance is None or existing.pk != self.instance.pk):
+            raise serializers.ValidationError(
+                {source: f'"{getattr(existing, source)}" already exists here (id {existing.pk}).'}
+            )
+        return attrs
+
+
+class SpeechAreaSerializer(CatalogTitleMixin, serializers.ModelSerializer):
     long_term_goals_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -119,10 +184,13 @@ class SpeechAreaSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'is_active', 'long_term_goals_count']
 
     def get_long_term_goals_count(self, obj):
+        if hasattr(obj, 'long_term_goals_total'):
+            return obj.long_term_goals_total
         return obj.long_term_goals.count()
 
 
-class LongTermGoalSerializer(serializers.ModelSerializer):
+class LongTermGoalSerializer(CatalogTitleMixin, serializers.ModelSerializer):
+    parent_field = 'speech_area'
     speech_area_name = serializers.CharField(source='speech_area.name', read_only=True)
     short_term_goals_count = serializers.SerializerMethodField()
 
@@ -131,10 +199,13 @@ class LongTermGoalSerializer(serializers.ModelSerializer):
         fields = ['id', 'speech_area', 'speech_area_name', 'title', 'description', 'is_active', 'short_term_goals_count']
 
     def get_short_term_goals_count(self, obj):
+        if hasattr(obj, 'short_term_goals_total'):
+            return obj.short_term_goals_total
         return obj.short_term_goals.count()
 
 
-class ShortTermGoalSerializer(serializers.ModelSerializer):
+class ShortTermGoalSerializer(CatalogTitleMixin, serializers.ModelSerializer):
+    parent_field = 'long_term_goal'
     long_term_goal_title = serializers.CharField(source='long_term_goal.title', read_only=True)
     speech_area_name = serializers.CharField(source='long_term_goal.speech_area.name', read_only=True)
     tasks_count = serializers.SerializerMethodField()
@@ -147,23 +218,28 @@ class ShortTermGoalSerializer(serializers.ModelSerializer):
         ]
 
     def get_tasks_count(self, obj):
+        if hasattr(obj, 'tasks_total'):
+            return obj.tasks_total
         return obj.tasks.count()
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(CatalogTitleMixin, serializers.ModelSerializer):
+    parent_field = 'short_term_goal'
     short_term_goal_title = serializers.CharField(source='short_term_goal.title', read_only=True)
-    long_term_goal_title = serializers.CharField(source='short_term_goal.long_term_goal.title', read_only=True)
-    speech_area_name = serializers.CharField(source='short_term_goal.long_term_goal.speech_area.name', read_only=True)
+    long_term_goal_title = serializers.CharField(source='long_term_goal.title', read_only=True)
+    speech_area_name = serializers.CharField(source='speech_area.name', read_only=True)
     assignments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
         fields = [
-            'id', 'short_term_goal', 'short_term_goal_title', 'long_term_goal_title',
-            'speech_area_name', 'title', 'description', 'difficulty', 'is_active', 'assignments_count'
+            'id', 'short_term_goal', 'short_term_goal_title', 'long_term_goal', 'long_term_goal_title',
+            'speech_area', 'speech_area_name', 'title', 'description', 'difficulty', 'is_active', 'assignments_count'
         ]
 
     def get_assignments_count(self, obj):
+        if hasattr(obj, 'assignments_total'):
+            return obj.assignments_total
         return obj.assignments.count()
 
 
@@ -173,17 +249,31 @@ class AssignmentSerializer(serializers.ModelSerializer):
     therapist_name = serializers.CharField(source='therapist.get_full_name', read_only=True)
     task_title = serializers.CharField(source='task.title', read_only=True)
     task_difficulty = serializers.CharField(source='task.difficulty', read_only=True)
-    speech_area_name = serializers.CharField(source='task.short_term_goal.long_term_goal.speech_area.name', read_only=True)
+    speech_area_id = serializers.IntegerField(source='task.speech_area_id', read_only=True)
+    speech_area_name = serializers.CharField(source='task.speech_area.name', read_only=True)
 
     class Meta:
         model = Assignment
         fields = [
             'id', 'child', 'child_name', 'parent_name', 'therapist', 'therapist_name',
-            'task', 'task_title', 'task_difficulty', 'speech_area_name',
+            'task', 'task_title', 'task_difficulty', 'speech_area_id', 'speech_area_name',
             'assigned_date', 'due_date', 'completed', 'notes'
         ]
         read_only_fields = ['id', 'assigned_date']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The task may have been deactivated since it was assigned
+        if isinstance(self.instance, Assignment):
+            self.fields['task'].queryset = Task.all_objects.active_or(self.instance.task_id)
+
+
+class AssignmentEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AssignmentEvent
+        fields = ['id', 'kind', 'created_at', 'assignment_id', 'child_id', 'therapist_id', 'task_id']
+        read_only_fields = fields
+
 
 # Task Assignment Serializers
 class TaskAssignmentSerializer(serializers.Serializer):
@@ -224,7 +314,7 @@ class PasswordChangeSerializer(serializers.Serializer):
         return attrs
 
     def validate_old_password(self, value):
-        user = self.context['request'].user
+        user = self.context.get('user') or self.context['request'].user
         if not user.check_password(value):
             raise serializers.ValidationError("Old password is incorrect.")
         return value
\ No newline at end of file
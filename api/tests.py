@@ -0,0 +1,114 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from users.models import User
+from . import async_views
+from .benchmark import build_fixtures
+from .blacklist import blacklist_index
+from .tokens import BufferedRefreshToken
+
+
+async def anonymous():
+    return AnonymousUser()
+
+
+class AsyncViewTests(TestCase):
+    """api.async_views answer as the sync views they replace under ASYNC_VIEWS"""
+    views = [
+        ('api_user_profile', async_views.user_profile),
+        ('api_parent_children', async_views.parent_children),
+        ('api_dashboard_stats', async_views.dashboard_stats),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        # User snapshots are cached by id, and ids repeat between test cases
+        cache.clear()
+        cls.fixtures = build_fixtures(1, 1, 2, 2)
+        cls.tokens = {
+            role: str(BufferedRefreshToken.for_user(user).access_token) for role, user in cls.fixtures.users.items()
+        }
+
+    def call(self, view, name, method='get', role=None):
+        headers = {'Authorization': f'Bearer {self.tokens[role]}'} if role else {}
+        request = getattr(AsyncRequestFactory(), method)(reverse(name), headers=headers)
+        # Set by AuthenticationMiddleware; without a token the view falls back to the session
+        request.auser = anonymous
+        return async_to_sync(view)(request)
+
+    def test_responses_match_the_sync_views_for_every_role(self):
+        for name, view in self.views:
+            for role, token in self.tokens.items():
+                with self.subTest(view=name, role=role):
+                    expected = self.client.get(reverse(name), HTTP_AUTHORIZATION=f'Bearer {token}')
+                    response = self.call(view, name, role=role)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_anonymous_requests_are_refused(self):
+        for name, view in self.views:
+            with self.subTest(view=name):
+                expected = self.client.get(reverse(name))
+                response = self.call(view, name)
+                self.assertEqual((response.status_code, expected.status_code), (401, 401))
+                self.assertEqual(response['WWW-Authenticate'], expected['WWW-Authenticate'])
+
+    def test_only_get_is_allowed(self):
+        expected = self.client.post(reverse('api_user_profile'), HTTP_AUTHORIZATION=f"Bearer {self.tokens['parent']}")
+        response = self.call(async_views.user_profile, 'api_user_profile', method='post', role='parent')
+        self.assertEqual((response.status_code, expected.status_code), (405, 405))
+        self.assertEqual(json.loads(response.content), expected.json())
+
+
+class AuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_index.reset()
+
+    def test_malformed_login_bodies_fail_validation(self):
+        for body in ([{'email': 'a@example.com'}], {'email': ['a@example.com'], 'password': 'x'}):
+            with self.subTest(body=body):
+                response = self.client.post(reverse('api_login'), body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_refresh_tokens_stop_working_after_logout(self):
+        user = build_fixtures(1, 1, 1, 1).users['parent']
+        refresh = BufferedRefreshToken.for_user(user)
+
+        response = self.client.post(
+            reverse('api_logout'), {'refresh': str(refresh)}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse('api_token_refresh'), {'refresh': str(refresh)}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_tokens_issued_after_a_change_elsewhere_are_accepted(self):
+        user = build_fixtures(1, 1, 1, 1).users['parent']
+        old = BufferedRefreshToken.for_user(user).access_token
+        profile = reverse('api_user_profile')
+        self.assertEqual(self.client.get(profile, HTTP_AUTHORIZATION=f'Bearer {old}').status_code, 200)
+
+        # Another process changes the password and issues a new pair; this
+        # one's cached snapshot is left as it was
+        User.objects.filter(pk=user.pk).update(password=make_password('changed-pass-123'))
+        new = BufferedRefreshToken.for_user(User.objects.select_related('role').get(pk=user.pk))
+
+        for token, expected in ((new.access_token, 200), (old, 401)):
+            with self.subTest(expected=expected):
+                response = self.client.get(profile, HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, expected)
+                request = AsyncRequestFactory().get(profile, headers={'Authorization': f'Bearer {token}'})
+                request.auser = anonymous
+                self.assertEqual(async_to_sync(async_views.user_profile)(request).status_code, expected)
+
+        response = self.client.post(reverse('api_token_refresh'), {'refresh': str(new)}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,51 @@
+from rest_framework import throttling
+
+from neuvii_backend.throttling import consume, client_ip, normalized_email
+
+
+class TokenBucketThrottle(throttling.BaseThrottle):
+    """
+    DRF throttle backed by the shared token buckets in
+    `neuvii_backend.throttling`. Subclasses set `scope` (a THROTTLE_RATES
+    key) and may override `get_cache_key`; returning None skips the check.
+    """
+    scope = None
+
+    def get_cache_key(self, request, view):
+        return client_ip(request)
+
+    def allow_request(self, request, view):
+        allowed, self.retry_after = consume(self.scope, self.get_cache_key(request, view))
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(TokenBucketThrottle):
+    """Per-account limit, so one address can't be guessed from many IPs"""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        # Malformed bodies (a JSON list, a non-string email) fail validation;
+        # LoginIPThrottle still counts them
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        return normalized_email(email) if isinstance(email, str) else None
+
+
+class PasswordChangeThrottle(TokenBucketThrottle):
+    scope = 'password_change_user'
+
+    def get_cache_key(self, request, view):
+        return request.user.pk if request.user.is_authenticated else client_ip(request)
+
+
+class AssignTasksThrottle(TokenBucketThrottle):
+    scope = 'assign_tasks_user'
+
+    def get_cache_key(self, request, view):
+        return request.user.pk if request.user.is_authenticated else client_ip(request)
@@ -0,0 +1,127 @@
+"""
+Refresh tokens with deferred outstanding-token bookkeeping.
+
+With the simplejwt blacklist app installed, `RefreshToken.for_user` inserts
+an `OutstandingToken` row inside every login request. `BufferedRefreshToken`
+instead queues the row in memory and writes queued rows with one
+`bulk_create` once a request has finished, when OUTSTANDING_TOKEN_BATCH_SIZE
+rows are waiting or the oldest has waited OUTSTANDING_TOKEN_FLUSH_SECONDS.
+Rows still waiting when a process exits are dropped rather than written to
+whatever database is configured by then (at the end of a test run, the real
+one); commands that issue tokens outside requests call `flush()` themselves.
+
+Nothing depends on the row existing straight away: `blacklist()` creates a
+missing row itself, and a buffered row is inserted with `ignore_conflicts`.
+
+Blacklist checks go through `api.blacklist.blacklist_index` rather than a
+join per refresh, and blacklisting skips the user lookup simplejwt does.
+
+Tokens also carry the role/clinic/profile claims and auth version used by
+`api.authentication.CachedJWTAuthentication`; issuing one primes its cache.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .authentication import cache_user_snapshot, token_claims
+from .blacklist import blacklist_index
+
+BLACKLIST_APP = 'rest_framework_simplejwt.token_blacklist'
+
+
+class OutstandingTokenBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._oldest = None
+
+    def add(self, row):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+
+    def due(self):
+        if not self._rows:
+            return False
+        batch_size = getattr(settings, 'OUTSTANDING_TOKEN_BATCH_SIZE', 50)
+        max_age = getattr(settings, 'OUTSTANDING_TOKEN_FLUSH_SECONDS', 5)
+        return len(self._rows) >= batch_size or time.monotonic() - self._oldest >= max_age
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+            OutstandingToken.objects.bulk_create(
+                [OutstandingToken(**row) for row in rows], ignore_conflicts=True
+            )
+        return len(rows)
+
+    def discard(self):
+        with self._lock:
+            self._rows = []
+            self._oldest = None
+
+
+outstanding_tokens = OutstandingTokenBuffer()
+
+
+class BufferedRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which INSERTs synchronously
+        token = Token.for_user.__func__(cls, user)
+        for claim, value in token_claims(cache_user_snapshot(user)).items():
+            token[claim] = value
+
+        if BLACKLIST_APP in settings.INSTALLED_APPS:
+            token.outstand()
+        return token
+
+    def _outstanding_row(self):
+        return {
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+            'jti': self.payload[api_settings.JTI_CLAIM],
+            'token': str(self),
+            'created_at': self.current_time,
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+        }
+
+    def outstand(self):
+        """Queue the outstanding-token row instead of INSERTing it now"""
+        outstanding_tokens.add(self._outstanding_row())
+
+    def check_blacklist(self):
+        issued_at = self.payload.get('iat')
+        if blacklist_index.is_blacklisted(
+            self.payload[api_settings.JTI_CLAIM],
+            issued_at=datetime_from_epoch(issued_at) if issued_at is not None else None,
+        ):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        """Blacklist this token without loading its user"""
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+        row = self._outstanding_row()
+        token, _created = OutstandingToken.objects.get_or_create(jti=row.pop('jti'), defaults=row)
+        blacklisted = BlacklistedToken.objects.get_or_create(token=token)
+        blacklist_index.add(token.jti, token.expires_at)
+        return blacklisted
+
+
+def _flush_if_due(**kwargs):
+    if outstanding_tokens.due():
+        outstanding_tokens.flush()
+
+
+request_finished.connect(_flush_if_due, dispatch_uid='api.tokens.flush_outstanding_tokens')
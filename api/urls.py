@@ -1,7 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from rest_framework_simplejwt.views import TokenRefreshView
-from . import views
+from . import async_views, views
+
+# The busiest read endpoints are served by async views in the ASGI deployment
+if settings.ASYNC_VIEWS:
+    user_profile = async_views.user_profile
+    parent_children = async_views.parent_children
+    dashboard_stats = async_views.dashboard_stats
+else:
+    user_profile = views.user_profile
+    parent_children = views.parent_children
+    dashboard_stats = views.DashboardStatsAPIView.as_view()
 
 # Create router for viewsets (if needed in future)
 router = DefaultRouter()
@@ -43,17 +54,22 @@ urlpatterns = [
     path('short-term-goals/<int:pk>/', views.ShortTermGoalDetailAPIView.as_view(), name='api_short_term_goal_detail'),
     path('tasks/', views.TaskListAPIView.as_view(), name='api_task_list'),
     path('tasks/<int:pk>/', views.TaskDetailAPIView.as_view(), name='api_task_detail'),
+    path('catalog/import/', views.CatalogImportAPIView.as_view(), name='api_catalog_import'),
     
     # Assignment management
     path('assignments/', views.AssignmentListAPIView.as_view(), name='api_assignment_list'),
     path('assignments/<int:pk>/', views.AssignmentDetailAPIView.as_view(), name='api_assignment_detail'),
+    path('assignments/<int:pk>/events/', views.AssignmentEventListAPIView.as_view(), name='api_assignment_events'),
     path('assign-tasks/', views.AssignTasksAPIView.as_view(), name='api_assign_tasks'),
     
+    # Search
+    path('search/', views.SearchAPIView.as_view(), name='api_search'),
+    
     # Utility endpoints
-    path('profile/', views.user_profile, name='api_user_profile'),
+    path('profile/', user_profile, name='api_user_profile'),
     path('therapist/clients/', views.therapist_clients, name='api_therapist_clients'),
-    path('parent/children/', views.parent_children, name='api_parent_children'),
-    path('dashboard/stats/', views.DashboardStatsAPIView.as_view(), name='api_dashboard_stats'),
+    path('parent/children/', parent_children, name='api_parent_children'),
+    path('dashboard/stats/', dashboard_stats, name='api_dashboard_stats'),
     
     # Include router URLs
     path('', include(router.urls)),
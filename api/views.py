@@ -2,32 +2,96 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 
 from users.models import User, Role
 from clinic.models import Clinic
 from therapy.models import (
-    TherapistProfile, ParentProfile, Child, Assignment,
+    TherapistProfile, ParentProfile, Child, Assignment, AssignmentEvent,
     SpeechArea, LongTermGoal, ShortTermGoal, Task
 )
+from therapy.services import assign_tasks_to_child, record_events, completion_event
+from therapy.search import SOURCES as SEARCH_KINDS, search, search_scope, load_matches
+from therapy.catalog_import import CatalogImportError, import_catalog, loads as load_catalog
+from neuvii_backend.metrics import LOGIN_ATTEMPTS
+from .tokens import BufferedRefreshToken
+from .permissions import IsSuperAdmin
+from .throttling import LoginIPThrottle, LoginEmailThrottle, PasswordChangeThrottle, AssignTasksThrottle
 from .serializers import (
     LoginSerializer, UserSerializer, RoleSerializer, ClinicSerializer,
     TherapistProfileSerializer, ParentProfileSerializer, ChildSerializer,
     AssignmentSerializer, SpeechAreaSerializer, LongTermGoalSerializer,
     ShortTermGoalSerializer, TaskSerializer, TaskAssignmentSerializer,
-    PasswordChangeSerializer
+    PasswordChangeSerializer, AssignmentEventSerializer
 )
 
 
+# Base querysets carrying the joins and counts each serializer reads, so list
+# endpoints issue a fixed number of queries regardless of page size.
+def _users():
+    return User.objects.select_related('role')
+
+
+def _clinics():
+    return Clinic.objects.select_related('clinic_admin')
+
+
+def _therapists():
+    return TherapistProfile.objects.select_related('clinic').annotate(
+        assigned_clients_total=Count('assigned_clients')
+    )
+
+
+def _children():
+    return Child.objects.select_related('parent', 'assigned_therapist', 'clinic')
+
+
+def _parents():
+    return ParentProfile.objects.select_related('clinic', 'assigned_therapist').prefetch_related(
+        Prefetch('children', queryset=_children())
+    )
+
+
+# Catalog detail views include deactivated rows (so they can be read and
+# reactivated); list views filter is_active themselves
+def _speech_areas():
+    return SpeechArea.all_objects.annotate(long_term_goals_total=Count('long_term_goals'))
+
+
+def _long_term_goals():
+    return LongTermGoal.all_objects.select_related('speech_area').annotate(
+        short_term_goals_total=Count('short_term_goals')
+    )
+
+
+def _short_term_goals():
+    return ShortTermGoal.all_objects.select_related('long_term_goal__speech_area').annotate(
+        tasks_total=Count('tasks')
+    )
+
+
+def _tasks():
+    return Task.all_objects.select_related('short_term_goal', 'long_term_goal', 'speech_area').annotate(
+        assignments_total=Count('assignments')
+    )
+
+
+def _assignments():
+    return Assignment.objects.select_related(
+        'child__parent', 'therapist', 'task__speech_area'
+    )
+
+
 # Authentication Views
 class LoginAPIView(APIView):
     """
     User login endpoint that returns JWT tokens
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -36,6 +100,7 @@ class LoginAPIView(APIView):
             
             # Check if password reset is required
             if user.password_reset_required:
+                LOGIN_ATTEMPTS.inc(channel='api', outcome='reset_required')
                 return Response({
                     'error': 'Password reset required',
                     'password_reset_required': True,
@@ -43,14 +108,16 @@ class LoginAPIView(APIView):
                 }, status=status.HTTP_403_FORBIDDEN)
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            
+            refresh = BufferedRefreshToken.for_user(user)
+            LOGIN_ATTEMPTS.inc(channel='api', outcome='success')
+
             return Response({
                 'access': str(refresh.access_token),
                 'refresh': str(refresh),
                 'user': UserSerializer(user).data
             })
-        
+
+        LOGIN_ATTEMPTS.inc(channel='api', outcome='invalid')
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -62,7 +129,7 @@ class LogoutAPIView(APIView):
         try:
             refresh_token = request.data.get('refresh')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = BufferedRefreshToken(refresh_token)
                 token.blacklist()
             return Response({'message': 'Successfully logged out'})
         except Exception:
@@ -73,15 +140,24 @@ class ChangePasswordAPIView(APIView):
     """
     Change user password endpoint
     """
+    throttle_classes = [PasswordChangeThrottle]
+
     def post(self, request):
-        serializer = PasswordChangeSerializer(data=request.data, context={'request': request})
+        # request.user is a cached snapshot under JWT auth; change the real row
+        user = User.objects.select_related('role').get(pk=request.user.pk)
+        serializer = PasswordChangeSerializer(data=request.data, context={'request': request, 'user': user})
         if serializer.is_valid():
-            user = request.user
             user.set_password(serializer.validated_data['new_password'])
             user.password_reset_required = False
             user.save()
-            
-            return Response({'message': 'Password changed successfully'})
+
+            # The new password invalidates tokens issued before it
+            refresh = BufferedRefreshToken.for_user(user)
+            return Response({
+                'message': 'Password changed successfully',
+                'access': str(refresh.access_token),
+                'refresh': str(refresh),
+            })
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -96,7 +172,7 @@ class UserListAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return User.objects.all()
+            return _users().all()
         
         # Role-based filtering
         role = getattr(getattr(user, "role", None), "name", "").lower()
@@ -109,11 +185,11 @@ class UserListAPIView(generics.ListCreateAPIView):
                 parent_emails = ParentProfile.objects.filter(clinic=clinic).values_list('parent_email', flat=True)
                 clinic_user_emails = list(therapist_emails) + list(parent_emails)
                 clinic_user_emails = [email for email in clinic_user_emails if email]
-                return User.objects.filter(email__in=clinic_user_emails)
+                return _users().filter(email__in=clinic_user_emails)
             except Clinic.DoesNotExist:
-                return User.objects.none()
+                return _users().none()
         
-        return User.objects.none()
+        return _users().none()
 
 
 class UserDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -125,10 +201,10 @@ class UserDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return User.objects.all()
+            return _users().all()
         
         # Users can only access their own profile
-        return User.objects.filter(id=user.id)
+        return _users().filter(id=user.id)
 
 
 # Role Views
@@ -150,14 +226,14 @@ class ClinicListAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return Clinic.objects.all()
+            return _clinics().all()
         
         # Clinic admin sees only their clinic
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "clinic admin":
-            return Clinic.objects.filter(clinic_admin=user)
+            return _clinics().filter(clinic_admin=user)
         
-        return Clinic.objects.none()
+        return _clinics().none()
 
 
 class ClinicDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -169,13 +245,13 @@ class ClinicDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return Clinic.objects.all()
+            return _clinics().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "clinic admin":
-            return Clinic.objects.filter(clinic_admin=user)
+            return _clinics().filter(clinic_admin=user)
         
-        return Clinic.objects.none()
+        return _clinics().none()
 
 
 # Therapist Views
@@ -188,20 +264,20 @@ class TherapistProfileListAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return TherapistProfile.objects.all()
+            return _therapists().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "therapist":
-            return TherapistProfile.objects.filter(email=user.email)
+            return _therapists().filter(email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return TherapistProfile.objects.filter(clinic=clinic)
+                return _therapists().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return TherapistProfile.objects.none()
+                return _therapists().none()
         
-        return TherapistProfile.objects.none()
+        return _therapists().none()
 
 
 class TherapistProfileDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -213,20 +289,20 @@ class TherapistProfileDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return TherapistProfile.objects.all()
+            return _therapists().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "therapist":
-            return TherapistProfile.objects.filter(email=user.email)
+            return _therapists().filter(email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return TherapistProfile.objects.filter(clinic=clinic)
+                return _therapists().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return TherapistProfile.objects.none()
+                return _therapists().none()
         
-        return TherapistProfile.objects.none()
+        return _therapists().none()
 
 
 # Parent/Client Views
@@ -239,22 +315,22 @@ class ParentProfileListAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return ParentProfile.objects.all()
+            return _parents().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "parent":
-            return ParentProfile.objects.filter(parent_email=user.email)
+            return _parents().filter(parent_email=user.email)
         elif role == "therapist":
-            return ParentProfile.objects.filter(assigned_therapist__email=user.email)
+            return _parents().filter(assigned_therapist__email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return ParentProfile.objects.filter(clinic=clinic)
+                return _parents().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return ParentProfile.objects.none()
+                return _parents().none()
         
-        return ParentProfile.objects.none()
+        return _parents().none()
 
 
 class ParentProfileDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -266,22 +342,22 @@ class ParentProfileDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return ParentProfile.objects.all()
+            return _parents().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "parent":
-            return ParentProfile.objects.filter(parent_email=user.email)
+            return _parents().filter(parent_email=user.email)
         elif role == "therapist":
-            return ParentProfile.objects.filter(assigned_therapist__email=user.email)
+            return _parents().filter(assigned_therapist__email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return ParentProfile.objects.filter(clinic=clinic)
+                return _parents().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return ParentProfile.objects.none()
+                return _parents().none()
         
-        return ParentProfile.objects.none()
+        return _parents().none()
 
 
 # Child Views
@@ -294,22 +370,22 @@ class ChildListAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return Child.objects.all()
+            return _children().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "parent":
-            return Child.objects.filter(parent__parent_email=user.email)
+            return _children().filter(parent__parent_email=user.email)
         elif role == "therapist":
-            return Child.objects.filter(assigned_therapist__email=user.email)
+            return _children().filter(assigned_therapist__email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return Child.objects.filter(clinic=clinic)
+                return _children().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return Child.objects.none()
+                return _children().none()
         
-        return Child.objects.none()
+        return _children().none()
 
 
 class ChildDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -321,38 +397,47 @@ class ChildDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser:
-            return Child.objects.all()
+            return _children().all()
         
         role = getattr(getattr(user, "role", None), "name", "").lower()
         if role == "parent":
-            return Child.objects.filter(parent__parent_email=user.email)
+            return _children().filter(parent__parent_email=user.email)
         elif role == "therapist":
-            return Child.objects.filter(assigned_therapist__email=user.email)
+            return _children().filter(assigned_therapist__email=user.email)
         elif role == "clinic admin":
             from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
-                return Child.objects.filter(clinic=clinic)
+                return _children().filter(clinic=clinic)
             except Clinic.DoesNotExist:
-                return Child.objects.none()
+                return _children().none()
         
-        return Child.objects.none()
+        return _children().none()
 
 
 # Speech Therapy Structure Views
+class SoftDeleteCatalogMixin:
+    """
+    DELETE deactivates the node and everything below it instead of deleting
+    rows, which would cascade through the assignments of its tasks.
+    """
+    def perform_destroy(self, instance):
+        instance.deactivate()
+
+
 class SpeechAreaListAPIView(generics.ListCreateAPIView):
     """
     List all speech areas or create a new speech area
     """
-    queryset = SpeechArea.objects.filter(is_active=True)
+    queryset = _speech_areas().filter(is_active=True)
     serializer_class = SpeechAreaSerializer
 
 
-class SpeechAreaDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class SpeechAreaDetailAPIView(SoftDeleteCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     """
-    Retrieve, update or delete a speech area
+    Retrieve, update or deactivate a speech area (with everything below it)
     """
-    queryset = SpeechArea.objects.all()
+    queryset = _speech_areas().all()
     serializer_class = SpeechAreaSerializer
 
 
@@ -363,18 +448,18 @@ class LongTermGoalListAPIView(generics.ListCreateAPIView):
     serializer_class = LongTermGoalSerializer
     
     def get_queryset(self):
-        queryset = LongTermGoal.objects.filter(is_active=True)
+        queryset = _long_term_goals().filter(is_active=True)
         speech_area_id = self.request.query_params.get('speech_area_id')
         if speech_area_id:
             queryset = queryset.filter(speech_area_id=speech_area_id)
         return queryset
 
 
-class LongTermGoalDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class LongTermGoalDetailAPIView(SoftDeleteCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     """
-    Retrieve, update or delete a long-term goal
+    Retrieve, update or deactivate a long-term goal (with everything below it)
     """
-    queryset = LongTermGoal.objects.all()
+    queryset = _long_term_goals().all()
     serializer_class = LongTermGoalSerializer
 
 
@@ -385,18 +470,18 @@ class ShortTermGoalListAPIView(generics.ListCreateAPIView):
     serializer_class = ShortTermGoalSerializer
     
     def get_queryset(self):
-        queryset = ShortTermGoal.objects.filter(is_active=True)
+        queryset = _short_term_goals().filter(is_active=True)
         long_term_goal_id = self.request.query_params.get('long_term_goal_id')
         if long_term_goal_id:
             queryset = queryset.filter(long_term_goal_id=long_term_goal_id)
         return queryset
 
 
-class ShortTermGoalDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ShortTermGoalDetailAPIView(SoftDeleteCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     """
-    Retrieve, update or delete a short-term goal
+    Retrieve, update or deactivate a short-term goal (with everything below it)
     """
-    queryset = ShortTermGoal.objects.all()
+    queryset = _short_term_goals().all()
     serializer_class = ShortTermGoalSerializer
 
 
@@ -407,10 +492,16 @@ class TaskListAPIView(generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     
     def get_queryset(self):
-        queryset = Task.objects.filter(is_active=True)
+        queryset = _tasks().filter(is_active=True)
+        speech_area_id = self.request.query_params.get('speech_area_id')
+        long_term_goal_id = self.request.query_params.get('long_term_goal_id')
         short_term_goal_id = self.request.query_params.get('short_term_goal_id')
         difficulty = self.request.query_params.get('difficulty')
         
+        if speech_area_id:
+            queryset = queryset.filter(speech_area_id=speech_area_id)
+        if long_term_goal_id:
+            queryset = queryset.filter(long_term_goal_id=long_term_goal_id)
         if short_term_goal_id:
             queryset = queryset.filter(short_term_goal_id=short_term_goal_id)
         if difficulty:
@@ -419,15 +510,61 @@ class TaskListAPIView(generics.ListCreateAPIView):
         return queryset
 
 
-class TaskDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailAPIView(SoftDeleteCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     """
-    Retrieve, update or delete a task
+    Retrieve, update or deactivate a task; its assignments are kept
     """
-    queryset = Task.objects.all()
+    queryset = _tasks().all()
     serializer_class = TaskSerializer
 
 
+class CatalogImportAPIView(APIView):
+    """
+    Create or update the whole speech area / goal / task catalog from one
+    document (see therapy.catalog_import for the format).
+
+    Send the document as the JSON body, or upload it as `file` (.json, or
+    .yaml/.yml with PyYAML installed). Query parameters:
+    ?deactivate_missing=1  deactivate children the document no longer lists
+    ?dry_run=1             report the changes without saving them
+    """
+    permission_classes = [IsSuperAdmin]
+
+    def post(self, request):
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                format = 'yaml' if upload.name.lower().endswith(('.yml', '.yaml')) else 'json'
+                document = load_catalog(upload.read().decode('utf-8'), format)
+            else:
+                document = request.data
+            result = import_catalog(
+                document,
+                deactivate_missing=request.query_params.get('deactivate_missing') in ('1', 'true'),
+                dry_run=request.query_params.get('dry_run') in ('1', 'true'),
+            )
+        except CatalogImportError as error:
+            return Response({'error': 'Invalid catalog', 'details': error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({'error': 'The file must be UTF-8 text'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'dry_run': request.query_params.get('dry_run') in ('1', 'true'), 'counts': result})
+
+
 # Assignment Views
+def _scoped_assignments(user):
+    if user.is_superuser:
+        return _assignments().all()
+
+    role = getattr(getattr(user, "role", None), "name", "").lower()
+    if role == "parent":
+        return _assignments().filter(child__parent__parent_email=user.email)
+    elif role == "therapist":
+        return _assignments().filter(therapist__email=user.email)
+
+    return _assignments().none()
+
+
 class AssignmentListAPIView(generics.ListCreateAPIView):
     """
     List assignments or create a new assignment
@@ -435,37 +572,60 @@ class AssignmentListAPIView(generics.ListCreateAPIView):
     serializer_class = AssignmentSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Assignment.objects.all()
-        
-        role = getattr(getattr(user, "role", None), "name", "").lower()
-        if role == "parent":
-            return Assignment.objects.filter(child__parent__parent_email=user.email)
-        elif role == "therapist":
-            return Assignment.objects.filter(therapist__email=user.email)
-        
-        return Assignment.objects.none()
+        return _scoped_assignments(self.request.user)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            assignment = serializer.save()
+            record_events(AssignmentEvent.ASSIGNED, [assignment])
 
 
 class AssignmentDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     """
-    Retrieve, update or delete an assignment
+    Retrieve, update or delete an assignment. Completing or reopening it
+    appends a completed/reopened AssignmentEvent.
     """
     serializer_class = AssignmentSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Assignment.objects.all()
-        
-        role = getattr(getattr(user, "role", None), "name", "").lower()
-        if role == "parent":
-            return Assignment.objects.filter(child__parent__parent_email=user.email)
-        elif role == "therapist":
-            return Assignment.objects.filter(therapist__email=user.email)
-        
-        return Assignment.objects.none()
+        return _scoped_assignments(self.request.user)
+
+    def perform_update(self, serializer):
+        was_completed = serializer.instance.completed
+        with transaction.atomic():
+            assignment = serializer.save()
+            kind = completion_event(was_completed, assignment)
+            if kind:
+                record_events(kind, [assignment])
+
+
+class AssignmentEventListAPIView(generics.ListCreateAPIView):
+    """
+    History of one assignment, oldest first. POST {"kind": "started"} records
+    that the child started it; completion is recorded by updating the
+    assignment itself.
+    """
+    serializer_class = AssignmentEventSerializer
+    pagination_class = None
+
+    def get_assignment(self):
+        return get_object_or_404(_scoped_assignments(self.request.user), pk=self.kwargs['pk'])
+
+    def get_queryset(self):
+        return AssignmentEvent.objects.filter(assignment_id=self.get_assignment().pk).order_by('created_at', 'id')
+
+    def create(self, request, *args, **kwargs):
+        assignment = self.get_assignment()
+        if request.data.get('kind') != AssignmentEvent.STARTED:
+            return Response(
+                {'error': f'Only "{AssignmentEvent.STARTED}" events can be recorded directly'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        record_events(AssignmentEvent.STARTED, [assignment])
+        return Response(
+            self.get_serializer(self.get_queryset().filter(kind=AssignmentEvent.STARTED).last()).data,
+            status=status.HTTP_201_CREATED
+        )
 
 
 # Task Assignment API
@@ -473,6 +633,8 @@ class AssignTasksAPIView(APIView):
     """
     Assign multiple tasks to a client's child
     """
+    throttle_classes = [AssignTasksThrottle]
+
     def post(self, request):
         serializer = TaskAssignmentSerializer(data=request.data)
         if serializer.is_valid():
@@ -513,20 +675,9 @@ class AssignTasksAPIView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Create assignments
-            assignments_created = 0
-            with transaction.atomic():
-                for task_id in selected_tasks:
-                    task = get_object_or_404(Task, id=task_id)
-                    
-                    # Check if assignment already exists
-                    if not Assignment.objects.filter(child=child, task=task, therapist=therapist).exists():
-                        Assignment.objects.create(
-                            child=child,
-                            task=task,
-                            therapist=therapist
-                        )
-                        assignments_created += 1
+            # Create assignments (existing ones are skipped)
+            created = assign_tasks_to_child(child, therapist, selected_tasks)
+            assignments_created = len(created)
             
             return Response({
                 'success': True,
@@ -559,7 +710,6 @@ class DashboardStatsAPIView(APIView):
                 'active_assignments': Assignment.objects.filter(completed=False).count(),
             }
         elif role == "clinic admin":
-            from clinic.models import Clinic
             try:
                 clinic = Clinic.objects.get(clinic_admin=user)
                 stats = {
@@ -596,6 +746,69 @@ class DashboardStatsAPIView(APIView):
         return Response(stats)
 
 
+# Search
+class SearchAPIView(APIView):
+    """
+    Ranked prefix search over clients, therapists and tasks.
+
+    ?q=        words to match (each as a prefix)
+    ?type=     comma-separated kinds to search: client, therapist, task
+    ?limit=    number of results (default 20, max 50)
+
+    Results are limited to what the user's role may see: clinic admins
+    their clinic's clients and therapists, therapists their own clients,
+    everyone the task catalog.
+    """
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = set(kinds) - set(SEARCH_KINDS)
+        if unknown:
+            return Response(
+                {'error': f"Unknown type: {', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        scope = search_scope(request.user)
+        if not query or scope is None:
+            return Response({'query': query, 'results': []})
+
+        matches = load_matches(
+            search(query, kinds=kinds, scope=scope, limit=limit),
+            select_related={'task': ['short_term_goal']},
+        )
+        return Response({
+            'query': query,
+            'results': [self._result(match) for match in matches],
+        })
+
+    def _result(self, match):
+        obj = match['object']
+        result = {'type': match['kind'], 'id': obj.pk, 'score': match['score']}
+        if match['kind'] == 'client':
+            result.update(
+                label=f"{obj.first_name} {obj.last_name}", email=obj.parent_email,
+                clinic_id=obj.clinic_id, is_active=obj.is_active,
+            )
+        elif match['kind'] == 'therapist':
+            result.update(
+                label=f"{obj.first_name} {obj.last_name}", email=obj.email,
+                clinic_id=obj.clinic_id, is_active=obj.is_active,
+            )
+        else:
+            result.update(
+                label=obj.title, difficulty=obj.difficulty,
+                short_term_goal=obj.short_term_goal.title if obj.short_term_goal else None,
+                is_active=obj.is_active,
+            )
+        return result
+
+
 # Utility Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -621,7 +834,7 @@ def therapist_clients(request):
     if not therapist:
         return Response({'error': 'Therapist profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    clients = ParentProfile.objects.filter(assigned_therapist=therapist)
+    clients = _parents().filter(assigned_therapist=therapist)
     serializer = ParentProfileSerializer(clients, many=True)
     return Response(serializer.data)
 
@@ -640,6 +853,6 @@ def parent_children(request):
     if not parent:
         return Response({'error': 'Parent profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    children = parent.children.all()
+    children = _children().filter(parent=parent)
     serializer = ChildSerializer(children, many=True)
     return Response(serializer.data)
\ No newline at end of file
@@ -26,6 +26,7 @@ class ClinicForm(forms.ModelForm):
 class ClinicAdmin(admin.ModelAdmin):
     form = ClinicForm
     list_display = ['id', 'name', 'clinic_admin', 'is_active', 'created_at']
+    list_select_related = ['clinic_admin']
     list_filter = ['name', 'is_active', 'created_at']
     search_fields = ['name']
     ordering = ['id']
@@ -1,3 +1,40 @@
-from django.test import TestCase
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from neuvii_backend.admin_sites import neuvii_admin_site
+from users.models import Role, User
+from .models import Clinic
+
+
+@override_settings(JOBS_EAGER=False)
+class ClinicAdminTests(TestCase):
+    def setUp(self):
+        self.model_admin = neuvii_admin_site._registry[Clinic]
+        self.role = Role.objects.create(name='Clinic Admin')
+        self.superuser = User.objects.create_superuser('root@example.com', 'pass-123')
+
+    def request(self, user):
+        request = RequestFactory().post('/admin/clinic/clinic/add/')
+        request.user = user
+        request._messages = CookieStorage(request)
+        return request
+
+    def test_adding_a_clinic_creates_its_admin(self):
+        clinic = Clinic(name='North', contact_person_name='Jane  van Dyke', email='Jane@North.example')
+
+        self.model_admin.save_model(self.request(self.superuser), clinic, None, change=False)
+
+        clinic.refresh_from_db()
+        admin = clinic.clinic_admin
+        self.assertEqual((admin.first_name, admin.last_name, admin.role), ('Jane', 'van Dyke', self.role))
+        self.assertEqual(admin.email_canonical, 'jane@north.example')
+        self.assertTrue(admin.has_perm('clinic.change_clinic'))
+
+    def test_clinic_admins_see_only_their_clinic(self):
+        admin = User.objects.create_user('admin@example.com', role=self.role, is_staff=True)
+        own = Clinic.objects.create(name='Own', clinic_admin=admin)
+        Clinic.objects.create(name='Other')
+
+        self.assertEqual(list(self.model_admin.get_queryset(self.request(admin))), [own])
+        self.assertEqual(self.model_admin.get_queryset(self.request(self.superuser)).count(), 2)
+        self.assertFalse(self.model_admin.has_add_permission(self.request(admin)))
@@ -0,0 +1,24 @@
+from django.contrib import admin, messages
+
+from neuvii_backend.admin_sites import neuvii_admin_site
+
+from .models import Job
+from .queue import retry
+
+
+@admin.register(Job, site=neuvii_admin_site)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    ordering = ('-id',)
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['retry_selected']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected dead jobs')
+    def retry_selected(self, request, queryset):
+        retried = retry(queryset)
+        messages.success(request, f'{retried} jobs queued again.')
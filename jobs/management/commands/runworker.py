@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (welcome emails, role permissions, ...) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Jobs run at the same time')
+        parser.add_argument(
+            '--mode', choices=['thread', 'process'], default='thread',
+            help='Run workers as threads (I/O-bound jobs) or processes (CPU-bound jobs)',
+        )
+        parser.add_argument('--poll-seconds', type=float, help='Wait between checks when no job is due')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be positive')
+        poll_seconds = options['poll_seconds']
+        if poll_seconds is None:
+            poll_seconds = getattr(settings, 'JOB_POLL_SECONDS', 1.0)
+
+        self.stdout.write(f"Starting {options['concurrency']} {options['mode']} workers")
+        worker.run(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_seconds=poll_seconds,
+            burst=options['burst'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
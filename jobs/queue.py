@@ -0,0 +1,189 @@
+"""
+A database-backed job queue.
+
+Functions are registered under a name with `@register`, usually in an app's
+`jobs.py` (imported when the app registry is ready), and queued with
+`enqueue(name, **args)`. The `Job` row is written in the caller's
+transaction, so a job is only ever seen by a worker once the data it refers
+to has committed, and is rolled back with it.
+
+Workers (`runworker`) claim due jobs one at a time. On databases that
+support it (MySQL 8, PostgreSQL) the SELECT locks the row with SKIP LOCKED,
+so concurrent workers pass over each other's jobs instead of waiting; the
+claim itself is a conditional UPDATE, which is enough on its own for
+databases without row locks (SQLite) where workers simply poll.
+
+A job that raises is retried after RETRY_DELAY * 2**(attempts - 1) seconds
+until it has made `max_attempts` attempts, then dead-lettered (status
+"dead", kept with its error for inspection and retry from the admin). Jobs
+left running past JOB_TIMEOUT_SECONDS, because their worker died, are
+queued again, or dead-lettered if that was their last attempt. Arguments
+named in `secret_args` are blanked once the job finishes, either way.
+
+With JOBS_EAGER, jobs also run in-process right after the enqueuing
+transaction commits (development and tests without a worker); one that
+fails there stays queued for a worker.
+"""
+import logging
+import os
+import socket
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+REDACTED = '[redacted]'
+
+_registry = {}
+
+
+class JobFunction:
+    def __init__(self, func, name, max_attempts, secret_args):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.secret_args = tuple(secret_args)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, delay=0, **args):
+        return enqueue(self.name, delay=delay, **args)
+
+
+def register(name, max_attempts=None, secret_args=()):
+    """Register the decorated function as job `name`; its arguments must be JSON-serializable"""
+    def decorator(func):
+        job = JobFunction(func, name, max_attempts, secret_args)
+        _registry[name] = job
+        return job
+    return decorator
+
+
+def get_job_function(name):
+    return _registry.get(name)
+
+
+def enqueue(name, delay=0, **args):
+    """Queue job `name` with `args`, due in `delay` seconds"""
+    registered = _registry.get(name)
+    max_attempts = (registered.max_attempts if registered else None) or getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+    job = Job.objects.create(
+        name=name, args=args, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_eagerly(job.pk))
+    return job
+
+
+def worker_name(suffix=''):
+    return f'{socket.gethostname()}:{os.getpid()}{suffix}'[:100]
+
+
+def claim(worker):
+    """Mark the next due job running for `worker` and return it, or None"""
+    now = timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    # SQLite can't upgrade a read transaction another worker is also in, so
+    # without row locks the SELECT and UPDATE run in autocommit
+    with transaction.atomic() if skip_locked else nullcontext():
+        if skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        pk = due.values_list('id', flat=True).first()
+        if pk is None:
+            return None
+        # Conditional, so without row locks a job still goes to one worker
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1
+        )
+        if not claimed:
+            return None
+    return Job.objects.get(pk=pk)
+
+
+def requeue_stale():
+    """
+    Queue again the jobs whose worker stopped while running them; those out
+    of attempts are dead-lettered instead, so a job that kills or hangs its
+    worker isn't retried forever. Returns the number queued again.
+    """
+    timeout = getattr(settings, 'JOB_TIMEOUT_SECONDS', 600)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout))
+    for job in stale.filter(attempts__gte=F('max_attempts')):
+        # Conditional, like claim(): the worker may be finishing it after all
+        if Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(status=Job.DEAD):
+            logger.error('Job %s (%s) stalled on its last attempt; giving up', job.pk, job.name)
+            _finish(job, Job.DEAD, f'Worker stopped or ran past {timeout}s on attempt {job.attempts}')
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def _finish(job, status, error=''):
+    job.status = status
+    job.last_error = error
+    job.finished_at = timezone.now()
+    registered = _registry.get(job.name)
+    if registered:
+        for arg in registered.secret_args:
+            if arg in job.args:
+                job.args[arg] = REDACTED
+    job.save(update_fields=['status', 'last_error', 'finished_at', 'args'])
+
+
+def execute(job):
+    """Run a claimed job and record the outcome; returns its new status"""
+    registered = _registry.get(job.name)
+    if registered is None:
+        _finish(job, Job.DEAD, f'No job registered as "{job.name}"')
+        return job.status
+
+    try:
+        registered.func(**job.args)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error('Job %s (%s) failed for good after %d attempts', job.pk, job.name, job.attempts)
+            _finish(job, Job.DEAD, error)
+        else:
+            delay = getattr(settings, 'JOB_RETRY_DELAY_SECONDS', 30) * 2 ** (job.attempts - 1)
+            logger.warning('Job %s (%s) failed; retrying in %ss', job.pk, job.name, delay)
+            job.status = Job.QUEUED
+            job.last_error = error
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+            job.locked_by = ''
+            job.locked_at = None
+            job.save(update_fields=['status', 'last_error', 'run_at', 'locked_by', 'locked_at'])
+    else:
+        _finish(job, Job.DONE)
+    return job.status
+
+
+def run_eagerly(pk):
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=pk, status=Job.QUEUED, run_at__lte=now).update(
+        status=Job.RUNNING, locked_by=worker_name(':eager'), locked_at=now, attempts=F('attempts') + 1
+    )
+    if claimed:
+        execute(Job.objects.get(pk=pk))
+
+
+def retry(queryset):
+    """Queue dead jobs again with a fresh set of attempts; skips those whose secrets were blanked"""
+    retried = 0
+    for job in queryset.filter(status=Job.DEAD):
+        registered = _registry.get(job.name)
+        if registered and any(job.args.get(arg) == REDACTED for arg in registered.secret_args):
+            continue
+        retried += Job.objects.filter(pk=job.pk, status=Job.DEAD).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None, locked_by='', locked_at=None
+        )
+    return retried
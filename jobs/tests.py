@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import REDACTED, claim, enqueue, execute, register, requeue_stale, retry
+
+calls = []
+
+
+@register('tests.record', max_attempts=2, secret_args=('token',))
+def record(value, token=None, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError('failed on purpose')
+
+
+@override_settings(JOBS_EAGER=False, JOB_RETRY_DELAY_SECONDS=30)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_takes_due_jobs_in_order_once(self):
+        first = enqueue('tests.record', value=1)
+        enqueue('tests.record', delay=60, value=2)
+
+        job = claim('worker-a')
+        self.assertEqual((job.pk, job.status, job.attempts, job.locked_by), (first.pk, Job.RUNNING, 1, 'worker-a'))
+        self.assertIsNone(claim('worker-b'))
+
+    def test_success_finishes_the_job_and_redacts_secrets(self):
+        enqueue('tests.record', value=1, token='s3cret')
+
+        self.assertEqual(execute(claim('worker')), Job.DONE)
+        job = Job.objects.get()
+        self.assertEqual(calls, [1])
+        self.assertEqual(job.args, {'value': 1, 'token': REDACTED})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failures_back_off_then_dead_letter(self):
+        enqueue('tests.record', value=1, token='s3cret', fail=True)
+
+        before = timezone.now()
+        self.assertEqual(execute(claim('worker')), Job.QUEUED)
+        job = Job.objects.get()
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=30))
+        self.assertIn('failed on purpose', job.last_error)
+        self.assertEqual(job.args['token'], 's3cret')
+        self.assertIsNone(claim('worker'))
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(execute(claim('worker')), Job.DEAD)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.args['token']), (2, REDACTED))
+
+    def test_unregistered_jobs_go_straight_to_dead(self):
+        enqueue('tests.missing')
+        self.assertEqual(execute(claim('worker')), Job.DEAD)
+        self.assertEqual(Job.objects.get().last_error, 'No job registered as "tests.missing"')
+
+    @override_settings(JOB_TIMEOUT_SECONDS=60)
+    def test_requeue_stale_frees_jobs_of_dead_workers(self):
+        enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+        stale, fresh = claim('worker'), claim('worker')
+        Job.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=stale.pk).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=fresh.pk).status, Job.RUNNING)
+
+    @override_settings(JOB_TIMEOUT_SECONDS=60)
+    def test_stale_jobs_out_of_attempts_are_dead_lettered(self):
+        enqueue('tests.record', value=1, token='s3cret')
+        job = claim('worker')
+        Job.objects.filter(pk=job.pk).update(attempts=2, locked_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.args['token']), (Job.DEAD, 'worker', REDACTED))
+        self.assertIn('attempt 2', job.last_error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_requeues_dead_jobs_that_kept_their_arguments(self):
+        kept = Job.objects.create(name='tests.record', args={'value': 1}, status=Job.DEAD, attempts=2)
+        redacted = Job.objects.create(
+            name='tests.record', args={'value': 2, 'token': REDACTED}, status=Job.DEAD, attempts=2
+        )
+        Job.objects.create(name='tests.record', args={'value': 3}, status=Job.DONE, attempts=1)
+
+        self.assertEqual(retry(Job.objects.all()), 1)
+        kept.refresh_from_db()
+        self.assertEqual((kept.status, kept.attempts), (Job.QUEUED, 0))
+        self.assertEqual(Job.objects.get(pk=redacted.pk).status, Job.DEAD)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs_run_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', value=1)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
@@ -0,0 +1,109 @@
+"""
+Worker pool for the job queue (see jobs.queue), driven by `runworker`.
+
+Each worker, a thread or a process, claims and runs one job at a time and
+sleeps `poll_seconds` when nothing is due. Threads suit jobs that wait on
+the network (SMTP); processes suit CPU-bound ones. Processes start from a
+clean interpreter (forkserver or spawn) and open their own database
+connections, so this module imports the queue lazily: the children import
+it before django.setup() has run.
+
+The supervisor requeues jobs abandoned by dead workers every
+`STALE_CHECK_SECONDS` and on SIGINT/SIGTERM lets every worker finish its
+current job before exiting.
+"""
+import logging
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STALE_CHECK_SECONDS = 30
+
+
+def work(worker, stop, poll_seconds, burst=False):
+    """Run jobs until `stop` is set or, with `burst`, nothing is due; returns the number run"""
+    from .queue import claim, execute
+
+    processed = 0
+    try:
+        while not stop.is_set():
+            try:
+                job = claim(worker)
+            except DatabaseError:
+                # A lost connection or a lock timeout; try again after a pause
+                logger.exception('Worker %s could not claim a job', worker)
+                connections.close_all()
+                stop.wait(poll_seconds)
+                continue
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_seconds)
+                continue
+            execute(job)
+            processed += 1
+    finally:
+        connections.close_all()
+    return processed
+
+
+def _process_main(index, stop, poll_seconds, burst):
+    django.setup()
+    # The supervisor handles Ctrl-C for the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from .queue import worker_name
+
+    work(worker_name(f':{index}'), stop, poll_seconds, burst)
+
+
+def run(concurrency=1, mode='thread', poll_seconds=1.0, burst=False, log=print):
+    """Start `concurrency` workers and supervise them until they stop"""
+    from .queue import requeue_stale, worker_name
+
+    if mode == 'process':
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        stop = context.Event()
+        workers = [
+            context.Process(target=_process_main, args=(index, stop, poll_seconds, burst), name=f'jobs-worker-{index}')
+            for index in range(concurrency)
+        ]
+    else:
+        stop = threading.Event()
+        workers = [
+            threading.Thread(
+                target=work, args=(worker_name(f':t{index}'), stop, poll_seconds, burst),
+                name=f'jobs-worker-{index}', daemon=True,
+            )
+            for index in range(concurrency)
+        ]
+
+    def shutdown(signum, frame):
+        log('Stopping after the current jobs')
+        stop.set()
+
+    previous = {sig: signal.signal(sig, shutdown) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        requeued = requeue_stale()
+        if requeued:
+            log(f'Requeued {requeued} stalled jobs')
+        connections.close_all()
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(STALE_CHECK_SECONDS / len(workers))
+            if not stop.is_set() and not burst:
+                requeued = requeue_stale()
+                if requeued:
+                    log(f'Requeued {requeued} stalled jobs')
+    finally:
+        stop.set()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        connections.close_all()
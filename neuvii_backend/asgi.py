@@ -3,6 +3,17 @@ ASGI config for neuvii_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through this module turns on ASYNC_VIEWS, so the read-heavy
+endpoints run as async views. Run it under Uvicorn workers managed by
+Gunicorn (see neuvii_backend/gunicorn_asgi.py):
+
+    gunicorn -c python:neuvii_backend.gunicorn_asgi neuvii_backend.asgi:application
+
+Keep CONN_MAX_AGE at 0 here: async requests run their queries on
+short-lived threads, so persistent connections would pile up instead of
+being reused. The opt-in instrumentation and N+1 middleware are sync only
+and move every request onto a thread while enabled.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +23,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "neuvii_backend.settings")
+os.environ.setdefault("ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
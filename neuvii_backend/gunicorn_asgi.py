@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for the ASGI deployment (neuvii_backend.asgi):
+
+    gunicorn -c python:neuvii_backend.gunicorn_asgi neuvii_backend.asgi:application
+
+Each worker is a Uvicorn event loop (needs `gunicorn` and `uvicorn`
+installed), so a worker holds many slow mobile connections at once instead
+of one per thread. Size it with the environment: WEB_CONCURRENCY worker
+processes (default one per CPU) bound to GUNICORN_BIND.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Mobile clients reuse connections between screens; keep idle ones open a
+# little longer than the default 2 seconds
+keepalive = 15
+# Restart a worker whose event loop has stopped responding for this long
+timeout = 60
+graceful_timeout = 30
+
+# Recycle workers now and then so per-process caches can't grow unbounded
+max_requests = 10000
+max_requests_jitter = 1000
+
+# Trust X-Forwarded-* from the local reverse proxy only
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
@@ -0,0 +1,203 @@
+"""
+Per-request query and timing instrumentation.
+
+`QueryInstrumentationMiddleware` (enabled with the
+`REQUEST_INSTRUMENTATION_ENABLED` setting) hooks every database connection
+with `connection.execute_wrapper` and records, per view:
+
+* number of queries and time spent in the database
+* time spent in the view and rendering the response (serialization)
+* response size
+
+The numbers are returned to the client as a `Server-Timing` header,
+aggregated into in-process histograms (see `instrumentation_stats` in
+`neuvii_backend/views.py`) and slow requests are logged together with their
+most repeated SQL shapes, which is usually an N+1 query.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def sql_shape(sql):
+    """
+    Reduce a SQL statement to its shape: literals and `IN (...)` placeholder
+    lists are collapsed so that the same query issued for different rows
+    maps to the same string.
+    """
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PLACEHOLDER_LIST_RE.sub('(...)', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+
+def route_name(request):
+    """Stable label for the view that served `request`"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route or '<unnamed>'
+
+
+class QueryRecorder:
+    """`execute_wrapper` callable counting queries, DB time and SQL shapes"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated(self, limit=5):
+        """The most repeated query shapes that ran more than once"""
+        return [(shape, n) for shape, n in self.shapes.most_common(limit) if n > 1]
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.bytes = 0
+
+    def as_dict(self):
+        n = self.requests or 1
+        return {
+            'requests': self.requests,
+            'latency_histogram_ms': dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ['+Inf'], self.buckets)),
+            'avg_ms': round(self.total_ms / n, 3),
+            'avg_db_ms': round(self.db_ms / n, 3),
+            'avg_render_ms': round(self.render_ms / n, 3),
+            'avg_queries': round(self.queries / n, 2),
+            'max_queries': self.max_queries,
+            'avg_bytes': round(self.bytes / n),
+        }
+
+
+class StatsRegistry:
+    """Thread-safe per-route aggregates for the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, total_ms, db_ms, render_ms, queries, size):
+        bucket = len(LATENCY_BUCKETS_MS)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if total_ms <= bound:
+                bucket = index
+                break
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.requests += 1
+            stats.buckets[bucket] += 1
+            stats.total_ms += total_ms
+            stats.db_ms += db_ms
+            stats.render_ms += render_ms
+            stats.queries += queries
+            stats.max_queries = max(stats.max_queries, queries)
+            stats.bytes += size
+
+    def snapshot(self):
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+stats_registry = StatsRegistry()
+
+
+class QueryInstrumentationMiddleware:
+    """Record query count, DB/view/render time and response size per request"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_INSTRUMENTATION_SLOW_MS', 500)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._instrumentation = {'view_end': None, 'render_end': None}
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        marks = request._instrumentation
+        total_ms = (end - start) * 1000
+        db_ms = recorder.duration * 1000
+        render_ms = 0.0
+        if marks['view_end'] is not None and marks['render_end'] is not None:
+            render_ms = (marks['render_end'] - marks['view_end']) * 1000
+        size = 0 if response.streaming else len(response.content)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+            f'app;dur={max(total_ms - db_ms - render_ms, 0):.2f}',
+            f'render;dur={render_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+
+        route = route_name(request)
+        stats_registry.record(route, total_ms, db_ms, render_ms, recorder.count, size)
+
+        if total_ms >= self.slow_ms:
+            repeated = recorder.repeated()
+            logger.warning(
+                'Slow request %s %s (%s): %.1fms, %d queries in %.1fms%s',
+                request.method, request.path, route, total_ms, recorder.count, db_ms,
+                ''.join(f'\n  {n}x {shape}' for shape, n in repeated),
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF and TemplateResponse objects are rendered after this hook;
+        # time between here and the post-render callback is serialization.
+        marks = getattr(request, '_instrumentation', None)
+        if marks is not None:
+            marks['view_end'] = time.perf_counter()
+
+            def mark_rendered(rendered):
+                marks['render_end'] = time.perf_counter()
+                return rendered
+
+            response.add_post_render_callback(mark_rendered)
+        return response
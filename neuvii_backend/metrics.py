@@ -0,0 +1,234 @@
+"""
+Minimal Prometheus-style metrics registry.
+
+Counters and histograms live in process memory and are rendered in the
+Prometheus text exposition format by `metrics_view` (`/metrics`). Updating
+a metric is a dict lookup and an addition under a lock, so instrumenting a
+hot path costs well under a microsecond. Each worker process keeps its own
+values; scrape every worker (or run one per container) to get full counts.
+"""
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.functional import empty
+
+from .instrumentation import route_name
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {value}'
+
+
+class Histogram:
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', bound))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {series[-1]}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'neuvii_http_request_duration_seconds', 'Request latency by route and role', ['route', 'role']
+)
+REQUESTS = registry.counter(
+    'neuvii_http_requests_total', 'Requests by route, role and status code', ['route', 'role', 'status']
+)
+ASSIGNMENTS_CREATED = registry.counter(
+    'neuvii_assignments_created_total', 'Task assignments created'
+)
+EMAILS = registry.counter(
+    'neuvii_emails_total', 'Emails by kind and outcome (sent, failed, queued)', ['kind', 'status']
+)
+LOGIN_ATTEMPTS = registry.counter(
+    'neuvii_login_attempts_total', 'Login attempts by channel and outcome', ['channel', 'outcome']
+)
+CACHE_LOOKUPS = registry.counter(
+    'neuvii_cache_lookups_total', 'Cache lookups by cache and result (hit, miss)', ['cache', 'result']
+)
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_LOOKUPS.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+
+# Role names rarely change, so keep an id -> name map instead of loading
+# `user.role` (one query) on every request just to label a metric.
+_role_names = {}
+
+
+def _user_label(request):
+    """(label, None) when the user alone decides the role label, else (None, role id)"""
+    user = getattr(request, 'user', None)
+    if user is not None and getattr(user, '_wrapped', None) is empty:
+        # Async views resolve the user with request.auser() instead
+        user = getattr(request, '_acached_user', None)
+    if user is None:
+        return 'unknown', None
+    if not user.is_authenticated:
+        return 'anonymous', None
+    if user.is_superuser:
+        return 'superuser', None
+    role_id = getattr(user, 'role_id', None)
+    if role_id is None:
+        return 'none', None
+    return None, role_id
+
+
+def _role_label(request):
+    label, role_id = _user_label(request)
+    if label is not None:
+        return label
+    if role_id not in _role_names:
+        from users.models import Role
+        _role_names.update(Role.objects.values_list('id', 'name'))
+    return _role_names.get(role_id, 'unknown').lower()
+
+
+async def _arole_label(request):
+    label, role_id = _user_label(request)
+    if label is not None:
+        return label
+    if role_id not in _role_names:
+        from users.models import Role
+        _role_names.update([row async for row in Role.objects.values_list('id', 'name')])
+    return _role_names.get(role_id, 'unknown').lower()
+
+
+class MetricsMiddleware:
+    """Count requests and observe their latency by route and role"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start, _role_label(request))
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start, await _arole_label(request))
+        return response
+
+    def _observe(self, request, response, elapsed, role):
+        route = route_name(request)
+        REQUEST_LATENCY.observe(elapsed, route=route, role=role)
+        REQUESTS.inc(route=route, role=role, status=response.status_code)
+
+
+def metrics_view(request):
+    """Expose all metrics in the Prometheus text format"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    authorized = (
+        (token and request.headers.get('Authorization') == f'Bearer {token}')
+        or request.META.get('REMOTE_ADDR') in allowed_ips
+        or (request.user.is_authenticated and request.user.is_superuser)
+    )
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,122 @@
+"""
+N+1 query detection.
+
+`NPlusOneDetector` is an `execute_wrapper` that counts queries by shape (see
+`instrumentation.sql_shape`). When the same shape runs `NPLUSONE_THRESHOLD`
+times within one request (or one `detect_n_plus_one()` block) it records the
+first frame of project code that issued it, which is the `__str__`, property
+or serializer `source=` chain doing the lazy load.
+
+`NPlusOneMiddleware` applies the detector to every request, admin
+changelists included. It logs in development and raises `NPlusOneError`
+when `NPLUSONE_RAISE` is set, which `NPlusOneTestRunner` does for the test
+suite.
+"""
+import logging
+import os
+import re
+import traceback
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .instrumentation import sql_shape, route_name
+
+logger = logging.getLogger(__name__)
+
+# Shapes that legitimately repeat (transaction bookkeeping)
+DEFAULT_IGNORED_SHAPES = [r'^SAVEPOINT', r'^RELEASE SAVEPOINT', r'^ROLLBACK TO SAVEPOINT']
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def _call_site():
+    """First stack frame in project code outside this module and third-party packages"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and 'site-packages' not in filename
+            and os.path.dirname(filename) != os.path.dirname(__file__)
+        ):
+            return f'{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}'
+    return '<unknown>'
+
+
+class NPlusOneDetector:
+    """Track repeated identical-shape queries and the code that issued them"""
+
+    def __init__(self, threshold=None, ignored=None):
+        self.threshold = threshold or getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        patterns = ignored if ignored is not None else (
+            DEFAULT_IGNORED_SHAPES + list(getattr(settings, 'NPLUSONE_IGNORED_SHAPES', []))
+        )
+        self.ignored = [re.compile(p) for p in patterns]
+        self.counts = {}
+        # shape -> (count, call site) for shapes that crossed the threshold
+        self.violations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = sql_shape(sql)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count >= self.threshold and not any(p.search(shape) for p in self.ignored):
+            if shape in self.violations:
+                self.violations[shape] = (count, self.violations[shape][1])
+            else:
+                self.violations[shape] = (count, _call_site())
+        return execute(sql, params, many, context)
+
+    def report(self):
+        return '\n'.join(
+            f'  {count}x at {site}: {shape}'
+            for shape, (count, site) in sorted(self.violations.items(), key=lambda item: -item[1][0])
+        )
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, raise_error=True):
+    """
+    Context manager for tests and scripts:
+
+        with detect_n_plus_one():
+            client.get('/api/assignments/')
+    """
+    detector = NPlusOneDetector(threshold=threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(detector))
+        yield detector
+    if detector.violations and raise_error:
+        raise NPlusOneError(f'Repeated queries detected:\n{detector.report()}')
+
+
+class NPlusOneMiddleware:
+    """Run the detector for each request; log or raise depending on settings"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = NPlusOneDetector()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(detector))
+            response = self.get_response(request)
+
+        if detector.violations:
+            message = (
+                f'N+1 queries in {request.method} {request.path} ({route_name(request)}):\n'
+                f'{detector.report()}'
+            )
+            if getattr(settings, 'NPLUSONE_RAISE', False):
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
@@ -34,6 +34,21 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 AUTH_USER_MODEL = 'users.User'
+
+# Loads user and role in one query at login and on session restore
+AUTHENTICATION_BACKENDS = ['users.backends.EmailBackend']
+
+# The first hasher hashes new passwords; stored hashes made by any hasher
+# below it (or with another iteration count) are upgraded on next login.
+PASSWORD_HASHERS = [
+    'users.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# PBKDF2 work factor; unset uses Django's default for the installed version
+PASSWORD_HASH_ITERATIONS = int(os.environ['PASSWORD_HASH_ITERATIONS']) if 'PASSWORD_HASH_ITERATIONS' in os.environ else None
 # Application definition
 
 INSTALLED_APPS = [
@@ -47,17 +62,23 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "rest_framework_simplejwt",
+    "rest_framework_simplejwt.token_blacklist",
     "drf_yasg",
     "users",
     "therapy",
     "reports",
     "clinic",
     "api",
+    "jobs",
 
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "neuvii_backend.structured_logging.RequestIdMiddleware",
+    "neuvii_backend.metrics.MetricsMiddleware",
+    "neuvii_backend.instrumentation.QueryInstrumentationMiddleware",
+    "neuvii_backend.nplusone.NPlusOneMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -66,6 +87,26 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Prometheus scrape endpoint (/metrics). Open to superusers, to requests
+# carrying `Authorization: Bearer <METRICS_TOKEN>` and to the addresses in
+# METRICS_ALLOWED_IPS (comma-separated). Leave it empty behind a reverse
+# proxy: proxied requests all come from the proxy's address, so listing it
+# would make /metrics public; use the token instead.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+
+# Per-request query/timing instrumentation (Server-Timing headers and the
+# /instrumentation/ stats endpoint). Adds a little overhead to every query.
+REQUEST_INSTRUMENTATION_ENABLED = os.environ.get('REQUEST_INSTRUMENTATION', str(DEBUG)).lower() in ('1', 'true', 'yes')
+REQUEST_INSTRUMENTATION_SLOW_MS = 500
+
+# N+1 query detection: the same query shape repeated NPLUSONE_THRESHOLD times
+# in one request is logged (DEBUG) or raised (test suite, see TEST_RUNNER).
+NPLUSONE_ENABLED = DEBUG
+NPLUSONE_RAISE = False
+NPLUSONE_THRESHOLD = 5
+TEST_RUNNER = 'neuvii_backend.test_runner.NPlusOneTestRunner'
+
 ROOT_URLCONF = "neuvii_backend.urls"
 
 import os
@@ -150,7 +191,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -171,8 +212,62 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.CachedTokenRefreshSerializer',
 }
 
+# Refresh-token blacklist checks (api.blacklist): how stale the per-process
+# Bloom filter may be before it re-reads new blacklist rows, and its size.
+# Each sync re-reads rows from OVERLAP seconds before the last one, to catch
+# rows that committed late; tokens issued that recently are always checked
+# in the database. Prune expired tokens daily with `manage.py prune_tokens`.
+JWT_BLACKLIST_SYNC_SECONDS = 2
+JWT_BLACKLIST_SYNC_OVERLAP_SECONDS = 60
+JWT_BLACKLIST_FILTER_CAPACITY = 100_000
+
+# Seconds a cached user snapshot backs JWT-authenticated requests before the
+# user row is read again (api.authentication.CachedJWTAuthentication)
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# api.tokens.BufferedRefreshToken writes OutstandingToken rows in batches
+OUTSTANDING_TOKEN_BATCH_SIZE = 50
+OUTSTANDING_TOKEN_FLUSH_SECONDS = 5
+
+# How often each process checks whether its cached therapy catalog snapshot
+# (therapy.catalog, also behind the wizard typeahead) is out of date
+CATALOG_VERSION_CHECK_SECONDS = 1
+
+# Seconds a computed progress report (reports.progress) is served from the
+# cache before it is recomputed
+REPORTS_CACHE_SECONDS = 300
+
+# build_report_rollups leaves assignment events younger than this for its
+# next run, so transactions still in flight can't be skipped
+ROLLUP_SETTLE_SECONDS = 60
+
+# Printable reports (reports.rendering) still running after this long are
+# assumed lost with their worker and queued again, as are the reports a
+# crashed rendering process took down, up to MAX_ATTEMPTS claims in all
+REPORT_RENDER_TIMEOUT_SECONDS = 600
+REPORT_RENDER_MAX_ATTEMPTS = 3
+
+# Background jobs (jobs.queue), run by `manage.py runworker`. Failed jobs are
+# retried after JOB_RETRY_DELAY_SECONDS, doubling each time, until they have
+# made JOB_MAX_ATTEMPTS attempts; jobs running longer than
+# JOB_TIMEOUT_SECONDS are assumed lost with their worker. JOBS_EAGER=1 also
+# runs them in-process when the enqueuing transaction commits, for
+# development without a worker.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY_SECONDS = 30
+JOB_TIMEOUT_SECONDS = 600
+JOB_POLL_SECONDS = 1.0
+JOBS_EAGER = os.environ.get('JOBS_EAGER') == '1'
+
+# Serve the catalog lookups, profile, dashboard statistics and a parent's
+# children from async views (api.async_views, therapy.async_views) instead of
+# their sync versions. neuvii_backend.asgi turns it on, so one settings
+# module serves both the WSGI and the ASGI deployment.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
 # Swagger settings
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -208,6 +303,67 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'captainsparrow2814@gmail.com'
 EMAIL_HOST_PASSWORD = 'vmwp vymp jgso swdb'
 
+# Token-bucket throttles (neuvii_backend.throttling): "<burst>/<period>",
+# refilled evenly over the period. Login and reset limits bound the number of
+# password hashes an attacker can make us compute.
+THROTTLE_CACHE = 'default'
+THROTTLE_NUM_PROXIES = int(os.environ.get('THROTTLE_NUM_PROXIES', 0))
+THROTTLE_RATES = {
+    'login_ip': '30/min',
+    'login_email': '10/min',
+    'password_reset_ip': '20/min',
+    'password_reset_email': '5/min',
+    'password_change_user': '10/min',
+    'assign_tasks_user': '60/min',
+}
+
+# Logging: JSON lines (or plain text with LOG_FORMAT=text) written by a
+# background thread, tagged with the request id from RequestIdMiddleware.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {
+            '()': 'neuvii_backend.structured_logging.RequestIdFilter',
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'neuvii_backend.structured_logging.JsonFormatter',
+        },
+        'text': {
+            'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            '()': 'neuvii_backend.structured_logging.QueueingStreamHandler',
+            'formatter': LOG_FORMAT,
+            'filters': ['request_id'],
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Base URL used in links sent by email
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
+# Lifetime (seconds) of the signed password links in welcome emails
+PASSWORD_RESET_TIMEOUT = 7 * 24 * 60 * 60
+
 # Login/Logout URLs
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/admin/'
@@ -0,0 +1,143 @@
+"""
+Structured, non-blocking logging.
+
+* `RequestIdMiddleware` gives every request an id (taken from a valid
+  incoming `X-Request-ID` header or generated) and echoes it back; the id
+  is stored in a context variable so every log record emitted while
+  serving the request carries it.
+* `JsonFormatter` writes one JSON object per line, including any
+  `extra={...}` fields passed to the logging call.
+* `QueueingStreamHandler` only puts records on an in-memory queue; a
+  background `QueueListener` thread formats and writes them. Request
+  threads never wait on stdout/stderr, and records are dropped (and
+  counted) instead of blocking when the queue is full.
+
+Levels are gated by the `LOG_LEVEL` setting, so disabled `logger.debug()`
+calls cost a single level check.
+"""
+import contextvars
+import json
+import logging
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_request_id = contextvars.ContextVar('request_id', default='-')
+
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to each record"""
+
+    def filter(self, record):
+        # django.request logs the response after middleware has returned,
+        # but passes the request along
+        request = getattr(record, 'request', None)
+        record.request_id = getattr(request, 'request_id', None) or _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class QueueingStreamHandler(QueueHandler):
+    """
+    Hand records to a background thread that writes them to `stream`.
+    The formatter set on this handler is applied by the writer thread.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message now (its arguments may change after the call
+        # returns) but leave formatting and tracebacks to the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Flushes the queue; called by logging.shutdown() at exit
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+
+class RequestIdMiddleware:
+    """Bind a request id to the logging context and return it as X-Request-ID"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _read_request_id(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        return request_id
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_id = self._read_request_id(request)
+        token = _request_id.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+    async def __acall__(self, request):
+        request_id = self._read_request_id(request)
+        token = _request_id.set(request_id)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_id.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
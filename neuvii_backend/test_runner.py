@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+def _discard_outstanding_tokens():
+    # Buffered OutstandingToken rows name users of the test that issued them
+    from api.tokens import outstanding_tokens
+
+    outstanding_tokens.discard()
+
+
+def _isolating_tokens(resultclass):
+    class Result(resultclass):
+        def startTest(self, test):
+            _discard_outstanding_tokens()
+            super().startTest(test)
+
+    return Result
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Test runner that turns N+1 query warnings into failures: any request made
+    through the test client that repeats the same query shape
+    NPLUSONE_THRESHOLD times raises `NPlusOneError`.
+
+    Refresh tokens buffered by one test are dropped before the next, and
+    before the test databases go away (see api.tokens).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        _discard_outstanding_tokens()
+        self._nplusone_settings = (
+            getattr(settings, 'NPLUSONE_ENABLED', False),
+            getattr(settings, 'NPLUSONE_RAISE', False),
+        )
+        settings.NPLUSONE_ENABLED = True
+        settings.NPLUSONE_RAISE = True
+
+    def teardown_databases(self, old_config, **kwargs):
+        _discard_outstanding_tokens()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        _discard_outstanding_tokens()
+        settings.NPLUSONE_ENABLED, settings.NPLUSONE_RAISE = self._nplusone_settings
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        return _isolating_tokens(super().get_resultclass() or self.test_runner.resultclass)
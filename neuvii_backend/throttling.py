@@ -0,0 +1,146 @@
+"""
+Token-bucket throttling.
+
+Each scope in the THROTTLE_RATES setting ("login_ip": "20/min", ...) is a
+bucket that holds up to N tokens and refills at N per period. A request
+spends one token; an empty bucket means the request is refused with 429 and
+a Retry-After header before any expensive work (password hashing, bulk
+writes) happens.
+
+Buckets live in the Django cache (THROTTLE_CACHE alias) so all workers share
+them when the cache is shared. If the cache is unreachable, buckets fall
+back to process memory rather than failing open or erroring. Updates are
+read-modify-write without a lock, so concurrent requests may occasionally
+both spend the last token; the limit is approximate, never unbounded.
+
+`throttle()` wraps plain Django views; `api.throttling` adapts the same
+buckets to DRF's throttle classes.
+"""
+import functools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+THROTTLED = registry.counter('neuvii_throttled_requests_total', 'Requests refused by a throttle', ['scope'])
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'20/min' -> (20 tokens, 20 / 60 tokens per second)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+class _LocalBuckets:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            if len(self._data) > 100_000:
+                self._data.clear()
+            self._data[key] = value
+
+
+_local_buckets = _LocalBuckets()
+
+
+def _store():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def consume(scope, ident, cost=1):
+    """
+    Spend `cost` tokens from `scope`'s bucket for `ident`.
+
+    Returns (allowed, retry_after_seconds). Scopes without a configured rate
+    are not throttled.
+    """
+    rate = getattr(settings, 'THROTTLE_RATES', {}).get(scope)
+    if not rate or ident is None:
+        return True, 0
+    capacity, refill = parse_rate(rate)
+    key = f'throttle:{scope}:{ident}'
+    now = time.time()
+
+    store = _store()
+    try:
+        state = store.get(key)
+    except Exception:
+        logger.warning('Throttle cache unavailable; using process-local buckets', exc_info=True)
+        store = _local_buckets
+        state = store.get(key)
+
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+
+    # Keep the entry until the bucket would be full again
+    timeout = int((capacity - tokens) / refill) + 1
+    try:
+        store.set(key, (tokens, now), timeout)
+    except Exception:
+        _local_buckets.set(key, (tokens, now), timeout)
+
+    if allowed:
+        return True, 0
+    THROTTLED.inc(scope=scope)
+    return False, (cost - tokens) / refill
+
+
+def client_ip(request):
+    """REMOTE_ADDR, or the address THROTTLE_NUM_PROXIES hops back in X-Forwarded-For"""
+    num_proxies = getattr(settings, 'THROTTLE_NUM_PROXIES', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def normalized_email(value):
+    return (value or '').strip().lower() or None
+
+
+def throttle(scope, key=client_ip, methods=('POST',), json=False):
+    """
+    Throttle a Django view by `key(request)` (the client IP by default) for
+    the given HTTP methods. Refused requests get a 429 with Retry-After.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method in methods:
+                allowed, retry_after = consume(scope, key(request))
+                if not allowed:
+                    return too_many_requests(retry_after, json=json)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def too_many_requests(retry_after, json=False):
+    seconds = max(int(retry_after + 0.999), 1)
+    message = f'Too many attempts. Please try again in {seconds} seconds.'
+    if json:
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    response['Retry-After'] = str(seconds)
+    return response
@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
 from .admin_sites import neuvii_admin_site
+from .views import instrumentation_stats
+from .metrics import metrics_view
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -69,7 +71,10 @@ urlpatterns = [
     path("admin/", neuvii_admin_site.urls),
     path("auth/", include('users.urls')),
     path("therapy/", include('therapy.urls')),
+    path("api/reports/", include('reports.urls')),
     path("api/", include('api.urls')),
+    path("instrumentation/", instrumentation_stats, name='instrumentation_stats'),
+    path("metrics", metrics_view, name='metrics'),
     
     # Swagger/OpenAPI documentation
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -3,6 +3,10 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_protect
 from django import forms
+from django.conf import settings
+from django.http import JsonResponse
+
+from .instrumentation import stats_registry
 
 class LoginForm(forms.Form):
     username = forms.CharField(max_length=150)
@@ -12,3 +16,19 @@ class LoginForm(forms.Form):
 def custom_logout(request):
     logout(request)
     return redirect('custom-login')
+
+
+@login_required
+def instrumentation_stats(request):
+    """Per-route request statistics collected by QueryInstrumentationMiddleware"""
+    # Every role gets is_staff for the admin UI, so restrict to superusers
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    if request.method == 'POST' and request.POST.get('reset'):
+        stats_registry.reset()
+
+    return JsonResponse({
+        'enabled': getattr(settings, 'REQUEST_INSTRUMENTATION_ENABLED', False),
+        'routes': stats_registry.snapshot(),
+    })
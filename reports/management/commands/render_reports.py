@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import rendering
+
+
+class Command(BaseCommand):
+    help = 'Render queued printable reports (HTML/PDF) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Rendering processes')
+        parser.add_argument('--poll-seconds', type=float, default=2.0, help='Wait between checks for new jobs')
+        parser.add_argument('--once', action='store_true', help='Render the jobs queued now and exit')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError('--processes must be positive')
+
+        executor = rendering.executor(processes)
+        try:
+            while True:
+                requeued = rendering.requeue_stale()
+                if requeued:
+                    self.stdout.write(f'Requeued {requeued} stalled jobs')
+                # Claim a few jobs per process so the pool stays busy
+                jobs = rendering.claim(processes * 2)
+                if jobs:
+                    started = time.perf_counter()
+                    result = rendering.run(jobs, executor)
+                    self.stdout.write(
+                        f"Rendered {result['done']} reports, {result['failed']} failed "
+                        f"in {time.perf_counter() - started:.1f}s"
+                    )
+                    if result['broken']:
+                        self.stdout.write(
+                            f"A rendering process died; requeued {result['requeued']} jobs, restarting the pool"
+                        )
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = rendering.executor(processes)
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_seconds'])
+        finally:
+            executor.shutdown()
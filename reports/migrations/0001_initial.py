@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('clinic_id', models.BigIntegerField(blank=True, null=True)),
+                ('therapist_id', models.BigIntegerField()),
+                ('speech_area_id', models.BigIntegerField(blank=True, null=True)),
+                ('assigned', models.PositiveIntegerField(default=0)),
+                ('started', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('reopened', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['clinic_id', 'day'], name='reports_rollup_clinic_day_idx'), models.Index(fields=['therapist_id', 'day'], name='reports_rollup_therapist_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('child', 'Child'), ('therapist', 'Therapist'), ('clinic', 'Clinic')], max_length=20)),
+                ('subject_id', models.BigIntegerField()),
+                ('format', models.CharField(choices=[('html', 'HTML'), ('pdf', 'PDF')], default='pdf', max_length=10)),
+                ('weeks', models.PositiveSmallIntegerField()),
+                ('window', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('file', models.FileField(blank=True, upload_to='reports/%Y/%m/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='reports_render_status_idx')],
+            },
+        ),
+    ]
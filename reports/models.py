@@ -1,3 +1,79 @@
 from django.db import models
 
-# Create your models here.
+
+# Assignment events summed per clinic, therapist, speech area and UTC day by
+# reports.rollups.build(). Clinic and therapist reports read these rows plus
+# the few events not rolled up yet instead of scanning the event log.
+class DailyRollup(models.Model):
+    day = models.DateField()
+    # Copied from the events, like AssignmentEvent's own id columns
+    clinic_id = models.BigIntegerField(null=True, blank=True)
+    therapist_id = models.BigIntegerField()
+    speech_area_id = models.BigIntegerField(null=True, blank=True)
+    assigned = models.PositiveIntegerField(default=0)
+    started = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    reopened = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['clinic_id', 'day'], name='reports_rollup_clinic_day_idx'),
+            models.Index(fields=['therapist_id', 'day'], name='reports_rollup_therapist_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: clinic {self.clinic_id}, therapist {self.therapist_id}, area {self.speech_area_id}"
+
+
+# How far the rollups have got: every event with id <= last_event_id is
+# counted in DailyRollup. Locked while a chunk is applied so concurrent runs
+# never count an event twice.
+class RollupCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: event {self.last_event_id}"
+
+
+# A queued printable report. Created by the API, rendered by the
+# `render_reports` worker into `file` under MEDIA_ROOT.
+class RenderJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    FORMAT_CHOICES = [('html', 'HTML'), ('pdf', 'PDF')]
+    KIND_CHOICES = [('child', 'Child'), ('therapist', 'Therapist'), ('clinic', 'Clinic')]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    subject_id = models.BigIntegerField()
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='pdf')
+    weeks = models.PositiveSmallIntegerField()
+    window = models.PositiveSmallIntegerField()
+    requested_by = models.ForeignKey(
+        'users.User', on_delete=models.CASCADE, related_name='report_jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    # Times a worker claimed the job; it fails after REPORT_RENDER_MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+    file = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='reports_render_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.subject_id} {self.format} ({self.status})"
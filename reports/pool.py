@@ -0,0 +1,30 @@
+"""
+What runs in the report rendering processes (reports.rendering.executor).
+
+The processes unpickle these functions before django.setup() has run, so
+this module imports nothing that needs the app registry at module level.
+"""
+import django
+
+
+def setup():
+    django.setup()
+
+
+def pdf_available():
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def render(template, context, format):
+    """HTML or PDF bytes of `template` rendered with `context`"""
+    from django.template.loader import render_to_string
+
+    html = render_to_string(template, context)
+    if format == 'pdf':
+        from weasyprint import HTML
+        return HTML(string=html).write_pdf()
+    return html.encode('utf-8')
@@ -0,0 +1,216 @@
+"""
+Progress reports for a child, a therapist's caseload and a clinic.
+
+Each report combines three aggregates:
+
+- completion: assignments made and completed, and their ratio, overall and
+  per child or therapist;
+- speech areas: the same counts grouped on the task's speech area;
+- weekly trend: "assigned", "started" and net "completed" (completed minus
+  reopened) assignment events per ISO week (UTC, weeks starting Monday),
+  with net completions smoothed by a trailing rolling mean.
+
+A child's report is read from their own assignments and events. Therapist
+and clinic reports are read from the daily rollups (reports.rollups), so
+they count the event log: an assignment deleted after it was made still
+counts towards the history. The per-child caseload is one grouped query
+over the therapist's assignments.
+
+The rolling mean uses NumPy when it is installed and a running sum
+otherwise; both give the same numbers.
+
+Reports are cached for REPORTS_CACHE_SECONDS under a key per subject and
+parameters, and carry `generated_at` so clients can tell how fresh they are.
+"""
+from collections import deque
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from therapy.models import Assignment, AssignmentEvent, SpeechArea, TherapistProfile, Child
+
+from . import rollups
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 52
+DEFAULT_WINDOW = 4
+
+
+def _counts():
+    return {'assigned': Count('id'), 'completed': Count('id', filter=Q(completed=True))}
+
+
+def _with_rate(row):
+    return _rate(row['assigned'], row['completed'])
+
+
+def _event_rate(totals):
+    return _rate(totals[AssignmentEvent.ASSIGNED], totals[AssignmentEvent.COMPLETED] - totals[AssignmentEvent.REOPENED])
+
+
+def _rate(assigned, completed):
+    return {
+        'assigned': assigned,
+        'completed': completed,
+        'completion_rate': round(completed / assigned, 4) if assigned else None,
+    }
+
+
+def completion(assignments):
+    """Assigned/completed totals and completion rate of `assignments`"""
+    return _with_rate(assignments.aggregate(**_counts()))
+
+
+def completion_by(assignments, field):
+    """{`field` value: completion totals}, one GROUP BY over `assignments`"""
+    rows = assignments.order_by().values(field).annotate(**_counts())
+    return {row[field]: _with_rate(row) for row in rows}
+
+
+def speech_area_breakdown(totals):
+    """Rows for {speech area id: completion totals}, largest first"""
+    # Deactivated areas still name their past assignments
+    names = dict(SpeechArea.all_objects.filter(id__in=[pk for pk in totals if pk]).values_list('id', 'name'))
+    rows = [
+        {'speech_area_id': pk, 'speech_area': names.get(pk), **counts}
+        for pk, counts in totals.items()
+    ]
+    return sorted(rows, key=lambda row: (-row['assigned'], row['speech_area'] or ''))
+
+
+def rolling_mean(values, window):
+    """
+    Trailing mean of `values` over `window` items; the first window-1
+    items average what is available so far.
+    """
+    if not values:
+        return []
+    if numpy is not None:
+        array = numpy.asarray(values, dtype=float)
+        sums = numpy.cumsum(array)
+        sums[window:] = sums[window:] - sums[:-window]
+        counts = numpy.minimum(numpy.arange(1, len(array) + 1), window)
+        return [round(float(value), 2) for value in sums / counts]
+
+    means, recent, total = [], deque(), 0
+    for value in values:
+        recent.append(value)
+        total += value
+        if len(recent) > window:
+            total -= recent.popleft()
+        means.append(round(total / len(recent), 2))
+    return means
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def trend_start(weeks, today=None):
+    """First day of the oldest of the last `weeks` weeks"""
+    today = today or timezone.now().astimezone(dt_timezone.utc).date()
+    return week_start(today) - timedelta(weeks=weeks - 1)
+
+
+def weekly_trend(counts, first, weeks=DEFAULT_WEEKS, window=DEFAULT_WINDOW):
+    """
+    `weeks` weeks of {(week,): {kind: n}} event counts from `first`, oldest
+    first, including weeks without events. `completed` is net of reopened
+    assignments; `rolling_completed` is its trailing mean over `window`
+    weeks.
+    """
+    starts = [first + timedelta(weeks=offset) for offset in range(weeks)]
+    empty = dict.fromkeys(rollups.KINDS, 0)
+    totals = [counts.get((start,), empty) for start in starts]
+    completed = [week[AssignmentEvent.COMPLETED] - week[AssignmentEvent.REOPENED] for week in totals]
+    rolling = rolling_mean(completed, window)
+    return [
+        {
+            'week': start.isoformat(),
+            'assigned': week[AssignmentEvent.ASSIGNED],
+            'started': week[AssignmentEvent.STARTED],
+            'completed': completed[index],
+            'rolling_completed': rolling[index],
+        }
+        for index, (start, week) in enumerate(zip(starts, totals))
+    ]
+
+
+def child_report(child, weeks=DEFAULT_WEEKS, window=DEFAULT_WINDOW):
+    assignments = Assignment.objects.filter(child_id=child.pk)
+    first = trend_start(weeks)
+    events = AssignmentEvent.objects.filter(child_id=child.pk, created_at__gte=rollups.midnight(first))
+    return {
+        'child': {'id': child.pk, 'name': child.name},
+        'completion': completion(assignments),
+        'speech_areas': speech_area_breakdown(completion_by(assignments, 'task__speech_area_id')),
+        'weekly': weekly_trend(rollups.event_counts(events, ('week',)), first, weeks, window),
+    }
+
+
+def _rollup_report(weeks, window, last_id, **scope):
+    first = trend_start(weeks)
+    overall = rollups.counts(last_id=last_id, **scope).get((), dict.fromkeys(rollups.KINDS, 0))
+    areas = rollups.counts(('speech_area_id',), last_id=last_id, **scope)
+    return {
+        'completion': _event_rate(overall),
+        'speech_areas': speech_area_breakdown({key[0]: _event_rate(totals) for key, totals in areas.items()}),
+        'weekly': weekly_trend(rollups.counts(('week',), since=first, last_id=last_id, **scope), first, weeks, window),
+    }
+
+
+def therapist_report(therapist, weeks=DEFAULT_WEEKS, window=DEFAULT_WINDOW):
+    """A therapist's caseload: their assignments overall and per child"""
+    report = _rollup_report(weeks, window, rollups.checkpoint(), therapist_id=therapist.pk)
+    per_child = completion_by(Assignment.objects.filter(therapist_id=therapist.pk), 'child_id')
+    names = dict(Child.objects.filter(id__in=per_child).values_list('id', 'name'))
+    report['children'] = sorted(
+        ({'child_id': pk, 'name': names.get(pk), **counts} for pk, counts in per_child.items()),
+        key=lambda row: (row['completion_rate'] or 0, row['name'] or ''),
+    )
+    return {'therapist': {'id': therapist.pk, 'name': f"{therapist.first_name} {therapist.last_name}"}, **report}
+
+
+def clinic_report(clinic, weeks=DEFAULT_WEEKS, window=DEFAULT_WINDOW):
+    """A clinic's assignments overall and per therapist"""
+    last_id = rollups.checkpoint()
+    report = _rollup_report(weeks, window, last_id, clinic_id=clinic.pk)
+    per_therapist = {
+        key[0]: _event_rate(totals)
+        for key, totals in rollups.counts(('therapist_id',), last_id=last_id, clinic_id=clinic.pk).items()
+    }
+    names = {
+        pk: f"{first_name} {last_name}"
+        for pk, first_name, last_name in TherapistProfile.objects.filter(id__in=per_therapist)
+        .values_list('id', 'first_name', 'last_name')
+    }
+    report['therapists'] = sorted(
+        ({'therapist_id': pk, 'name': names.get(pk), **counts} for pk, counts in per_therapist.items()),
+        key=lambda row: (row['completion_rate'] or 0, row['name'] or ''),
+    )
+    return {'clinic': {'id': clinic.pk, 'name': clinic.name}, **report}
+
+
+REPORTS = {
+    'child': child_report,
+    'therapist': therapist_report,
+    'clinic': clinic_report,
+}
+
+
+def get_report(kind, subject, weeks=DEFAULT_WEEKS, window=DEFAULT_WINDOW):
+    """The `kind` report for `subject`, from the cache when fresh enough"""
+    key = f'reports:{kind}:{subject.pk}:{weeks}:{window}'
+    report = cache.get(key)
+    if report is None:
+        report = {**REPORTS[kind](subject, weeks, window), 'generated_at': timezone.now().isoformat()}
+        cache.set(key, report, getattr(settings, 'REPORTS_CACHE_SECONDS', 300))
+    return report
@@ -0,0 +1,181 @@
+"""
+Printable progress reports, rendered off the request path.
+
+The API only records a `RenderJob`. The `render_reports` worker claims
+queued jobs, builds each report's aggregates (reports.progress, so the
+cached report and the rollups are reused) and hands the plain data to a
+process pool (reports.pool), which renders the HTML and, for PDFs, runs
+WeasyPrint. Only the worker's main process touches the database; the pool
+processes get picklable dicts and return bytes, which the worker stores
+under MEDIA_ROOT.
+
+Claiming marks jobs running with a conditional UPDATE, locking the queued
+rows with SKIP LOCKED where the database supports it, so several workers
+never render the same job. Jobs left running longer than
+REPORT_RENDER_TIMEOUT_SECONDS (a worker died) are queued again. When a pool
+process dies the pool is broken: its unfinished jobs are queued again and
+the worker starts a new pool. A job claimed REPORT_RENDER_MAX_ATTEMPTS times
+fails instead, so one report that crashes the renderer can't loop forever.
+
+PDF output needs WeasyPrint installed; without it only HTML can be
+requested.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from clinic.models import Clinic
+from therapy.models import Child, TherapistProfile
+
+from .models import RenderJob
+from .pool import pdf_available, render, setup
+from .progress import get_report
+
+SUBJECTS = {'child': Child, 'therapist': TherapistProfile, 'clinic': Clinic}
+# Per-row breakdown each kind of report has, and its heading
+BREAKDOWNS = {'therapist': ('children', 'Child'), 'clinic': ('therapists', 'Therapist')}
+TEMPLATE = 'reports/progress_report.html'
+
+
+def context_for(job, report):
+    """Picklable template context for `report`"""
+    subject = report[job.kind]
+    weekly = report['weekly']
+    peak = max([week['assigned'] for week in weekly] + [max(week['completed'], 0) for week in weekly] + [1])
+    field, label = BREAKDOWNS.get(job.kind, (None, None))
+    return {
+        'title': f"Progress report: {subject['name']}",
+        'kind': job.get_kind_display(),
+        'subject': subject,
+        'report': report,
+        'weekly': [
+            {**week, 'assigned_bar': round(100 * week['assigned'] / peak),
+             'completed_bar': round(100 * max(week['completed'], 0) / peak)}
+            for week in weekly
+        ],
+        'breakdown': report.get(field, []),
+        'breakdown_label': label,
+        'window': job.window,
+    }
+
+
+def claim(limit):
+    """Mark up to `limit` queued jobs running and return them, oldest first"""
+    with transaction.atomic():
+        queued = RenderJob.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        ).filter(status=RenderJob.QUEUED).order_by('id')
+        ids = list(queued.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        now = timezone.now()
+        # Conditional, so without row locks a job still goes to one worker
+        RenderJob.objects.filter(id__in=ids, status=RenderJob.QUEUED).update(
+            status=RenderJob.RUNNING, started_at=now, attempts=F('attempts') + 1
+        )
+        return list(RenderJob.objects.filter(id__in=ids, status=RenderJob.RUNNING, started_at=now).order_by('id'))
+
+
+def _max_attempts():
+    return getattr(settings, 'REPORT_RENDER_MAX_ATTEMPTS', 3)
+
+
+def requeue_stale():
+    timeout = getattr(settings, 'REPORT_RENDER_TIMEOUT_SECONDS', 600)
+    stale = RenderJob.objects.filter(
+        status=RenderJob.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=_max_attempts()).update(
+        status=RenderJob.FAILED, error='Rendering did not finish', finished_at=timezone.now()
+    )
+    return stale.update(status=RenderJob.QUEUED, started_at=None)
+
+
+def retry(job, error):
+    """Queue `job` again after `error`, unless it has used up its attempts"""
+    if job.attempts >= _max_attempts():
+        finish(job, error=error)
+        return
+    job.status = RenderJob.QUEUED
+    job.started_at = None
+    job.save(update_fields=['status', 'started_at'])
+
+
+def prepare(job):
+    """The template context for `job`, read from the database"""
+    subject = SUBJECTS[job.kind].objects.filter(pk=job.subject_id).first()
+    if subject is None:
+        raise LookupError(f'{job.get_kind_display()} {job.subject_id} no longer exists')
+    return context_for(job, get_report(job.kind, subject, job.weeks, job.window))
+
+
+def finish(job, content=None, error=None):
+    job.finished_at = timezone.now()
+    if error is None:
+        job.file.save(f'{job.kind}-{job.subject_id}-{job.pk}.{job.format}', ContentFile(content), save=False)
+        job.status = RenderJob.DONE
+    else:
+        job.status = RenderJob.FAILED
+        job.error = error
+    job.save(update_fields=['status', 'file', 'error', 'finished_at'])
+
+
+def run(jobs, executor):
+    """
+    Render `jobs` on `executor` (a process pool) and store the results.
+    Returns {'done', 'failed', 'requeued', 'broken'}; once the pool is
+    broken the caller has to replace it.
+    """
+    pending = []
+    broken = False
+    for job in jobs:
+        if job.format == 'pdf' and not pdf_available():
+            finish(job, error='PDF reports need WeasyPrint installed')
+            continue
+        try:
+            context = prepare(job)
+        except LookupError as error:
+            finish(job, error=str(error))
+            continue
+        try:
+            pending.append((job, executor.submit(render, TEMPLATE, context, job.format)))
+        except BrokenProcessPool:
+            broken = True
+            retry(job, error='The rendering process pool stopped')
+
+    for job, future in pending:
+        try:
+            content = future.result()
+        except BrokenProcessPool:
+            # A pool process died (killed, out of memory) and took every
+            # unfinished job with it; which one caused it is unknown
+            broken = True
+            retry(job, error='A rendering process died')
+        except Exception as error:
+            finish(job, error=f'{type(error).__name__}: {error}')
+        else:
+            finish(job, content)
+    return {
+        'done': sum(job.status == RenderJob.DONE for job in jobs),
+        'failed': sum(job.status == RenderJob.FAILED for job in jobs),
+        'requeued': sum(job.status == RenderJob.QUEUED for job in jobs),
+        'broken': broken,
+    }
+
+
+def executor(processes):
+    """
+    A process pool for pool.render(). Its processes start from a clean
+    interpreter (forkserver or spawn), never a fork of the worker, so they
+    can't inherit its database connections.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=setup)
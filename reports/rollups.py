@@ -0,0 +1,195 @@
+"""
+Daily rollups of the assignment event log.
+
+`build()` walks `AssignmentEvent` in id ranges past the checkpoint. Each
+chunk is counted per (clinic, therapist, speech area, UTC day) with one
+GROUP BY, added to the matching `DailyRollup` rows, and the checkpoint
+advanced, all in one transaction with the checkpoint row locked. Events are
+append-only, so a run is idempotent (a finished range is never counted
+again), resumable (an interrupted run continues after the last committed
+chunk) and safe to run alongside another one. Run it nightly and every few
+minutes to keep today's rows current; `rebuild()` starts over.
+
+Events younger than ROLLUP_SETTLE_SECONDS are left for the next run: ids
+are handed out before a transaction commits, so a newer id can be visible
+while an older one is still in flight.
+
+`counts()` is what reports read: the rollup rows plus the events past the
+checkpoint, so answers stay exact between runs.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from therapy.models import AssignmentEvent
+
+from .models import DailyRollup, RollupCheckpoint
+
+CHECKPOINT = 'assignment_events'
+KEY = ('clinic_id', 'therapist_id', 'speech_area_id', 'day')
+KINDS = [kind for kind, _ in AssignmentEvent.KIND_CHOICES]
+
+
+def checkpoint():
+    """Id of the last event counted in the rollups"""
+    return RollupCheckpoint.objects.filter(name=CHECKPOINT).values_list('last_event_id', flat=True).first() or 0
+
+
+def midnight(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _grouped(rows, group, count_rows):
+    """{group values: {kind: n}} from (group fields..., counts) rows"""
+    counts = {}
+    for row in rows:
+        key = tuple(_day(row[field]) if field in ('day', 'week') else row[field] for field in group)
+        totals = counts.setdefault(key, dict.fromkeys(KINDS, 0))
+        count_rows(row, totals)
+    return counts
+
+
+def event_counts(events, group=()):
+    """{group values: {kind: n}} over `events`; group by any event column, 'day' or 'week' (UTC)"""
+    derived = {
+        'day': TruncDate('created_at', tzinfo=dt_timezone.utc),
+        # UTC matches the connection time zone, so no CONVERT_TZ on MySQL
+        'week': TruncWeek('created_at', tzinfo=dt_timezone.utc),
+    }
+    rows = (
+        events.order_by()
+        .annotate(**{field: derived[field] for field in group if field in derived})
+        .values(*group, 'kind')
+        .annotate(total=Count('id'))
+    )
+
+    def add(row, totals):
+        totals[row['kind']] += row['total']
+
+    return _grouped(rows, group, add)
+
+
+def rollup_counts(rollups, group=()):
+    """Same as event_counts() over DailyRollup rows"""
+    sums = {f'{kind}_total': Sum(kind) for kind in KINDS}
+    if not group:
+        # values() without fields would group by every column
+        row = rollups.aggregate(**sums)
+        rows = [row] if row['assigned_total'] is not None else []
+    else:
+        derived = {'week': TruncWeek('day')}
+        rows = (
+            rollups.order_by()
+            .annotate(**{field: derived[field] for field in group if field in derived})
+            .values(*group)
+            .annotate(**sums)
+        )
+
+    def add(row, totals):
+        for kind in KINDS:
+            totals[kind] += row[f'{kind}_total'] or 0
+
+    return _grouped(rows, group, add)
+
+
+def counts(group=(), since=None, last_id=None, **scope):
+    """
+    {group values: {kind: n}} for the events matching `scope` (clinic_id,
+    therapist_id and/or speech_area_id), from the rollups plus the events
+    after the checkpoint. `since` (a date) drops earlier days; pass
+    `last_id` (from checkpoint()) to read several counts at the same point.
+    """
+    if last_id is None:
+        last_id = checkpoint()
+    rollups = DailyRollup.objects.filter(**scope)
+    events = AssignmentEvent.objects.filter(id__gt=last_id, **scope)
+    if since is not None:
+        rollups = rollups.filter(day__gte=since)
+        events = events.filter(created_at__gte=midnight(since))
+
+    merged = rollup_counts(rollups, group)
+    for key, totals in event_counts(events, group).items():
+        target = merged.setdefault(key, dict.fromkeys(KINDS, 0))
+        for kind, total in totals.items():
+            target[kind] += total
+    return merged
+
+
+def _apply_chunk(low, high):
+    """Add the events with low < id <= high to the rollups; returns (events, rows written)"""
+    added = event_counts(AssignmentEvent.objects.filter(id__gt=low, id__lte=high), KEY)
+    if not added:
+        return 0, 0
+
+    days = {key[-1] for key in added}
+    therapists = {key[1] for key in added}
+    existing = {
+        tuple(getattr(row, field) for field in KEY): row
+        for row in DailyRollup.objects.filter(day__in=days, therapist_id__in=therapists)
+    }
+    created, updated = [], []
+    for key, totals in added.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(DailyRollup(**dict(zip(KEY, key)), **totals))
+            continue
+        for kind, total in totals.items():
+            setattr(row, kind, getattr(row, kind) + total)
+        updated.append(row)
+
+    DailyRollup.objects.bulk_create(created, batch_size=1000)
+    DailyRollup.objects.bulk_update(updated, KINDS, batch_size=1000)
+    return sum(sum(totals.values()) for totals in added.values()), len(created) + len(updated)
+
+
+def build(chunk_size=10000, max_chunks=None, settle_seconds=None):
+    """
+    Roll up the events past the checkpoint, one transaction per id range of
+    `chunk_size`. Stops after `max_chunks` chunks when given. Returns
+    {'chunks', 'events', 'rows', 'checkpoint'}.
+    """
+    if settle_seconds is None:
+        settle_seconds = getattr(settings, 'ROLLUP_SETTLE_SECONDS', 60)
+    settled = timezone.now() - timedelta(seconds=settle_seconds)
+    high = AssignmentEvent.objects.filter(created_at__lt=settled).aggregate(high=Max('id'))['high'] or 0
+    # Never past the oldest unsettled event
+    newest = AssignmentEvent.objects.filter(created_at__gte=settled).order_by('id').values_list('id', flat=True).first()
+    if newest is not None:
+        high = min(high, newest - 1)
+
+    RollupCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    result = {'chunks': 0, 'events': 0, 'rows': 0}
+    while max_chunks is None or result['chunks'] < max_chunks:
+        with transaction.atomic():
+            state = RollupCheckpoint.objects.select_for_update().get(name=CHECKPOINT)
+            low = state.last_event_id
+            if low >= high:
+                break
+            upper = min(low + chunk_size, high)
+            events, rows = _apply_chunk(low, upper)
+            state.last_event_id = upper
+            state.save(update_fields=['last_event_id', 'updated_at'])
+        result['chunks'] += 1
+        result['events'] += events
+        result['rows'] += rows
+    result['checkpoint'] = checkpoint()
+    return result
+
+
+def rebuild(chunk_size=10000, max_chunks=None, settle_seconds=None):
+    """Drop every rollup row and build them again from the first event"""
+    with transaction.atomic():
+        state, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+        DailyRollup.objects.all().delete()
+        state.last_event_id = 0
+        state.save(update_fields=['last_event_id', 'updated_at'])
+    return build(chunk_size, max_chunks, settle_seconds)
+
@@ -0,0 +1,39 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import RenderJob
+from .progress import DEFAULT_WEEKS, DEFAULT_WINDOW, MAX_WEEKS
+from .pool import pdf_available
+
+
+class RenderJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RenderJob
+        fields = [
+            'id', 'kind', 'subject_id', 'format', 'weeks', 'window', 'status', 'error',
+            'created_at', 'started_at', 'finished_at', 'download_url',
+        ]
+        read_only_fields = ['id', 'status', 'error', 'created_at', 'started_at', 'finished_at']
+        extra_kwargs = {
+            'weeks': {'required': False, 'min_value': 1, 'max_value': MAX_WEEKS},
+            'window': {'required': False, 'min_value': 1},
+        }
+
+    def get_download_url(self, obj):
+        if obj.status != RenderJob.DONE:
+            return None
+        return reverse('api_report_render_download', args=[obj.pk])
+
+    def validate_format(self, value):
+        if value == 'pdf' and not pdf_available():
+            raise serializers.ValidationError('PDF reports need WeasyPrint installed; use html instead.')
+        return value
+
+    def validate(self, attrs):
+        # PDF when this install can render it
+        attrs.setdefault('format', 'pdf' if pdf_available() else 'html')
+        attrs.setdefault('weeks', DEFAULT_WEEKS)
+        attrs['window'] = min(attrs.get('window', DEFAULT_WINDOW), attrs['weeks'])
+        return attrs
@@ -1,3 +1,132 @@
-from django.test import TestCase
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from therapy.models import AssignmentEvent
+
+from . import rendering, rollups
+from .models import DailyRollup, RenderJob
+from .pool import pdf_available
+from .serializers import RenderJobSerializer
+
+
+def event(kind, days_ago, therapist_id=1, clinic_id=1, speech_area_id=1, assignment_id=1):
+    return AssignmentEvent(
+        kind=kind, created_at=timezone.now() - timedelta(days=days_ago, hours=1),
+        assignment_id=assignment_id, child_id=1, task_id=1,
+        therapist_id=therapist_id, clinic_id=clinic_id, speech_area_id=speech_area_id,
+    )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        AssignmentEvent.objects.bulk_create([
+            event(AssignmentEvent.ASSIGNED, 3),
+            event(AssignmentEvent.ASSIGNED, 3, assignment_id=2),
+            event(AssignmentEvent.COMPLETED, 2),
+            event(AssignmentEvent.REOPENED, 1),
+            event(AssignmentEvent.ASSIGNED, 1, therapist_id=2, clinic_id=2),
+        ])
+
+    def totals(self, **scope):
+        return rollups.counts(**scope).get((), dict.fromkeys(rollups.KINDS, 0))
+
+    def test_build_counts_each_event_once(self):
+        result = rollups.build(settle_seconds=0)
+        self.assertEqual((result['events'], result['checkpoint']), (5, AssignmentEvent.objects.latest('id').id))
+        self.assertEqual(DailyRollup.objects.count(), 4)
+        self.assertEqual(
+            self.totals(clinic_id=1), {'assigned': 2, 'started': 0, 'completed': 1, 'reopened': 1}
+        )
+
+        self.assertEqual(rollups.build(settle_seconds=0)['events'], 0)
+        self.assertEqual(self.totals()['assigned'], 3)
+
+    def test_chunked_build_matches_a_single_pass(self):
+        rollups.build(chunk_size=2, settle_seconds=0)
+        chunked = rollups.counts(group=('therapist_id', 'day'))
+        rollups.rebuild(settle_seconds=0)
+        self.assertEqual(rollups.counts(group=('therapist_id', 'day')), chunked)
+
+    def test_counts_include_events_past_the_checkpoint(self):
+        rollups.build(settle_seconds=0)
+        AssignmentEvent.objects.bulk_create([event(AssignmentEvent.COMPLETED, 0, assignment_id=2)])
+
+        self.assertEqual(self.totals(clinic_id=1)['completed'], 2)
+        by_day = rollups.counts(group=('day',), since=timezone.now().date() - timedelta(days=1), clinic_id=1)
+        self.assertEqual(sum(totals['completed'] for totals in by_day.values()), 1)
+
+    def test_unsettled_events_wait_for_the_next_run(self):
+        AssignmentEvent.objects.bulk_create([event(AssignmentEvent.STARTED, 0)])
+        AssignmentEvent.objects.filter(kind=AssignmentEvent.STARTED).update(created_at=timezone.now())
+
+        self.assertEqual(rollups.build(settle_seconds=60)['events'], 5)
+        self.assertEqual(self.totals(clinic_id=1)['started'], 1)
+
+
+class BrokenExecutor:
+    """A process pool one of whose processes died"""
+
+    def submit(self, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+        return future
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), REPORT_RENDER_MAX_ATTEMPTS=2)
+class RenderJobTests(TestCase):
+    def setUp(self):
+        from api.benchmark import build_fixtures
+        self.fixtures = build_fixtures(1, 1, 1, 2)
+
+    def queue(self, **fields):
+        return RenderJob.objects.create(**{
+            'kind': 'child', 'subject_id': self.fixtures.child.pk, 'format': 'html', 'weeks': 4, 'window': 2,
+            'requested_by': self.fixtures.users['parent'], **fields,
+        })
+
+    def test_format_defaults_to_one_this_install_can_render(self):
+        serializer = RenderJobSerializer(data={'kind': 'child', 'subject_id': self.fixtures.child.pk})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['format'], 'pdf' if pdf_available() else 'html')
+
+    def test_claimed_jobs_render_to_files(self):
+        job = self.queue()
+        self.queue(subject_id=0)
+
+        with ThreadPoolExecutor(1) as executor:
+            result = rendering.run(rendering.claim(10), executor)
+
+        self.assertEqual(result, {'done': 1, 'failed': 1, 'requeued': 0, 'broken': False})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (RenderJob.DONE, 1))
+        self.assertIn(self.fixtures.child.name.encode(), job.file.read())
+        self.assertEqual(rendering.claim(10), [])
+
+    def test_broken_pool_requeues_jobs_until_attempts_run_out(self):
+        job = self.queue()
+
+        result = rendering.run(rendering.claim(10), BrokenExecutor())
+        self.assertEqual(result, {'done': 0, 'failed': 0, 'requeued': 1, 'broken': True})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.started_at), (RenderJob.QUEUED, None))
+
+        rendering.run(rendering.claim(10), BrokenExecutor())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (RenderJob.FAILED, 2))
+        self.assertEqual(job.error, 'A rendering process died')
+
+    def test_stale_jobs_are_requeued_or_failed(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        retried = self.queue(status=RenderJob.RUNNING, started_at=long_ago, attempts=1)
+        exhausted = self.queue(status=RenderJob.RUNNING, started_at=long_ago, attempts=2)
+
+        self.assertEqual(rendering.requeue_stale(), 1)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retried.status, RenderJob.QUEUED)
+        self.assertEqual(exhausted.status, RenderJob.FAILED)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('', views.ReportIndexAPIView.as_view(), name='api_reports'),
+    path('children/<int:pk>/', views.ChildReportAPIView.as_view(), name='api_child_report'),
+    path('therapists/<int:pk>/', views.TherapistReportAPIView.as_view(), name='api_therapist_report'),
+    path('clinics/<int:pk>/', views.ClinicReportAPIView.as_view(), name='api_clinic_report'),
+    path('renders/', views.RenderJobListAPIView.as_view(), name='api_report_renders'),
+    path('renders/<int:pk>/', views.RenderJobDetailAPIView.as_view(), name='api_report_render_detail'),
+    path('renders/<int:pk>/download/', views.RenderJobDownloadAPIView.as_view(), name='api_report_render_download'),
+]
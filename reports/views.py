@@ -1,3 +1,166 @@
-from django.shortcuts import render
+from django.db.models import Q
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from clinic.models import Clinic
+from therapy.models import TherapistProfile, Child, Assignment
+
+from .models import RenderJob
+from .progress import get_report, DEFAULT_WEEKS, DEFAULT_WINDOW, MAX_WEEKS
+from .serializers import RenderJobSerializer
+
+
+def _role(user):
+    return getattr(getattr(user, "role", None), "name", "").lower()
+
+
+# Subjects each role may report on: clinic admins their clinic, its
+# therapists and children; therapists themselves and the children they are
+# assigned to or have assigned tasks to; parents their own children.
+def _clinics_for(user):
+    if user.is_superuser:
+        return Clinic.objects.all()
+    if _role(user) == "clinic admin":
+        return Clinic.objects.filter(clinic_admin=user)
+    return Clinic.objects.none()
+
+
+def _therapists_for(user):
+    if user.is_superuser:
+        return TherapistProfile.objects.all()
+    role = _role(user)
+    if role == "clinic admin":
+        return TherapistProfile.objects.filter(clinic__clinic_admin=user)
+    elif role == "therapist":
+        return TherapistProfile.objects.filter(email=user.email)
+    return TherapistProfile.objects.none()
+
+
+def _children_for(user):
+    if user.is_superuser:
+        return Child.objects.all()
+    role = _role(user)
+    if role == "clinic admin":
+        return Child.objects.filter(clinic__clinic_admin=user)
+    elif role == "therapist":
+        assigned = Assignment.objects.filter(therapist__email=user.email).values('child_id')
+        return Child.objects.filter(Q(assigned_therapist__email=user.email) | Q(id__in=assigned))
+    elif role == "parent":
+        return Child.objects.filter(parent__parent_email=user.email)
+    return Child.objects.none()
+
+
+class ReportIndexAPIView(APIView):
+    """
+    The clinics, therapists and (except for clinic-wide roles) children the
+    user can get reports for
+    """
+    def get(self, request):
+        user = request.user
+        index = {
+            'clinics': list(_clinics_for(user).order_by('name').values('id', 'name')),
+            'therapists': [
+                {'id': pk, 'name': f"{first_name} {last_name}"}
+                for pk, first_name, last_name in _therapists_for(user).order_by('last_name', 'first_name')
+                .values_list('id', 'first_name', 'last_name')
+            ],
+        }
+        if not user.is_superuser and _role(user) != "clinic admin":
+            index['children'] = list(_children_for(user).order_by('name').values('id', 'name'))
+        return Response(index)
+
+
+SUBJECTS_FOR = {'child': _children_for, 'therapist': _therapists_for, 'clinic': _clinics_for}
+
+
+class ReportAPIView(APIView):
+    """
+    Progress report: completion totals, per speech area and per week.
+
+    ?weeks=    weeks of trend to return (default 12, max 52)
+    ?window=   weeks averaged by the rolling completion mean (default 4)
+
+    Reports are cached for a few minutes; `generated_at` says when this one
+    was computed.
+    """
+    kind = None
+
+    def get_queryset(self):
+        return SUBJECTS_FOR[self.kind](self.request.user)
+
+    def get(self, request, pk):
+        subject = get_object_or_404(self.get_queryset(), pk=pk)
+        try:
+            weeks = min(max(int(request.query_params.get('weeks', DEFAULT_WEEKS)), 1), MAX_WEEKS)
+            window = min(max(int(request.query_params.get('window', DEFAULT_WINDOW)), 1), weeks)
+        except ValueError:
+            return Response({'error': 'weeks and window must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_report(self.kind, subject, weeks, window))
+
+
+class ChildReportAPIView(ReportAPIView):
+    """Progress of one child across all their assignments"""
+    kind = 'child'
+
+
+class TherapistReportAPIView(ReportAPIView):
+    """A therapist's caseload: their assignments overall, per child and per week"""
+    kind = 'therapist'
+
+
+class ClinicReportAPIView(ReportAPIView):
+    """A clinic's assignments overall, per therapist and per week"""
+    kind = 'clinic'
+
+
+def _render_jobs(user):
+    if user.is_superuser:
+        return RenderJob.objects.all()
+    return RenderJob.objects.filter(requested_by=user)
+
+
+class RenderJobListAPIView(generics.ListCreateAPIView):
+    """
+    The user's printable report jobs, newest first, or queue a new one:
+    {"kind": "child" | "therapist" | "clinic", "subject_id": ..., "format":
+    "pdf" | "html", "weeks": ..., "window": ...}. Without "format" the
+    report is a PDF if WeasyPrint is installed, else HTML. Jobs are
+    rendered by the `render_reports` worker; poll the job until its status
+    is "done", then fetch download_url.
+    """
+    serializer_class = RenderJobSerializer
+
+    def get_queryset(self):
+        return _render_jobs(self.request.user).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind = serializer.validated_data['kind']
+        if not SUBJECTS_FOR[kind](request.user).filter(pk=serializer.validated_data['subject_id']).exists():
+            return Response({'error': f'No {kind} report available for this id'}, status=status.HTTP_404_NOT_FOUND)
+        serializer.save(requested_by=request.user)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class RenderJobDetailAPIView(generics.RetrieveAPIView):
+    """Status of one report job"""
+    serializer_class = RenderJobSerializer
+
+    def get_queryset(self):
+        return _render_jobs(self.request.user)
+
+
+class RenderJobDownloadAPIView(APIView):
+    """The rendered file of a finished report job"""
+
+    def get(self, request, pk):
+        job = get_object_or_404(_render_jobs(request.user), pk=pk)
+        if job.status != RenderJob.DONE or not job.file:
+            return Response({'error': f'Report is {job.status}', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        content_type = 'application/pdf' if job.format == 'pdf' else 'text/html; charset=utf-8'
+        return FileResponse(job.file.open('rb'), as_attachment=True, content_type=content_type,
+                            filename=job.file.name.rsplit('/', 1)[-1])
@@ -10,7 +10,11 @@ from django.contrib.auth import get_user_model
 from django.template.response import TemplateResponse
 
 from neuvii_backend.admin_sites import neuvii_admin_site
-from .models import TherapistProfile, ParentProfile, Child, Assignment, SpeechArea, LongTermGoal, ShortTermGoal, Task
+from .models import (
+    TherapistProfile, ParentProfile, Child, Assignment, AssignmentEvent, SpeechArea, LongTermGoal, ShortTermGoal, Task
+)
+from .search import matching_documents, search_scope
+from .services import record_events, completion_event
 from users.models import Role
 from users.utils import create_user_with_role
 
@@ -23,11 +27,50 @@ def _role_name(user):
     return getattr(getattr(user, "role", None), "name", "").lower()
 
 
+class IndexedSearchMixin:
+    """
+    Answer the changelist search box from the search index (therapy/search.py)
+    instead of `search_fields` LIKE '%term%' scans. `search_fields` is still
+    set so the admin renders the box.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        scope = search_scope(request.user)
+        if scope is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=matching_documents(self.search_kind, search_term, scope=scope)), False
+
+
+class CatalogAdminMixin:
+    """
+    List deactivated catalog rows too (the default manager hides them) and
+    offer soft deletion of a whole subtree, which keeps assignments.
+    """
+    actions = ["deactivate_selected"]
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    @admin.action(description="Deactivate selected (and everything below them)")
+    def deactivate_selected(self, request, queryset):
+        result = queryset.deactivate()
+        self.message_user(request, "Deactivated " + ", ".join(
+            f"{rows} {name}" for name, rows in result.items()
+        ) + ".", messages.SUCCESS)
+
+
 # ===========================
 # Speech Area Admin
 # ===========================
 @admin.register(SpeechArea, site=neuvii_admin_site)
-class SpeechAreaAdmin(admin.ModelAdmin):
+class SpeechAreaAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'name', 'is_active']
     search_fields = ['name']
     list_filter = ['is_active']
@@ -37,8 +80,9 @@ class SpeechAreaAdmin(admin.ModelAdmin):
 # Long-Term Goal Admin
 # ===========================
 @admin.register(LongTermGoal, site=neuvii_admin_site)
-class LongTermGoalAdmin(admin.ModelAdmin):
+class LongTermGoalAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'speech_area', 'title', 'is_active']
+    list_select_related = ['speech_area']
     search_fields = ['title']
     list_filter = ['speech_area', 'is_active']
 
@@ -47,8 +91,9 @@ class LongTermGoalAdmin(admin.ModelAdmin):
 # Short-Term Goal Admin
 # ===========================
 @admin.register(ShortTermGoal, site=neuvii_admin_site)
-class ShortTermGoalAdmin(admin.ModelAdmin):
+class ShortTermGoalAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'long_term_goal', 'title', 'is_active']
+    list_select_related = ['long_term_goal__speech_area']
     search_fields = ['title']
     list_filter = ['long_term_goal__speech_area', 'is_active']
 
@@ -57,10 +102,12 @@ class ShortTermGoalAdmin(admin.ModelAdmin):
 # Task Admin
 # ===========================
 @admin.register(Task, site=neuvii_admin_site)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(CatalogAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = "task"
     list_display = ['id', 'short_term_goal', 'title', 'difficulty', 'is_active']
+    list_select_related = ['short_term_goal__long_term_goal__speech_area']
     search_fields = ['title']
-    list_filter = ['difficulty', 'is_active', 'short_term_goal__long_term_goal__speech_area']
+    list_filter = ['difficulty', 'is_active', 'speech_area']
 
 
 # ===========================
@@ -74,7 +121,8 @@ class TherapistProfileForm(forms.ModelForm):
 
 
 @admin.register(TherapistProfile, site=neuvii_admin_site)
-class TherapistProfileAdmin(admin.ModelAdmin):
+class TherapistProfileAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = "therapist"
     form = TherapistProfileForm
     list_display = ["id", "first_name", "last_name", "email", "phone_number", "is_active", "date_added"]
     search_fields = ["first_name", "last_name", "email", "phone_number"]
@@ -162,12 +210,14 @@ class ParentProfileForm(forms.ModelForm):
 
 
 @admin.register(ParentProfile, site=neuvii_admin_site)
-class ParentProfileAdmin(admin.ModelAdmin):
+class ParentProfileAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_kind = "client"
     form = ParentProfileForm
     list_display = [
         "id", "first_name", "last_name", "parent_email", "phone_number",
         "age", "fscd_approval", "assigned_therapist", "clinic", "date_added", "is_active"
     ]
+    list_select_related = ["assigned_therapist", "clinic"]
     search_fields = ["first_name", "last_name", "parent_email", "phone_number"]
     list_filter = ["clinic", "fscd_approval", "is_active"]
     readonly_fields = ["date_added"]
@@ -251,9 +301,24 @@ class ParentProfileAdmin(admin.ModelAdmin):
 # ===========================
 # Assignment Admin (Tasks)
 # ===========================
+class AssignmentForm(forms.ModelForm):
+    class Meta:
+        model = Assignment
+        fields = "__all__"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The task may have been deactivated since it was assigned
+        if self.instance.pk and "task" in self.fields:
+            self.fields["task"].queryset = Task.all_objects.active_or(self.instance.task_id)
+
+
 @admin.register(Assignment, site=neuvii_admin_site)
 class AssignmentAdmin(admin.ModelAdmin):
+    form = AssignmentForm
     list_display = ["id", "task", "child", "therapist", "assigned_date", "due_date", "completed"]
+    # Task.__str__ and Child.__str__ walk these relations for every row
+    list_select_related = ["task__speech_area", "child__clinic", "therapist"]
     search_fields = ["task__title", "child__name", "therapist__first_name", "therapist__last_name"]
     list_filter = ["completed", "due_date"]
 
@@ -273,6 +338,13 @@ class AssignmentAdmin(admin.ModelAdmin):
         
         return super().changelist_view(request, extra_context=extra_context)
 
+    def save_model(self, request, obj, form, change):
+        was_completed = form.initial.get("completed", False) if change else None
+        super().save_model(request, obj, form, change)
+        kind = completion_event(was_completed, obj) if change else AssignmentEvent.ASSIGNED
+        if kind:
+            record_events(kind, [obj])
+
     def has_add_permission(self, request):
         """Hide the default Add Assignment button for therapists"""
         role = getattr(getattr(request.user, "role", None), "name", "").lower()
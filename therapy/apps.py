@@ -5,3 +5,7 @@ class TherapyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "therapy"
     verbose_name = "Therapy Management"
+
+    def ready(self):
+        # Connects the search index and catalog version receivers
+        from . import catalog, search  # noqa: F401
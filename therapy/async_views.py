@@ -0,0 +1,52 @@
+"""
+Async versions of the assignment wizard's catalog lookups (therapy.views),
+routed in their place when ASYNC_VIEWS is set. They read the same catalog
+snapshot through `aget_catalog()`, so a request only leaves the event loop
+when the snapshot has to be reloaded.
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from .catalog import aget_catalog
+from .views import _goals_json, _int_or_none, _speech_areas_json, _tasks_json
+
+
+@login_required
+@require_http_methods(["GET"])
+async def get_long_term_goals(request):
+    speech_area_id = request.GET.get('speech_area_id')
+    if not speech_area_id:
+        return JsonResponse({'goals': []})
+
+    catalog = await aget_catalog()
+    return JsonResponse({'goals': _goals_json(catalog.long_term_goals_for(_int_or_none(speech_area_id)))})
+
+
+@login_required
+@require_http_methods(["GET"])
+async def get_short_term_goals(request):
+    long_term_goal_id = request.GET.get('long_term_goal_id')
+    if not long_term_goal_id:
+        return JsonResponse({'goals': []})
+
+    catalog = await aget_catalog()
+    return JsonResponse({'goals': _goals_json(catalog.short_term_goals_for(_int_or_none(long_term_goal_id)))})
+
+
+@login_required
+@require_http_methods(["GET"])
+async def get_tasks(request):
+    short_term_goal_id = request.GET.get('short_term_goal_id')
+    if not short_term_goal_id:
+        return JsonResponse({'tasks': []})
+
+    catalog = await aget_catalog()
+    return JsonResponse({'tasks': _tasks_json(catalog.tasks_for(_int_or_none(short_term_goal_id)))})
+
+
+@login_required
+@require_http_methods(["GET"])
+async def get_speech_areas(request):
+    catalog = await aget_catalog()
+    return JsonResponse({'speech_areas': _speech_areas_json(catalog.speech_areas.values())})
@@ -0,0 +1,197 @@
+"""
+Process-local snapshot of the active therapy catalog.
+
+The assignment wizard reads speech areas, goals and tasks far more often
+than anyone edits them. `get_catalog()` returns an immutable `Catalog`,
+loaded with one query per level and shared by every request in the process
+until the catalog version changes.
+
+The version is a counter in the cache. The receivers below bump it after
+any catalog write commits, and bulk writers that skip signals call
+`bump_catalog_version()` themselves. Each process compares its snapshot
+with the counter at most every CATALOG_VERSION_CHECK_SECONDS, so with a
+shared cache other workers see an edit within that window; the process that
+made the edit sees it immediately.
+
+Structures derived from the catalog (the typeahead index) hang off the
+snapshot via `Catalog.derived`, so they are rebuilt exactly when it is.
+
+Async views use `aget_catalog()`, which shares the snapshot but checks the
+version and reloads through the async cache and ORM.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import SpeechArea, LongTermGoal, ShortTermGoal, Task
+
+VERSION_KEY = 'therapy:catalog:version'
+
+SpeechAreaNode = namedtuple('SpeechAreaNode', 'id name description')
+LongTermGoalNode = namedtuple('LongTermGoalNode', 'id speech_area_id title description')
+ShortTermGoalNode = namedtuple('ShortTermGoalNode', 'id long_term_goal_id title description')
+TaskNode = namedtuple('TaskNode', 'id short_term_goal_id title description difficulty')
+
+
+def _group(nodes, parent_field):
+    children = {}
+    for node in nodes.values():
+        children.setdefault(getattr(node, parent_field), []).append(node)
+    return children
+
+
+class Catalog:
+    """Active catalog rows keyed by id, in id order, with parent -> children lists"""
+
+    def __init__(self, version, speech_areas, long_term_goals, short_term_goals, tasks):
+        self.version = version
+        self.speech_areas = speech_areas
+        self.long_term_goals = long_term_goals
+        self.short_term_goals = short_term_goals
+        self.tasks = tasks
+
+        self._long_term_goals_by_area = _group(long_term_goals, 'speech_area_id')
+        self._short_term_goals_by_goal = _group(short_term_goals, 'long_term_goal_id')
+        self._tasks_by_goal = _group(tasks, 'short_term_goal_id')
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    @staticmethod
+    def _levels():
+        """(rows, node type) for each level, top down"""
+        def rows(queryset, *fields):
+            return queryset.filter(is_active=True).order_by('id').values_list(*fields)
+
+        return [
+            (rows(SpeechArea.objects, 'id', 'name', 'description'), SpeechAreaNode),
+            (rows(LongTermGoal.objects, 'id', 'speech_area_id', 'title', 'description'), LongTermGoalNode),
+            (rows(ShortTermGoal.objects, 'id', 'long_term_goal_id', 'title', 'description'), ShortTermGoalNode),
+            (rows(Task.objects, 'id', 'short_term_goal_id', 'title', 'description', 'difficulty'), TaskNode),
+        ]
+
+    @classmethod
+    def load(cls, version):
+        return cls(version, *({row[0]: node(*row) for row in rows} for rows, node in cls._levels()))
+
+    @classmethod
+    async def aload(cls, version):
+        levels = []
+        for rows, node in cls._levels():
+            levels.append({row[0]: node(*row) async for row in rows})
+        return cls(version, *levels)
+
+    def long_term_goals_for(self, speech_area_id):
+        return self._long_term_goals_by_area.get(speech_area_id, [])
+
+    def short_term_goals_for(self, long_term_goal_id):
+        return self._short_term_goals_by_goal.get(long_term_goal_id, [])
+
+    def tasks_for(self, short_term_goal_id):
+        return self._tasks_by_goal.get(short_term_goal_id, [])
+
+    def path(self, task):
+        """(speech_area_id, long_term_goal_id) above a task; None where a level is missing or inactive"""
+        short_term_goal = self.short_term_goals.get(task.short_term_goal_id)
+        long_term_goal = self.long_term_goals.get(short_term_goal.long_term_goal_id) if short_term_goal else None
+        return (long_term_goal.speech_area_id if long_term_goal else None,
+                long_term_goal.id if long_term_goal else None)
+
+    def derived(self, name, build):
+        """`build(self)`, computed once per snapshot"""
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build(self)
+        return value
+
+
+class _CatalogHolder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._checked_at = 0.0
+
+    def get(self):
+        catalog = self._catalog
+        interval = getattr(settings, 'CATALOG_VERSION_CHECK_SECONDS', 1)
+        if catalog is not None and time.monotonic() - self._checked_at < interval:
+            return catalog
+
+        version = current_version()
+        if catalog is None or catalog.version != version:
+            with self._lock:
+                if self._catalog is None or self._catalog.version != version:
+                    self._catalog = Catalog.load(version)
+                catalog = self._catalog
+        self._checked_at = time.monotonic()
+        return catalog
+
+    async def aget(self):
+        catalog = self._catalog
+        interval = getattr(settings, 'CATALOG_VERSION_CHECK_SECONDS', 1)
+        if catalog is not None and time.monotonic() - self._checked_at < interval:
+            return catalog
+
+        version = await acurrent_version()
+        if catalog is None or catalog.version != version:
+            # Not under the lock, which would block the event loop; requests
+            # arriving during a reload load the same snapshot again
+            catalog = await Catalog.aload(version)
+            self._catalog = catalog
+        self._checked_at = time.monotonic()
+        return catalog
+
+    def clear(self):
+        self._catalog = None
+
+
+_holder = _CatalogHolder()
+
+
+def get_catalog():
+    return _holder.get()
+
+
+async def aget_catalog():
+    return await _holder.aget()
+
+
+def current_version():
+    cache.add(VERSION_KEY, 1, None)
+    return cache.get(VERSION_KEY) or 1
+
+
+async def acurrent_version():
+    await cache.aadd(VERSION_KEY, 1, None)
+    return await cache.aget(VERSION_KEY) or 1
+
+
+def bump_catalog_version():
+    """Invalidate every process's snapshot; call after bulk catalog writes"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, None)
+    _holder.clear()
+
+
+@receiver(post_save, sender=SpeechArea)
+@receiver(post_save, sender=LongTermGoal)
+@receiver(post_save, sender=ShortTermGoal)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=SpeechArea)
+@receiver(post_delete, sender=LongTermGoal)
+@receiver(post_delete, sender=ShortTermGoal)
+@receiver(post_delete, sender=Task)
+def catalog_changed(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,263 @@
+"""
+Bulk import of a whole catalog tree.
+
+A document lists speech areas with their long-term goals, short-term goals
+and tasks nested inside:
+
+    {"speech_areas": [
+        {"name": "Expressive Language", "description": "...",
+         "long_term_goals": [
+            {"title": "...", "short_term_goals": [
+                {"title": "...", "tasks": [
+                    {"title": "...", "description": "...", "difficulty": "beginner"}
+                ]}
+            ]}
+        ]}
+    ]}
+
+Each node is matched to an existing row by its normalized title under the
+same parent (the unique `title_key`), so importing an edited document
+updates rows in place instead of duplicating them. Omitting "description"
+or "difficulty" leaves the stored value alone; "is_active": false imports a
+node deactivated, and deactivates the existing rows below it.
+
+The document is applied level by level in one transaction. Each level
+costs one SELECT of the existing children of the imported parents, one bulk
+INSERT, one bulk UPDATE and, with `deactivate_missing`, one UPDATE per
+level below that deactivates existing children the document no longer
+lists, with their subtrees (only under parents whose child list is given;
+their "deactivated" count includes the subtree rows). Nothing is deleted,
+so assignments keep their tasks.
+"""
+import json
+
+from django.db import connection, transaction
+
+from . import hierarchy
+from .catalog import bump_catalog_version
+from .models import SpeechArea, LongTermGoal, ShortTermGoal, Task
+from .search import index_queryset
+from .text import title_key
+
+DIFFICULTIES = [value for value, _ in Task._meta.get_field('difficulty').choices]
+
+# (document key, model, title field, parent field, children key, optional fields)
+LEVELS = [
+    ('speech_areas', SpeechArea, 'name', None, 'long_term_goals', ('description',)),
+    ('long_term_goals', LongTermGoal, 'title', 'speech_area_id', 'short_term_goals', ('description',)),
+    ('short_term_goals', ShortTermGoal, 'title', 'long_term_goal_id', 'tasks', ('description',)),
+    ('tasks', Task, 'title', 'short_term_goal_id', None, ('description', 'difficulty')),
+]
+
+
+class CatalogImportError(ValueError):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors[:5]) + (' ...' if len(self.errors) > 5 else ''))
+
+
+def loads(text, format='json'):
+    """Parse a JSON or YAML (needs PyYAML) catalog document"""
+    if format in ('yaml', 'yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise CatalogImportError(['YAML catalogs need PyYAML installed; use JSON instead'])
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as error:
+            raise CatalogImportError([f'Invalid YAML: {error}'])
+    try:
+        return json.loads(text)
+    except ValueError as error:
+        raise CatalogImportError([f'Invalid JSON: {error}'])
+
+
+class _Node:
+    __slots__ = ('parent', 'key', 'fields', 'lists_children', 'id', 'changed')
+
+    def __init__(self, parent, key, fields, lists_children):
+        self.parent = parent
+        self.key = key
+        self.fields = fields
+        self.lists_children = lists_children
+        self.id = None
+        self.changed = False
+
+
+def parse(document):
+    """
+    Validate `document` and flatten it into one list of nodes per level.
+    Raises CatalogImportError listing every problem found.
+    """
+    if isinstance(document, list):
+        document = {'speech_areas': document}
+    if not isinstance(document, dict) or 'speech_areas' not in document:
+        raise CatalogImportError(['Expected an object with a "speech_areas" list'])
+
+    errors = []
+    levels = [[] for _ in LEVELS]
+
+    def walk(items, depth, parent, path):
+        _, model, title_field, _, children_key, optional_fields = LEVELS[depth]
+        if not isinstance(items, list):
+            errors.append(f'{path}: expected a list')
+            return
+        max_length = model._meta.get_field(title_field).max_length
+        seen = {}
+        for index, item in enumerate(items):
+            item_path = f'{path}[{index}]'
+            if not isinstance(item, dict):
+                errors.append(f'{item_path}: expected an object')
+                continue
+
+            title = item.get(title_field)
+            if not isinstance(title, str) or not title.strip():
+                errors.append(f'{item_path}.{title_field}: required')
+                continue
+            title = title.strip()
+            key = title_key(title)
+            if len(title) > max_length:
+                errors.append(f'{item_path}.{title_field}: longer than {max_length} characters')
+                continue
+            if not key:
+                errors.append(f'{item_path}.{title_field}: must contain letters or digits')
+                continue
+            if key in seen:
+                errors.append(f'{item_path}.{title_field}: same as {seen[key]}')
+                continue
+            seen[key] = item_path
+
+            fields = {title_field: title, 'is_active': bool(item.get('is_active', True))}
+            for field in optional_fields:
+                if field in item:
+                    fields[field] = item[field]
+            if fields.get('description') is not None and not isinstance(fields['description'], str):
+                errors.append(f'{item_path}.description: expected text')
+            if 'difficulty' in fields and fields['difficulty'] not in DIFFICULTIES:
+                errors.append(f'{item_path}.difficulty: expected one of {", ".join(DIFFICULTIES)}')
+
+            node = _Node(parent, key, fields, lists_children=bool(children_key) and children_key in item)
+            levels[depth].append(node)
+            if node.lists_children:
+                walk(item[children_key], depth + 1, node, f'{item_path}.{children_key}')
+
+    walk(document['speech_areas'], 0, None, 'speech_areas')
+    if errors:
+        raise CatalogImportError(errors)
+    return levels
+
+
+def _ancestor_ids(node):
+    ids = []
+    while node.parent is not None:
+        node = node.parent
+        ids.append(node.id)
+    return ids[::-1]
+
+
+def _apply_level(depth, nodes, parents, deactivate_missing, batch_size):
+    _, model, title_field, parent_field, _, optional_fields = LEVELS[depth]
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'deactivated': 0}
+
+    loaded = ['id', 'title_key', title_field, 'is_active', *optional_fields]
+    if parent_field:
+        parent_ids = [parent.id for parent in parents if parent.lists_children]
+        if not parent_ids:
+            return counts
+        existing_rows = model.all_objects.filter(**{f'{parent_field}__in': parent_ids}).only(parent_field, *loaded)
+    else:
+        existing_rows = model.all_objects.only(*loaded)
+    existing = {
+        (getattr(row, parent_field) if parent_field else None, row.title_key): row
+        for row in existing_rows
+    }
+
+    created, updated, update_fields, matched_ids, deactivated_ids = [], [], set(), set(), []
+    for node in nodes:
+        parent_id = node.parent.id if parent_field else None
+        row = existing.get((parent_id, node.key))
+        if row is None:
+            obj = model(title_key=node.key, **node.fields)
+            if parent_field:
+                setattr(obj, parent_field, parent_id)
+                # bulk_create skips CatalogNode.save(), which fills these
+                ancestors = _ancestor_ids(node)
+                obj.path = ''.join(map(hierarchy.segment, ancestors))
+                if model is Task:
+                    obj.speech_area_id, obj.long_term_goal_id = ancestors[:2]
+            created.append((node, obj))
+            continue
+
+        node.id = row.id
+        matched_ids.add(row.id)
+        changed = [field for field, value in node.fields.items() if getattr(row, field) != value]
+        if row.is_active and not node.fields['is_active']:
+            deactivated_ids.append(row.id)
+        if changed:
+            for field in changed:
+                setattr(row, field, node.fields[field])
+            node.changed = True
+            update_fields.update(changed)
+            updated.append(row)
+        else:
+            counts['unchanged'] += 1
+
+    if created:
+        model.all_objects.bulk_create([obj for _, obj in created], batch_size=batch_size)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # MySQL doesn't report the new ids; fetch them by natural key
+            new_rows = model.all_objects.filter(title_key__in={node.key for node, _ in created})
+            if parent_field:
+                new_rows = new_rows.filter(**{f'{parent_field}__in': {node.parent.id for node, _ in created}})
+            ids = {
+                (row[parent_field] if parent_field else None, row['title_key']): row['id']
+                for row in new_rows.values('id', 'title_key', *([parent_field] if parent_field else []))
+            }
+            for node, obj in created:
+                obj.pk = ids[(node.parent.id if parent_field else None, node.key)]
+        for node, obj in created:
+            node.id = obj.pk
+            node.changed = True
+        counts['created'] = len(created)
+
+    if updated:
+        model.all_objects.bulk_update(updated, sorted(update_fields), batch_size=batch_size)
+        counts['updated'] = len(updated)
+    if deactivated_ids:
+        # Rows the document marks inactive take their subtrees with them;
+        # the count is of the rows below (the rows themselves are updated)
+        counts['deactivated'] += sum(hierarchy.deactivate(model.all_objects.filter(id__in=deactivated_ids)).values())
+
+    if deactivate_missing:
+        stale = [row.id for row in existing.values() if row.is_active and row.id not in matched_ids]
+        if stale:
+            # Includes the rows below them, which the document doesn't list
+            counts['deactivated'] += sum(hierarchy.deactivate(model.all_objects.filter(id__in=stale)).values())
+
+    return counts
+
+
+def import_catalog(document, deactivate_missing=False, dry_run=False, batch_size=1000):
+    """
+    Create, update and (optionally) deactivate catalog rows to match
+    `document`. Returns per-level counts of created/updated/unchanged/
+    deactivated rows. With `dry_run` the changes are rolled back.
+    """
+    levels = parse(document)
+    result = {}
+    with transaction.atomic():
+        parents = []
+        for depth, nodes in enumerate(levels):
+            result[LEVELS[depth][0]] = _apply_level(depth, nodes, parents, deactivate_missing, batch_size)
+            parents = nodes
+
+        task_ids = [node.id for node in levels[-1] if node.changed]
+        for start in range(0, len(task_ids), batch_size):
+            index_queryset('task', Task.all_objects.filter(id__in=task_ids[start:start + batch_size]), batch_size)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            transaction.on_commit(bump_catalog_version)
+    return result
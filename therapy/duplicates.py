@@ -0,0 +1,33 @@
+"""
+Duplicate checks for catalog creation.
+
+An exact duplicate, meaning the same normalized title under the same parent,
+is found through the unique (parent, title_key) index. Near duplicates such as
+"Follow two-step directions" vs "Follows 2-step direction" are found by
+trigram similarity against the parent's other children in the cached
+catalog snapshot.
+"""
+from .text import title_key, words
+from .typeahead import trigrams
+
+SIMILARITY_THRESHOLD = 0.6
+
+
+def find_existing(model, title, **parent):
+    """The row (active or not) whose title normalizes like `title` under `parent`"""
+    return model.all_objects.filter(title_key=title_key(title), **parent).first()
+
+
+def similar_siblings(title, siblings, attr='title', threshold=SIMILARITY_THRESHOLD, limit=5):
+    """(similarity, node) pairs for catalog nodes whose `attr` is close to `title`, best first"""
+    grams = trigrams(words(title))
+    if not grams:
+        return []
+    matches = []
+    for node in siblings:
+        other = trigrams(words(getattr(node, attr)))
+        similarity = len(grams & other) / len(grams | other) if other else 0
+        if similarity >= threshold:
+            matches.append((round(similarity, 3), node))
+    matches.sort(key=lambda match: (-match[0], match[1].id))
+    return matches[:limit]
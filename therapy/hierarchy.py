@@ -0,0 +1,174 @@
+"""
+Materialized paths for the speech area -> goal -> task catalog.
+
+Every catalog row stores `path`, the zero-padded ids of its ancestors,
+root first: a task under speech area 3, long-term goal 12 and short-term
+goal 40 has the path "0000000003/0000000012/0000000040/". A node's
+descendants, in every level below it, are then the rows whose path starts
+with `prefix(node)` (its own path plus its id), which `in_subtree` turns
+into a plain range on the indexed column:
+
+    prefix <= path < prefix[:-1] + '0'
+
+('/' sorts right before '0'), so subtree queries, subtree counts and
+subtree updates (including `deactivate`) are one index range scan per
+level instead of chained joins through the goal tables.
+
+CatalogNode.save() keeps paths current and moves the subtree when a node is
+re-parented. Bulk writers set `path` themselves; `rebuild_catalog_paths`
+recomputes every path from the parent foreign keys.
+"""
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.db.models import CharField, Count, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad, Substr
+
+SEPARATOR = '/'
+ID_WIDTH = 10
+LEVELS = ('SpeechArea', 'LongTermGoal', 'ShortTermGoal', 'Task')
+# Subtree ranges OR-ed into one statement
+MAX_RANGES = 500
+
+
+def segment(pk):
+    return f'{pk:0{ID_WIDTH}d}{SEPARATOR}'
+
+
+def prefix(node):
+    """The path of `node`'s children"""
+    return node.path + segment(node.pk)
+
+
+def ancestor_ids(path):
+    """Ids in `path`, root first"""
+    return [int(part) for part in path.split(SEPARATOR) if part]
+
+
+def models():
+    return [apps.get_model('therapy', name) for name in LEVELS]
+
+
+def descendant_models(model):
+    levels = models()
+    return levels[levels.index(model) + 1:]
+
+
+def _subtree_q(subtree_prefix):
+    upper = subtree_prefix[:-1] + chr(ord(SEPARATOR) + 1)
+    return Q(path__gte=subtree_prefix, path__lt=upper)
+
+
+def in_subtree(queryset, subtree_prefix):
+    """Rows of `queryset` below the node whose prefix is `subtree_prefix`"""
+    return queryset.filter(_subtree_q(subtree_prefix))
+
+
+def subtree(model, node):
+    """`model` rows (any level below `node`'s) under `node`"""
+    return in_subtree(model._base_manager.all(), prefix(node))
+
+
+def subtree_counts(node):
+    """{model name: rows under `node`} for every level below it"""
+    return {
+        model._meta.model_name: subtree(model, node).count()
+        for model in descendant_models(type(node))
+    }
+
+
+def counts_by(ancestor_model, model, queryset=None):
+    """
+    {ancestor id: number of `model` rows under it}, e.g. tasks per
+    long-term goal, grouped on the leading part of the path.
+    """
+    if queryset is None:
+        queryset = model._base_manager.all()
+    length = (LEVELS.index(ancestor_model.__name__) + 1) * (ID_WIDTH + 1)
+    rows = (
+        queryset.exclude(path='')
+        .annotate(ancestor=Substr('path', 1, length))
+        .values('ancestor')
+        .annotate(total=Count('id'))
+    )
+    return {ancestor_ids(row['ancestor'])[-1]: row['total'] for row in rows}
+
+
+def move_subtree(node, old_prefix):
+    """Rewrite the paths under `node` after it moved from `old_prefix`"""
+    new_prefix = prefix(node)
+    moved = 0
+    for model in descendant_models(type(node)):
+        moved += in_subtree(model._base_manager.all(), old_prefix).update(
+            path=Concat(Value(new_prefix), Substr('path', len(old_prefix) + 1), output_field=CharField())
+        )
+    return moved
+
+
+def deactivate(queryset):
+    """
+    Set is_active=False on the rows of `queryset` and every row below them:
+    one UPDATE per level, each a union of path ranges. Returns
+    {model name: rows deactivated}.
+    """
+    model = queryset.model
+    rows = list(queryset.values_list('id', 'path'))
+    result = {model._meta.model_name: 0}
+    if not rows:
+        return result
+    result[model._meta.model_name] = model._base_manager.filter(
+        id__in=[pk for pk, _ in rows], is_active=True
+    ).update(is_active=False)
+
+    prefixes = sorted(path + segment(pk) for pk, path in rows)
+    for descendant in descendant_models(model):
+        updated = 0
+        for start in range(0, len(prefixes), MAX_RANGES):
+            ranges = reduce(or_, map(_subtree_q, prefixes[start:start + MAX_RANGES]))
+            updated += descendant._base_manager.filter(ranges, is_active=True).update(is_active=False)
+        result[descendant._meta.model_name] = updated
+    return result
+
+
+def _child_path(parent_model, parent_field):
+    """Path expression for rows whose parent is `parent_field`: parent path + padded parent id"""
+    parent_path = Subquery(parent_model._base_manager.filter(pk=OuterRef(parent_field)).values('path')[:1])
+    return Concat(
+        parent_path,
+        LPad(Cast(parent_field, CharField()), ID_WIDTH, Value('0')),
+        Value(SEPARATOR),
+        output_field=CharField(),
+    )
+
+
+def rebuild(batch_size=10000):
+    """
+    Recompute every path (and the tasks' denormalized goal and speech area)
+    top-down, one UPDATE per level and id range. Returns {model name: rows}.
+    """
+    levels = models()
+    SpeechArea, Task = levels[0], levels[-1]
+    result = {SpeechArea._meta.model_name: SpeechArea._base_manager.exclude(path='').update(path='')}
+
+    for parent_model, model in zip(levels, levels[1:]):
+        parent_field = model.parent_field
+        values = {'path': _child_path(parent_model, parent_field)}
+        if model is Task:
+            goals = parent_model._base_manager.filter(pk=OuterRef(parent_field))
+            values['long_term_goal_id'] = Subquery(goals.values('long_term_goal_id')[:1])
+            values['speech_area_id'] = Subquery(goals.values('long_term_goal__speech_area_id')[:1])
+
+        rows = model._base_manager.all()
+        bounds = rows.aggregate(low=Min('id'), high=Max('id'))
+        updated = 0
+        if bounds['low'] is not None:
+            for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+                chunk = rows.filter(id__gte=start, id__lt=start + batch_size)
+                updated += chunk.filter(**{f'{parent_field}__isnull': False}).update(**values)
+                orphans = {'path': ''}
+                if model is Task:
+                    orphans.update(long_term_goal_id=None, speech_area_id=None)
+                updated += chunk.filter(**{f'{parent_field}__isnull': True}).update(**orphans)
+        result[model._meta.model_name] = updated
+    return result
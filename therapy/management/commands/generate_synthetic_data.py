@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from therapy.synthetic import SyntheticDataGenerator, delete_synthetic_data, DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Generate a production-sized synthetic dataset of clinics, therapists, clients and assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinics', type=int, default=10, help='Number of clinics')
+        parser.add_argument('--therapists', type=int, default=8, help='Mean therapists per clinic')
+        parser.add_argument('--clients', type=int, default=25, help='Mean clients per therapist')
+        parser.add_argument('--assignments', type=int, default=40, help='Mean assignments per child')
+        parser.add_argument('--days', type=int, default=365, help='Spread assignment dates over this many days')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument('--uniform', action='store_true', help='Use exact counts instead of realistic distributions')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password for every generated user')
+        parser.add_argument('--flush', action='store_true', help='Delete previously generated data first')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            self.stdout.write(f'Deleted {delete_synthetic_data()} synthetic rows')
+
+        generator = SyntheticDataGenerator(
+            clinics=options['clinics'],
+            therapists_per_clinic=options['therapists'],
+            clients_per_therapist=options['clients'],
+            assignments_per_child=options['assignments'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            realistic=not options['uniform'],
+            password=options['password'],
+            log=self.stdout.write,
+        )
+
+        started = time.perf_counter()
+        counts = generator.run()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created {clinics} clinics, {therapists} therapists, {parents} clients, '
+            '{children} children, {assignments} assignments ({events} events) and {users} users'.format(**counts)
+            + f' in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from therapy.catalog_import import CatalogImportError, import_catalog, loads
+
+
+class Command(BaseCommand):
+    help = 'Create or update the speech area / goal / task catalog from a JSON or YAML document'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Catalog document, or - to read standard input')
+        parser.add_argument(
+            '--format', choices=['json', 'yaml'],
+            help='Document format (default: from the file extension, else JSON)'
+        )
+        parser.add_argument(
+            '--deactivate-missing', action='store_true',
+            help='Deactivate existing children the document no longer lists under its parents'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk statement')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format']
+        if format is None:
+            format = 'yaml' if os.path.splitext(path)[1].lower() in ('.yml', '.yaml') else 'json'
+
+        try:
+            if path == '-':
+                text = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8') as stream:
+                    text = stream.read()
+        except OSError as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+
+        started = time.perf_counter()
+        try:
+            result = import_catalog(
+                loads(text, format),
+                deactivate_missing=options['deactivate_missing'],
+                dry_run=options['dry_run'],
+                batch_size=options['batch_size'],
+            )
+        except CatalogImportError as error:
+            for message in error.errors:
+                self.stderr.write(message)
+            raise CommandError(f'{len(error.errors)} problems in {path}; nothing was imported')
+
+        for level, counts in result.items():
+            self.stdout.write(
+                f"{level}: {counts['created']} created, {counts['updated']} updated, "
+                f"{counts['unchanged']} unchanged, {counts['deactivated']} deactivated"
+            )
+        elapsed = time.perf_counter() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run in {elapsed:.1f}s; nothing was saved'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported {path} in {elapsed:.1f}s'))
@@ -29,7 +29,7 @@ class Command(BaseCommand):
         ]
         
         for area_data in speech_areas_data:
-            area, created = SpeechArea.objects.get_or_create(
+            area, created = SpeechArea.all_objects.get_or_create(
                 name=area_data['name'],
                 defaults={'description': area_data['description']}
             )
@@ -46,7 +46,7 @@ class Command(BaseCommand):
         ]
         
         for goal_title in long_term_goals_expressive:
-            goal, created = LongTermGoal.objects.get_or_create(
+            goal, created = LongTermGoal.all_objects.get_or_create(
                 speech_area=expressive_lang,
                 title=goal_title
             )
@@ -76,7 +76,7 @@ class Command(BaseCommand):
             ]
             
             for goal_title in short_term_goals:
-                goal, created = ShortTermGoal.objects.get_or_create(
+                goal, created = ShortTermGoal.all_objects.get_or_create(
                     long_term_goal=first_long_term,
                     title=goal_title
                 )
@@ -133,7 +133,7 @@ class Command(BaseCommand):
             
             for task_data in sample_tasks[start_idx:end_idx]:
                 if start_idx < len(sample_tasks):
-                    task, created = Task.objects.get_or_create(
+                    task, created = Task.all_objects.get_or_create(
                         short_term_goal=short_term_goal,
                         title=task_data['title'],
                         defaults={'difficulty': task_data['difficulty']}
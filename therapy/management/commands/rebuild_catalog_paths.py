@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from therapy import hierarchy
+from therapy.catalog import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Recompute the catalog hierarchy paths and the denormalized task goal/speech area columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows updated per statement (id range)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.perf_counter()
+        result = hierarchy.rebuild(batch_size=options['batch_size'])
+        bump_catalog_version()
+        for name, rows in result.items():
+            self.stdout.write(f'{name}: {rows} rows')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt catalog paths in {time.perf_counter() - started:.1f}s'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from therapy.models import SearchTerm
+from therapy.search import SOURCES, index_queryset
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index for clients, therapists and tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=sorted(SOURCES), action='append',
+            help='Only rebuild this document type (repeatable; default all)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents indexed per batch')
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or sorted(SOURCES):
+            started = time.perf_counter()
+            indexed = index_queryset(kind, batch_size=options['batch_size'])
+            # Rows of documents deleted while signals were bypassed
+            model = SOURCES[kind][0]
+            SearchTerm.objects.filter(kind=kind).exclude(object_id__in=model._base_manager.values('id')).delete()
+            self.stdout.write(self.style.SUCCESS(
+                f'Indexed {indexed} {kind} documents in {time.perf_counter() - started:.1f}s'
+            ))
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:03
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+WORD = re.compile(r'[^\W_]+')
+
+# Frozen copy of therapy.search.SOURCES: kind -> (model, {field: weight}, scope fields)
+SOURCES = {
+    'client': (
+        'ParentProfile',
+        {'first_name': 10, 'last_name': 10, 'parent_email': 4, 'phone_number': 3},
+        ('clinic_id', 'assigned_therapist_id'),
+    ),
+    'therapist': (
+        'TherapistProfile',
+        {'first_name': 10, 'last_name': 10, 'email': 4, 'phone_number': 3},
+        ('clinic_id', 'id'),
+    ),
+    'task': ('Task', {'title': 8, 'description': 2}, (None, None)),
+}
+
+
+def words(value):
+    # Frozen copy of therapy.search.normalize_words
+    if not value:
+        return []
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    return [word[:64] for word in WORD.findall(folded)]
+
+
+def index_existing(apps, schema_editor):
+    """Index the rows that predate the index, as rebuild_search_index would"""
+    SearchTerm = apps.get_model('therapy', 'SearchTerm')
+    for kind, (model_name, fields, (clinic_field, therapist_field)) in SOURCES.items():
+        model = apps.get_model('therapy', model_name)
+        queryset = model._base_manager.only(
+            'id', *fields, *(field for field in (clinic_field, therapist_field) if field)
+        ).order_by('id')
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:1000])
+            if not batch:
+                break
+            terms = []
+            for obj in batch:
+                weights = {}
+                for field, weight in fields.items():
+                    found = words(getattr(obj, field))
+                    if field == 'phone_number' and len(found) > 1:
+                        found.append(''.join(found)[:64])
+                    for word in found:
+                        weights[word] = max(weights.get(word, 0), weight)
+                terms.extend(
+                    SearchTerm(
+                        kind=kind, object_id=obj.pk, term=term, weight=weight,
+                        clinic_id=getattr(obj, clinic_field) if clinic_field else None,
+                        therapist_id=getattr(obj, therapist_field) if therapist_field else None,
+                    )
+                    for term, weight in weights.items()
+                )
+            SearchTerm.objects.bulk_create(terms, batch_size=2000)
+            last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('client', 'Client'), ('therapist', 'Therapist'), ('task', 'Task')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('clinic_id', models.BigIntegerField(blank=True, null=True)),
+                ('therapist_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'kind'], name='therapy_search_term_idx'), models.Index(fields=['kind', 'object_id'], name='therapy_search_object_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,198 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:09
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+WORD = re.compile(r'[^\W_]+')
+
+
+def title_key(text):
+    # Frozen copy of therapy.text.title_key
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    key = ' '.join(WORD.findall(folded)) or ' '.join(str(text or '').casefold().split())
+    if len(key) > 255:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        key = f'{key[:255 - len(digest) - 1]} {digest}'
+    return key
+
+
+def _levels(apps):
+    SpeechArea = apps.get_model('therapy', 'SpeechArea')
+    LongTermGoal = apps.get_model('therapy', 'LongTermGoal')
+    ShortTermGoal = apps.get_model('therapy', 'ShortTermGoal')
+    Task = apps.get_model('therapy', 'Task')
+    Assignment = apps.get_model('therapy', 'Assignment')
+    # (model, title field, parent field, child model, child's field pointing here)
+    return [
+        (SpeechArea, 'name', None, LongTermGoal, 'speech_area_id'),
+        (LongTermGoal, 'title', 'speech_area_id', ShortTermGoal, 'long_term_goal_id'),
+        (ShortTermGoal, 'title', 'long_term_goal_id', Task, 'short_term_goal_id'),
+        (Task, 'title', 'short_term_goal_id', Assignment, 'task_id'),
+    ]
+
+
+def plan_merges(apps):
+    """
+    Title keys and duplicate groups per catalog level, and the groups that
+    can't be merged without losing something.
+
+    Rows are grouped by title key under the same parent, a merged parent
+    counting as the row it merges into, so goals under duplicate areas are
+    compared together. In each group an active row is kept over an inactive
+    one, then the oldest. A group conflicts if its rows have different
+    non-blank descriptions or task difficulties, or if its tasks hold more
+    than one assignment for the same child and therapist.
+
+    Rows without a parent are never merged (NULLs don't collide in the
+    unique index). Neither are rows with a blank title: each keeps a
+    placeholder key, "#<id>", until it is given a title.
+    """
+    plans = []
+    conflicts = []
+    merged_into = {}
+    for model, source, parent_field, child_model, child_field in _levels(apps):
+        is_task = child_field == 'task_id'
+        fields = ['id', source, 'description'] + (['difficulty'] if is_task else [])
+        fields += [parent_field] if parent_field else []
+        keys = {}
+        groups = {}
+        for row in model.objects.order_by('-is_active', 'id').values(*fields):
+            keys[row['id']] = title_key(row[source]) or f'#{row["id"]}'
+            parent_id = row[parent_field] if parent_field else None
+            if parent_field and parent_id is None:
+                continue
+            groups.setdefault((merged_into.get(parent_id, parent_id), keys[row['id']]), []).append(row)
+
+        merges = []
+        merged_into = {}
+        for rows in groups.values():
+            if len(rows) == 1:
+                continue
+            ids = [row['id'] for row in rows]
+            label = f"{model.__name__} {', '.join(map(str, ids))} ({', '.join(repr(row[source]) for row in rows)})"
+            descriptions = {row['description'].strip(): row for row in rows if (row['description'] or '').strip()}
+            problems = []
+            if len(descriptions) > 1:
+                problems.append('descriptions differ')
+            if is_task and len({row['difficulty'] for row in rows}) > 1:
+                problems.append('difficulties differ')
+            if is_task:
+                assigned = {}
+                for assignment in child_model.objects.filter(task_id__in=ids).order_by('id').values(
+                    'id', 'child_id', 'therapist_id'
+                ):
+                    assigned.setdefault((assignment['child_id'], assignment['therapist_id']), []).append(assignment['id'])
+                problems.extend(
+                    f"child {child_id} has assignments {', '.join(map(str, assignment_ids))} from therapist {therapist_id}"
+                    for (child_id, therapist_id), assignment_ids in assigned.items() if len(assignment_ids) > 1
+                )
+            if problems:
+                conflicts.append(f"{label}: {'; '.join(problems)}")
+                continue
+            keep = rows[0]
+            # The row with the group's one description, if the kept row lacks it
+            description_from = None if (keep['description'] or '').strip() else next(iter(descriptions.values()), None)
+            merges.append((keep['id'], ids[1:], description_from))
+            merged_into.update(dict.fromkeys(ids[1:], keep['id']))
+        plans.append((model, child_model, child_field, keys, merges))
+    return plans, conflicts
+
+
+def _raise_conflicts(conflicts):
+    raise RuntimeError(
+        'Catalog rows whose titles differ only in case, spacing or punctuation '
+        "can't be merged without losing data. Give them distinct titles or merge "
+        'them by hand, then migrate again:\n  ' + '\n  '.join(conflicts)
+    )
+
+
+def check_duplicates(apps, schema_editor):
+    # Before any schema change, so a refused migration can simply be rerun
+    # on databases without transactional DDL (MySQL)
+    _plans, conflicts = plan_merges(apps)
+    if conflicts:
+        _raise_conflicts(conflicts)
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Fill title_key and merge the duplicate rows found by plan_merges(). A
+    merge loses nothing but the duplicate's spelling of the title: its
+    children (and a task's assignments) move to the kept row, which takes
+    the group's description if it had none, and the duplicate is deleted.
+    """
+    SearchTerm = apps.get_model('therapy', 'SearchTerm')
+    plans, conflicts = plan_merges(apps)
+    if conflicts:
+        _raise_conflicts(conflicts)
+
+    for model, child_model, child_field, keys, merges in plans:
+        duplicate_ids = {duplicate_id for _, ids, _ in merges for duplicate_id in ids}
+        model.objects.bulk_update(
+            [model(id=pk, title_key=key) for pk, key in keys.items() if pk not in duplicate_ids],
+            ['title_key'], batch_size=1000,
+        )
+        is_task = child_field == 'task_id'
+        for keep_id, ids, description_from in merges:
+            if description_from is not None:
+                model.objects.filter(id=keep_id).update(description=description_from['description'])
+                if is_task:
+                    # Same title words, plus the description's
+                    SearchTerm.objects.filter(kind='task', object_id=keep_id).delete()
+                    SearchTerm.objects.filter(kind='task', object_id=description_from['id']).update(object_id=keep_id)
+            child_model.objects.filter(**{f'{child_field}__in': ids}).update(**{child_field: keep_id})
+            model.objects.filter(id__in=ids).delete()
+            if is_task:
+                SearchTerm.objects.filter(kind='task', object_id__in=ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0002_search_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='longtermgoal',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='shorttermgoal',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='speecharea',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='title_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='longtermgoal',
+            constraint=models.UniqueConstraint(fields=('speech_area', 'title_key'), name='therapy_longtermgoal_unique_key', violation_error_message='This speech area already has a long-term goal with this title.'),
+        ),
+        migrations.AddConstraint(
+            model_name='shorttermgoal',
+            constraint=models.UniqueConstraint(fields=('long_term_goal', 'title_key'), name='therapy_shorttermgoal_unique_key', violation_error_message='This long-term goal already has a short-term goal with this title.'),
+        ),
+        migrations.AddConstraint(
+            model_name='speecharea',
+            constraint=models.UniqueConstraint(fields=('title_key',), name='therapy_speecharea_unique_key', violation_error_message='A speech area with this name already exists.'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('short_term_goal', 'title_key'), name='therapy_task_unique_key', violation_error_message='This short-term goal already has a task with this title.'),
+        ),
+    ]
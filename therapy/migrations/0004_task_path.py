@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_task_paths(apps, schema_editor):
+    ShortTermGoal = apps.get_model('therapy', 'ShortTermGoal')
+    Task = apps.get_model('therapy', 'Task')
+    goals = ShortTermGoal.objects.filter(pk=OuterRef('short_term_goal_id'))
+    Task.objects.update(
+        long_term_goal_id=Subquery(goals.values('long_term_goal_id')[:1]),
+        speech_area_id=Subquery(goals.values('long_term_goal__speech_area_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0003_catalog_title_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='long_term_goal',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='therapy.longtermgoal'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='speech_area',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='therapy.speecharea'),
+        ),
+        migrations.RunPython(fill_task_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:21
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+
+def fill_paths(apps, schema_editor):
+    # Frozen copy of therapy.hierarchy.rebuild: parent path + zero-padded parent id
+    levels = [
+        (apps.get_model('therapy', 'SpeechArea'), None),
+        (apps.get_model('therapy', 'LongTermGoal'), 'speech_area_id'),
+        (apps.get_model('therapy', 'ShortTermGoal'), 'long_term_goal_id'),
+        (apps.get_model('therapy', 'Task'), 'short_term_goal_id'),
+    ]
+    for (parent_model, _), (model, parent_field) in zip(levels, levels[1:]):
+        parent_path = Subquery(parent_model.objects.filter(pk=OuterRef(parent_field)).values('path')[:1])
+        model.objects.filter(**{f'{parent_field}__isnull': False}).update(path=Concat(
+            parent_path, LPad(Cast(parent_field, CharField()), 10, Value('0')), Value('/'),
+            output_field=CharField(),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0004_task_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='longtermgoal',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='shorttermgoal',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='speecharea',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
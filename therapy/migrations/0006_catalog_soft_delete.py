@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0005_catalog_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='longtermgoal',
+            index=models.Index(fields=['is_active', 'path'], name='therapy_ltg_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shorttermgoal',
+            index=models.Index(fields=['is_active', 'path'], name='therapy_stg_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='speecharea',
+            index=models.Index(fields=['is_active', 'path'], name='therapy_area_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['is_active', 'path'], name='therapy_task_active_idx'),
+        ),
+    ]
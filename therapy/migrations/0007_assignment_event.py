@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_events(apps, schema_editor):
+    """
+    One "assigned" event per existing assignment at its assigned_date, and
+    a "completed" event for completed ones. When they were completed was
+    never stored, so those are stamped with the assigned_date too.
+    """
+    Assignment = apps.get_model('therapy', 'Assignment')
+    AssignmentEvent = apps.get_model('therapy', 'AssignmentEvent')
+    rows = Assignment.objects.order_by('id').values_list(
+        'id', 'child_id', 'therapist_id', 'task_id', 'child__clinic_id', 'task__speech_area_id',
+        'assigned_date', 'completed',
+    )
+    events = []
+    for assignment_id, child_id, therapist_id, task_id, clinic_id, speech_area_id, assigned, completed in rows.iterator():
+        ids = dict(
+            assignment_id=assignment_id, child_id=child_id, therapist_id=therapist_id, task_id=task_id,
+            clinic_id=clinic_id, speech_area_id=speech_area_id, created_at=assigned,
+        )
+        events.append(AssignmentEvent(kind='assigned', **ids))
+        if completed:
+            events.append(AssignmentEvent(kind='completed', **ids))
+        if len(events) >= 2000:
+            AssignmentEvent.objects.bulk_create(events)
+            events = []
+    AssignmentEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('therapy', '0006_catalog_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('assigned', 'Assigned'), ('started', 'Started'), ('completed', 'Completed'), ('reopened', 'Reopened')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment_id', models.BigIntegerField()),
+                ('child_id', models.BigIntegerField()),
+                ('therapist_id', models.BigIntegerField()),
+                ('task_id', models.BigIntegerField()),
+                ('clinic_id', models.BigIntegerField(blank=True, null=True)),
+                ('speech_area_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['child_id', 'created_at'], name='therapy_event_child_time_idx'), models.Index(fields=['assignment_id', 'created_at'], name='therapy_event_assignment_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
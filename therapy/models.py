@@ -1,17 +1,167 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db.models.signals import post_delete
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from clinic.models import Clinic
+from . import hierarchy
+from .text import title_key, TITLE_KEY_LENGTH
+
+
+class CatalogQuerySet(models.QuerySet):
+    def deactivate(self):
+        """
+        Soft-delete these rows and everything below them: one UPDATE per
+        level. Assignments keep pointing at the deactivated tasks.
+        Returns {model name: rows deactivated}.
+        """
+        from .catalog import bump_catalog_version
+        result = hierarchy.deactivate(self)
+        if any(result.values()):
+            transaction.on_commit(bump_catalog_version)
+        return result
+
+    def active_or(self, pk):
+        """Active rows, plus row `pk` even if it was deactivated after being chosen"""
+        return self.filter(models.Q(is_active=True) | models.Q(pk=pk))
+
+
+class ActiveCatalogManager(models.Manager.from_queryset(CatalogQuerySet)):
+    """Hides deactivated rows; use `all_objects` to include them"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
+class CatalogNode(models.Model):
+    """
+    Base for the speech area -> goal -> task catalog. `title_key` is the
+    normalized title (see therapy.text.title_key), unique among siblings,
+    so duplicate checks are an index lookup instead of an iexact scan.
+    `path` holds the ancestor ids (see therapy.hierarchy) so a subtree is
+    one indexed range per level.
+
+    Catalog rows are soft-deleted (`deactivate()`); the default manager
+    only returns active rows. Forward foreign keys (assignment.task) still
+    resolve deactivated rows through the base manager, but form and
+    serializer fields choose from the default one; editing a row that points
+    at a deactivated node needs `all_objects.active_or(pk)` as the choices.
+    """
+    title_source = 'title'
+    # Foreign key to the level above; None for the root level
+    parent_field = None
+    # Fields set_path() fills
+    path_fields = ('path',)
+
+    title_key = models.CharField(max_length=TITLE_KEY_LENGTH, editable=False, default='')
+    path = models.CharField(max_length=64, editable=False, default='', db_index=True)
+
+    objects = ActiveCatalogManager()
+    all_objects = CatalogQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def validate_constraints(self, exclude=None):
+        # title_key is not editable, so forms exclude it; check it whenever
+        # the title it derives from is being validated
+        if exclude is None or self.title_source not in exclude:
+            self.title_key = title_key(getattr(self, self.title_source))
+            exclude = set(exclude or ()) - {'title_key'}
+        super().validate_constraints(exclude=exclude)
+        # Django checks the constraints through the default manager, which
+        # hides deactivated rows; their titles are still taken
+        for constraint in self._meta.constraints:
+            fields = getattr(constraint, 'fields', ())
+            if 'title_key' not in fields or set(fields) & set(exclude or ()):
+                continue
+            lookup = {field: getattr(self, self._meta.get_field(field).attname) for field in fields}
+            if type(self).all_objects.filter(**lookup).exclude(pk=self.pk).exists():
+                raise ValidationError(constraint.get_violation_error_message())
+
+    def set_path(self):
+        """Fill `path` from the current parent"""
+        parent_id = getattr(self, f'{self.parent_field}_id')
+        parent_model = self._meta.get_field(self.parent_field).related_model
+        if parent_id is None:
+            self.path = ''
+        elif parent_model.parent_field is None:
+            self.path = hierarchy.segment(parent_id)
+        else:
+            parent_path = parent_model._base_manager.filter(pk=parent_id).values_list('path', flat=True).first()
+            self.path = '' if parent_path is None else parent_path + hierarchy.segment(parent_id)
+
+    def subtree_moved(self, old_prefix):
+        """Called after a save re-parented this node"""
+        hierarchy.move_subtree(self, old_prefix)
+
+    def deactivate(self):
+        """Soft-delete this node and its subtree"""
+        result = type(self).all_objects.filter(pk=self.pk).deactivate()
+        self.is_active = False
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # save() cascades when a row loaded active is saved inactive
+        instance._loaded_active = instance.__dict__.get('is_active')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.title_key = title_key(getattr(self, self.title_source))
+        update_fields = kwargs.get('update_fields')
+        extra_fields = set()
+        if update_fields is not None and self.title_source in update_fields:
+            extra_fields.add('title_key')
+
+        old_prefix = None
+        parent_fields = {self.parent_field, f'{self.parent_field}_id'}
+        if self.parent_field and (update_fields is None or parent_fields & set(update_fields)):
+            old_path = None if self._state.adding else self.path
+            self.set_path()
+            extra_fields.update(self.path_fields)
+            if old_path is not None and old_path != self.path:
+                old_prefix = old_path + hierarchy.segment(self.pk)
+
+        deactivated = (
+            getattr(self, '_loaded_active', None) and not self.is_active
+            and (update_fields is None or 'is_active' in update_fields)
+        )
+
+        if update_fields is not None and extra_fields:
+            kwargs['update_fields'] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+        self._loaded_active = self.is_active
+        if old_prefix is not None:
+            self.subtree_moved(old_prefix)
+        if deactivated and hierarchy.descendant_models(type(self)):
+            # Saving a node inactive (API update, admin form) takes its
+            # subtree with it, as deactivate() does
+            hierarchy.deactivate(type(self)._base_manager.filter(pk=self.pk))
 
 
 # Speech Area Model
-class SpeechArea(models.Model):
+class SpeechArea(CatalogNode):
+    title_source = 'name'
+
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
-    
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title_key'], name='therapy_speecharea_unique_key',
+                violation_error_message='A speech area with this name already exists.',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['is_active', 'path'], name='therapy_area_active_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -36,29 +186,69 @@ class TherapistProfile(models.Model):
 
 
 # Long-Term Goal Model
-class LongTermGoal(models.Model):
+class LongTermGoal(CatalogNode):
+    parent_field = 'speech_area'
+
     speech_area = models.ForeignKey(SpeechArea, on_delete=models.CASCADE, related_name='long_term_goals')
     title = models.CharField(max_length=500)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
-    
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['speech_area', 'title_key'], name='therapy_longtermgoal_unique_key',
+                violation_error_message='This speech area already has a long-term goal with this title.',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['is_active', 'path'], name='therapy_ltg_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.speech_area.name}: {self.title}"
 
+    def subtree_moved(self, old_prefix):
+        super().subtree_moved(old_prefix)
+        Task._base_manager.filter(long_term_goal=self).update(speech_area_id=self.speech_area_id)
+
 
 # Short-Term Goal Model  
-class ShortTermGoal(models.Model):
+class ShortTermGoal(CatalogNode):
+    parent_field = 'long_term_goal'
+
     long_term_goal = models.ForeignKey(LongTermGoal, on_delete=models.CASCADE, related_name='short_term_goals')
     title = models.CharField(max_length=500)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
-    
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['long_term_goal', 'title_key'], name='therapy_shorttermgoal_unique_key',
+                violation_error_message='This long-term goal already has a short-term goal with this title.',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['is_active', 'path'], name='therapy_stg_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.long_term_goal.speech_area.name}: {self.title}"
 
+    def subtree_moved(self, old_prefix):
+        super().subtree_moved(old_prefix)
+        speech_area_id, _ = hierarchy.ancestor_ids(self.path)
+        Task._base_manager.filter(short_term_goal=self).update(
+            long_term_goal_id=self.long_term_goal_id, speech_area_id=speech_area_id
+        )
+
 
 # Task Model (updated)
-class Task(models.Model):
+class Task(CatalogNode):
+    parent_field = 'short_term_goal'
+    path_fields = ('path', 'long_term_goal', 'speech_area')
+
     short_term_goal = models.ForeignKey(ShortTermGoal, on_delete=models.CASCADE, related_name='tasks', null=True,  # 👈 allow null
         blank=True )
     title = models.CharField(max_length=500)
@@ -69,9 +259,37 @@ class Task(models.Model):
         default='beginner'
     )
     is_active = models.BooleanField(default=True)
-    
+    # Copied from short_term_goal so filtering by goal or speech area is one
+    # indexed column instead of a three-table join. Set with the path by
+    # save() and moved with it when a goal is re-parented; bulk writers set
+    # them explicitly.
+    long_term_goal = models.ForeignKey(
+        LongTermGoal, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True, editable=False
+    )
+    speech_area = models.ForeignKey(
+        SpeechArea, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True, editable=False
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['short_term_goal', 'title_key'], name='therapy_task_unique_key',
+                violation_error_message='This short-term goal already has a task with this title.',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['is_active', 'path'], name='therapy_task_active_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.short_term_goal.long_term_goal.speech_area.name}: {self.title}"
+        if self.speech_area_id is None:
+            return self.title
+        return f"{self.speech_area.name}: {self.title}"
+
+    def set_path(self):
+        super().set_path()
+        ancestors = hierarchy.ancestor_ids(self.path)
+        self.speech_area_id, self.long_term_goal_id = ancestors[:2] if len(ancestors) == 3 else (None, None)
 
 
 # Parent Profile (Client)
@@ -154,17 +372,58 @@ class Assignment(models.Model):
         return f"{self.task.title} assigned to {self.child.name} by {self.therapist.first_name}"
 
 
+# Append-only assignment history. Rows are written in bulk by
+# therapy.services.record_events and never updated; they outlive the
+# assignment, so the ids are plain columns rather than foreign keys.
+class AssignmentEvent(models.Model):
+    ASSIGNED = 'assigned'
+    STARTED = 'started'
+    COMPLETED = 'completed'
+    REOPENED = 'reopened'
+    KIND_CHOICES = [
+        (ASSIGNED, 'Assigned'),
+        (STARTED, 'Started'),
+        (COMPLETED, 'Completed'),
+        (REOPENED, 'Reopened'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+    assignment_id = models.BigIntegerField()
+    child_id = models.BigIntegerField()
+    therapist_id = models.BigIntegerField()
+    task_id = models.BigIntegerField()
+    # Copied from the child and task so progress queries need no join
+    clinic_id = models.BigIntegerField(null=True, blank=True)
+    speech_area_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['child_id', 'created_at'], name='therapy_event_child_time_idx'),
+            models.Index(fields=['assignment_id', 'created_at'], name='therapy_event_assignment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} assignment {self.assignment_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Assignment events are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Assignment events are append-only')
+
+
 # Signal handlers to auto-delete User accounts when profiles are deleted
 @receiver(post_delete, sender=TherapistProfile)
 def delete_therapist_user(sender, instance, **kwargs):
     if instance.email:
         from django.contrib.auth import get_user_model
         User = get_user_model()
-        try:
-            user = User.objects.get(email=instance.email)
+        user = User.objects.get_by_email(instance.email)
+        if user is not None:
             user.delete()
-        except User.DoesNotExist:
-            pass
 
 
 # Signal to create user when ParentProfile is created
@@ -200,8 +459,32 @@ def delete_parent_user(sender, instance, **kwargs):
     if instance.parent_email:
         from django.contrib.auth import get_user_model
         User = get_user_model()
-        try:
-            user = User.objects.get(email=instance.parent_email)
+        user = User.objects.get_by_email(instance.parent_email)
+        if user is not None:
             user.delete()
-        except User.DoesNotExist:
-            pass
+
+
+# Search index: one row per (document, normalized word). See therapy/search.py
+class SearchTerm(models.Model):
+    KIND_CHOICES = [
+        ('client', 'Client'),
+        ('therapist', 'Therapist'),
+        ('task', 'Task'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+    # Copied from the document so role scoping needs no join
+    clinic_id = models.BigIntegerField(null=True, blank=True)
+    therapist_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'kind'], name='therapy_search_term_idx'),
+            models.Index(fields=['kind', 'object_id'], name='therapy_search_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.term}"
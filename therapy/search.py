@@ -0,0 +1,256 @@
+"""
+Word index for searching clients, therapists and the task catalog.
+
+Each searchable row is split into normalized words (accents folded,
+lowercased, punctuation dropped) and stored in `SearchTerm` with a weight
+per field. A query matches the documents containing every query word as a
+prefix, so "jo smi" finds "John Smith" while it is being typed. Each word
+is a `LIKE 'word%'` range on the (term, kind) index, which behaves the same
+on MySQL and SQLite, and matches are ranked by the summed weights of the
+terms they hit, with whole-word hits counting double.
+
+The receivers below keep the index current on save/delete. Bulk writes that
+skip signals call `index_queryset`; `rebuild_search_index` regenerates it.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, When, Value, F, Q, Max, Sum, IntegerField
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from clinic.models import Clinic
+
+from .models import SearchTerm, ParentProfile, TherapistProfile, Task
+from . import text
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_WORDS = 6
+
+# kind -> (model, {field: weight}, fields copied into the scope columns)
+SOURCES = {
+    'client': (
+        ParentProfile,
+        {'first_name': 10, 'last_name': 10, 'parent_email': 4, 'phone_number': 3},
+        ('clinic_id', 'assigned_therapist_id'),
+    ),
+    'therapist': (
+        TherapistProfile,
+        {'first_name': 10, 'last_name': 10, 'email': 4, 'phone_number': 3},
+        ('clinic_id', 'id'),
+    ),
+    'task': (
+        Task,
+        {'title': 8, 'description': 2},
+        (None, None),
+    ),
+}
+
+
+def normalize_words(value):
+    """Accent-folded lowercase words of `value`, cut to the term column length"""
+    return [word[:MAX_TERM_LENGTH] for word in text.words(value)]
+
+
+def terms_for(kind, obj):
+    """SearchTerm rows (unsaved) for one document"""
+    _, fields, (clinic_field, therapist_field) = SOURCES[kind]
+    weights = {}
+    for field, weight in fields.items():
+        value = getattr(obj, field)
+        words = normalize_words(value)
+        if field == 'phone_number' and len(words) > 1:
+            # "+1 (555) 123-4567" is also findable as 15551234567
+            words.append(''.join(words)[:MAX_TERM_LENGTH])
+        for word in words:
+            weights[word] = max(weights.get(word, 0), weight)
+
+    clinic_id = getattr(obj, clinic_field) if clinic_field else None
+    therapist_id = getattr(obj, therapist_field) if therapist_field else None
+    return [
+        SearchTerm(
+            kind=kind, object_id=obj.pk, term=term, weight=weight,
+            clinic_id=clinic_id, therapist_id=therapist_id,
+        )
+        for term, weight in weights.items()
+    ]
+
+
+def index_objects(kind, objects):
+    """Replace the index rows of `objects` (instances of the kind's model)"""
+    objects = list(objects)
+    if not objects:
+        return
+    SearchTerm.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects]).delete()
+    SearchTerm.objects.bulk_create(
+        [term for obj in objects for term in terms_for(kind, obj)], batch_size=2000
+    )
+
+
+def index_queryset(kind, queryset=None, batch_size=1000):
+    """Index every row of `queryset` (default: the whole model) in id-ordered batches"""
+    model, fields, scope_fields = SOURCES[kind]
+    if queryset is None:
+        # Deactivated tasks stay indexed; load_matches() hides them
+        queryset = model._base_manager.all()
+    queryset = queryset.only('id', *fields, *(field for field in scope_fields if field)).order_by('id')
+
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return indexed
+        index_objects(kind, batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
+
+
+def unindex(kind, object_id):
+    SearchTerm.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def _query_words(query):
+    return list(dict.fromkeys(normalize_words(query)))[:MAX_QUERY_WORDS]
+
+
+def _matching_terms(words, kinds, scope):
+    """SearchTerm rows hitting any of `words`, and one flag aggregate per word"""
+    matches = [Q(term__istartswith=word) for word in words]
+    terms = SearchTerm.objects.filter(reduce(or_, matches))
+    if kinds:
+        terms = terms.filter(kind__in=kinds)
+    if scope is not None:
+        terms = terms.filter(scope)
+
+    # One flag per query word; a document must match all of them
+    flags = {
+        f'matched_{i}': Max(Case(When(match, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, match in enumerate(matches)
+    }
+    return terms, flags
+
+
+def search(query, kinds=None, scope=None, limit=20):
+    """
+    Ranked matches for `query` as dicts with kind, object_id and score.
+
+    `kinds` limits the document types; `scope` is a Q over SearchTerm
+    columns (kind, object_id, clinic_id, therapist_id) restricting what the
+    caller may see.
+    """
+    words = _query_words(query)
+    if not words:
+        return []
+
+    terms, flags = _matching_terms(words, kinds, scope)
+    rows = (
+        terms.values('kind', 'object_id')
+        .annotate(
+            score=Sum(Case(
+                When(term__in=words, then=F('weight') * 2), default=F('weight'), output_field=IntegerField()
+            )),
+            **flags,
+        )
+        .filter(**{name: 1 for name in flags})
+        .order_by('-score', 'kind', 'object_id')
+    )
+    if limit:
+        rows = rows[:limit]
+    return [{'kind': row['kind'], 'object_id': row['object_id'], 'score': row['score']} for row in rows]
+
+
+def matching_documents(kind, query, scope=None):
+    """
+    Subquery of the ids of every `kind` document matching `query`, unranked
+    and uncapped, for filtering a queryset with `id__in`.
+    """
+    words = _query_words(query)
+    if not words:
+        return SearchTerm.objects.none().values('object_id')
+    terms, flags = _matching_terms(words, [kind], scope)
+    return (
+        terms.values('object_id')
+        .annotate(**flags)
+        .filter(**{name: 1 for name in flags})
+        .values('object_id')
+    )
+
+
+def search_scope(user):
+    """
+    Q over SearchTerm columns for what `user` may find, or None for nothing:
+    clinic admins their clinic's clients and therapists, therapists their
+    own clients and profile, everyone the task catalog.
+    """
+    if user.is_superuser:
+        return Q()
+
+    role = getattr(getattr(user, "role", None), "name", "").lower()
+    catalog = Q(kind='task')
+    if role == "clinic admin":
+        clinic_id = Clinic.objects.filter(clinic_admin=user).values_list('id', flat=True).first()
+        if clinic_id is None:
+            return catalog
+        return catalog | Q(kind__in=['client', 'therapist'], clinic_id=clinic_id)
+    elif role == "therapist":
+        therapist_id = TherapistProfile.objects.filter(email=user.email).values_list('id', flat=True).first()
+        if therapist_id is None:
+            return catalog
+        return catalog | Q(kind='client', therapist_id=therapist_id) | Q(kind='therapist', object_id=therapist_id)
+    elif role == "parent":
+        return catalog
+    return None
+
+
+def load_matches(matches, select_related=None):
+    """
+    Attach the matched model instances (`match['object']`), one query per
+    kind, dropping matches whose row no longer exists or, for catalog
+    models, is deactivated.
+    """
+    select_related = select_related or {}
+    ids_by_kind = {}
+    for match in matches:
+        ids_by_kind.setdefault(match['kind'], []).append(match['object_id'])
+
+    objects = {}
+    for kind, ids in ids_by_kind.items():
+        model = SOURCES[kind][0]
+        queryset = model.objects.select_related(*select_related.get(kind, ()))
+        objects[kind] = queryset.in_bulk(ids)
+
+    loaded = []
+    for match in matches:
+        obj = objects[match['kind']].get(match['object_id'])
+        if obj is not None:
+            loaded.append({**match, 'object': obj})
+    return loaded
+
+
+def _indexed_fields(kind):
+    _, fields, scope_fields = SOURCES[kind]
+    names = set(fields)
+    for field in scope_fields:
+        if field:
+            names.update({field, field.removesuffix('_id')})
+    return names
+
+
+def _connect(kind):
+    model = SOURCES[kind][0]
+    indexed_fields = _indexed_fields(kind)
+
+    @receiver(post_save, sender=model, weak=False, dispatch_uid=f'search_index_{kind}')
+    def reindex(sender, instance, update_fields=None, raw=False, **kwargs):
+        if raw or (update_fields and not indexed_fields.intersection(update_fields)):
+            return
+        index_objects(kind, [instance])
+
+    @receiver(post_delete, sender=model, weak=False, dispatch_uid=f'search_unindex_{kind}')
+    def drop(sender, instance, **kwargs):
+        unindex(kind, instance.pk)
+
+
+for _kind in SOURCES:
+    _connect(_kind)
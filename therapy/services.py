@@ -0,0 +1,79 @@
+from django.db import connection, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from neuvii_backend.metrics import ASSIGNMENTS_CREATED
+
+from .models import Task, Assignment, AssignmentEvent
+
+
+def assign_tasks_to_child(child, therapist, task_ids):
+    """
+    Assign the given tasks to a child, skipping tasks the therapist already
+    assigned to them.
+
+    Runs a fixed number of queries however many tasks are selected: one to
+    load the tasks, one to find existing assignments, one bulk INSERT and
+    one bulk INSERT of their "assigned" events (plus one SELECT of the new
+    ids on backends that don't return them from bulk inserts).
+
+    Returns:
+        list: (assignment, task) pairs for the newly created assignments
+    """
+    # Keep the caller's order but drop duplicate ids
+    task_ids = list(dict.fromkeys(int(task_id) for task_id in task_ids))
+
+    tasks = Task.objects.in_bulk(task_ids)
+    if len(tasks) != len(task_ids):
+        raise Http404('No Task matches the given query.')
+
+    # The assignments and their events are written together or not at all
+    with transaction.atomic():
+        existing = set(
+            Assignment.objects.filter(child=child, therapist=therapist, task_id__in=task_ids)
+            .values_list('task_id', flat=True)
+        )
+        new_assignments = [
+            Assignment(child=child, therapist=therapist, task=tasks[task_id])
+            for task_id in task_ids
+            if task_id not in existing
+        ]
+
+        Assignment.objects.bulk_create(new_assignments)
+        if new_assignments and not connection.features.can_return_rows_from_bulk_insert:
+            # MySQL doesn't report the new ids; (child, therapist, task) is unique here
+            ids = dict(
+                Assignment.objects.filter(
+                    child=child, therapist=therapist, task_id__in=[a.task_id for a in new_assignments]
+                ).values_list('task_id', 'id')
+            )
+            for assignment in new_assignments:
+                assignment.pk = ids[assignment.task_id]
+        record_events(AssignmentEvent.ASSIGNED, new_assignments)
+    ASSIGNMENTS_CREATED.inc(len(new_assignments))
+
+    return [(assignment, assignment.task) for assignment in new_assignments]
+
+
+def record_events(kind, assignments, at=None):
+    """
+    Append one `kind` event per assignment with a single bulk INSERT.
+    Reads assignment.child.clinic_id and assignment.task.speech_area_id, so
+    load those relations up front.
+    """
+    at = at or timezone.now()
+    AssignmentEvent.objects.bulk_create([
+        AssignmentEvent(
+            kind=kind, created_at=at, assignment_id=assignment.pk,
+            child_id=assignment.child_id, therapist_id=assignment.therapist_id, task_id=assignment.task_id,
+            clinic_id=assignment.child.clinic_id, speech_area_id=assignment.task.speech_area_id,
+        )
+        for assignment in assignments
+    ])
+
+
+def completion_event(was_completed, assignment):
+    """The event kind for a change of `completed`, or None"""
+    if assignment.completed == was_completed:
+        return None
+    return AssignmentEvent.COMPLETED if assignment.completed else AssignmentEvent.REOPENED
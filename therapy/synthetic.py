@@ -0,0 +1,348 @@
+"""
+Synthetic dataset generator used by `generate_synthetic_data` and the API
+benchmark harness.
+
+Rows are written with `bulk_create` in batches. This bypasses the profile
+`post_save` signals (no user accounts created one by one, no welcome emails)
+so the matching users are bulk-inserted here with one pre-computed password
+hash, and the search index is filled per clinic. All randomness comes from
+a single seeded `random.Random`, so the same arguments always produce the
+same dataset.
+"""
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import User, Role, canonicalize_email
+from clinic.models import Clinic
+from reports.models import DailyRollup
+from .models import (
+    TherapistProfile, ParentProfile, Child, Assignment, AssignmentEvent,
+    SpeechArea, LongTermGoal, ShortTermGoal, Task
+)
+from .hierarchy import segment
+from .search import index_queryset
+from .text import title_key
+from .catalog import bump_catalog_version
+
+SYNTHETIC_DOMAIN = 'synthetic.neuvii.local'
+SYNTHETIC_CLINIC_PREFIX = 'Synthetic Clinic'
+DEFAULT_PASSWORD = 'synthetic-pass-123'
+
+FIRST_NAMES = [
+    'Olivia', 'Liam', 'Emma', 'Noah', 'Ava', 'Elijah', 'Sophia', 'Lucas', 'Mia', 'Mason',
+    'Amelia', 'Ethan', 'Harper', 'Logan', 'Aria', 'Aiden', 'Chloe', 'Jackson', 'Layla', 'Leo',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Taylor',
+    'Anderson', 'Thomas', 'Moore', 'Martin', 'Lee', 'Thompson', 'White', 'Harris', 'Clark', 'Lewis',
+]
+DIFFICULTIES = ['beginner', 'intermediate', 'advanced']
+
+
+def batched(iterable, size):
+    """Yield lists of at most `size` items from `iterable`"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """
+    Temporarily turn off `auto_now_add` on the given fields so generated rows
+    can carry back-dated timestamps instead of "now".
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+class SyntheticDataGenerator:
+    """
+    Generate clinics with therapists, parents, children and assignments.
+
+    With `realistic=True` the per-node counts are drawn from distributions
+    around the requested means (therapist head-count, caseload size, children
+    per family, a long-tailed number of assignments per child, Zipf-like task
+    popularity and completion that rises with assignment age). With
+    `realistic=False` every node gets exactly the requested count, which is
+    what the benchmark harness needs for comparable runs.
+    """
+
+    def __init__(self, clinics=10, therapists_per_clinic=8, clients_per_therapist=25,
+                 assignments_per_child=40, speech_areas=4, long_term_goals=5,
+                 short_term_goals=4, tasks_per_goal=6, days=365, seed=0,
+                 batch_size=5000, realistic=True, password=DEFAULT_PASSWORD, log=None):
+        self.clinics = clinics
+        self.therapists_per_clinic = therapists_per_clinic
+        self.clients_per_therapist = clients_per_therapist
+        self.assignments_per_child = assignments_per_child
+        self.catalog_shape = (speech_areas, long_term_goals, short_term_goals, tasks_per_goal)
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+        self.realistic = realistic
+        self.password = password
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.counts = {
+            'clinics': 0, 'therapists': 0, 'parents': 0, 'children': 0, 'assignments': 0, 'events': 0, 'users': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Distributions
+    # ------------------------------------------------------------------
+    def _around(self, mean, spread=0.3, minimum=1):
+        if not self.realistic:
+            return mean
+        return max(minimum, int(round(self.rng.gauss(mean, mean * spread))))
+
+    def _children_per_family(self):
+        if not self.realistic:
+            return 1
+        return self.rng.choices([1, 2, 3], weights=[85, 12, 3])[0]
+
+    def _assignments_per_child(self):
+        if not self.realistic:
+            return self.assignments_per_child
+        # Log-normal with the requested mean: most children get a modest
+        # programme, a few long-running cases accumulate hundreds of tasks.
+        sigma = 0.8
+        mu = math.log(max(self.assignments_per_child, 1)) - sigma ** 2 / 2
+        return int(self.rng.lognormvariate(mu, sigma))
+
+    def _name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+    def run(self):
+        self.roles = {
+            name: Role.objects.get_or_create(name=name)[0]
+            for name in ['clinic admin', 'therapist', 'parent', 'super admin']
+        }
+        self.password_hash = make_password(self.password)
+        self.task_ids = self.ensure_catalog()
+
+        # Zipf-like popularity: a handful of tasks are assigned far more often
+        weights = [1 / (rank ** 1.1) for rank in range(1, len(self.task_ids) + 1)]
+        self.rng.shuffle(self.task_ids)
+        self.task_cum_weights = list(accumulate(weights))
+
+        for index in range(self.clinics):
+            with transaction.atomic():
+                self.create_clinic(index)
+            self.log(
+                f"Clinic {index + 1}/{self.clinics}: "
+                f"{self.counts['therapists']} therapists, {self.counts['parents']} clients, "
+                f"{self.counts['assignments']} assignments so far"
+            )
+        return self.counts
+
+    def ensure_catalog(self):
+        """Return active task ids, creating a synthetic catalog if there is none"""
+        task_ids = list(Task.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        if task_ids:
+            return task_ids
+
+        areas, ltgs, stgs, tasks = self.catalog_shape
+        SpeechArea.objects.bulk_create([
+            SpeechArea(name=f'Synthetic Area {a}', title_key=title_key(f'Synthetic Area {a}'),
+                       description='Generated speech area')
+            for a in range(areas)
+        ])
+        area_ids = SpeechArea.objects.filter(name__startswith='Synthetic Area ').values_list('id', flat=True)
+        LongTermGoal.objects.bulk_create([
+            LongTermGoal(speech_area_id=area_id, title=f'Long-term goal {l + 1}',
+                         title_key=title_key(f'Long-term goal {l + 1}'), path=segment(area_id))
+            for area_id in area_ids for l in range(ltgs)
+        ])
+        ltg_paths = list(LongTermGoal.objects.filter(speech_area_id__in=list(area_ids)).values_list('id', 'path'))
+        ShortTermGoal.objects.bulk_create([
+            ShortTermGoal(long_term_goal_id=ltg_id, title=f'Short-term goal {s + 1}',
+                          title_key=title_key(f'Short-term goal {s + 1}'), path=path + segment(ltg_id))
+            for ltg_id, path in ltg_paths for s in range(stgs)
+        ])
+        stg_paths = list(
+            ShortTermGoal.objects.filter(long_term_goal_id__in=[ltg_id for ltg_id, _ in ltg_paths])
+            .values_list('id', 'long_term_goal_id', 'long_term_goal__speech_area_id', 'path')
+        )
+        stg_ids = [stg_id for stg_id, _, _, _ in stg_paths]
+        Task.objects.bulk_create(
+            [
+                Task(
+                    short_term_goal_id=stg_id, long_term_goal_id=ltg_id, speech_area_id=area_id,
+                    path=path + segment(stg_id), title=f'Task {t + 1}', title_key=title_key(f'Task {t + 1}'),
+                    difficulty=DIFFICULTIES[t % len(DIFFICULTIES)]
+                )
+                for stg_id, ltg_id, area_id, path in stg_paths for t in range(tasks)
+            ],
+            batch_size=self.batch_size,
+        )
+        index_queryset('task', Task.objects.filter(short_term_goal_id__in=stg_ids), batch_size=self.batch_size)
+        bump_catalog_version()
+        return list(Task.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+
+    def _user(self, email, first_name, last_name, role_name):
+        return User(
+            email=email,
+            email_canonical=canonicalize_email(email),
+            first_name=first_name,
+            last_name=last_name,
+            role=self.roles[role_name],
+            password=self.password_hash,
+            is_staff=True,
+            password_reset_required=False,
+        )
+
+    def create_clinic(self, index):
+        prefix = f'{self.seed}.{index}'
+
+        first, last = self._name()
+        admin = self._user(f'clinicadmin.{prefix}@{SYNTHETIC_DOMAIN}', first, last, 'clinic admin')
+        User.objects.bulk_create([admin])
+        admin = User.objects.get(email=admin.email)
+        clinic = Clinic.objects.create(
+            name=f'{SYNTHETIC_CLINIC_PREFIX} {prefix}',
+            contact_person_name=f'{first} {last}',
+            clinic_admin=admin,
+            license_status='Active',
+        )
+        self.counts['clinics'] += 1
+        self.counts['users'] += 1
+
+        # Therapists
+        therapists = []
+        for t in range(self._around(self.therapists_per_clinic)):
+            first, last = self._name()
+            therapists.append(TherapistProfile(
+                first_name=first, last_name=last, clinic=clinic,
+                email=f'therapist.{prefix}.{t}@{SYNTHETIC_DOMAIN}',
+            ))
+        TherapistProfile.objects.bulk_create(therapists, batch_size=self.batch_size)
+        therapist_ids = list(TherapistProfile.objects.filter(clinic=clinic).order_by('id').values_list('id', flat=True))
+
+        # Clients (parent profiles), spread over the clinic's therapists
+        parents = []
+        for therapist_id in therapist_ids:
+            for p in range(self._around(self.clients_per_therapist, minimum=0)):
+                first, last = self._name()
+                parents.append(ParentProfile(
+                    first_name=first, last_name=last, clinic=clinic,
+                    parent_email=f'parent.{prefix}.{therapist_id}.{p}@{SYNTHETIC_DOMAIN}',
+                    assigned_therapist_id=therapist_id,
+                    age=self.rng.randint(2, 12),
+                    fscd_approval='approve' if self.rng.random() < 0.9 else 'reject',
+                ))
+        ParentProfile.objects.bulk_create(parents, batch_size=self.batch_size)
+        index_queryset('therapist', TherapistProfile.objects.filter(clinic=clinic), batch_size=self.batch_size)
+        index_queryset('client', ParentProfile.objects.filter(clinic=clinic), batch_size=self.batch_size)
+
+        User.objects.bulk_create(
+            [self._user(t.email, t.first_name, t.last_name, 'therapist') for t in therapists] +
+            [self._user(p.parent_email, p.first_name, p.last_name, 'parent') for p in parents],
+            batch_size=self.batch_size,
+        )
+
+        # Children: most families have one child in therapy
+        parent_rows = ParentProfile.objects.filter(clinic=clinic).values_list(
+            'id', 'last_name', 'assigned_therapist_id', 'age'
+        )
+        children = []
+        for parent_id, last_name, therapist_id, age in parent_rows.iterator():
+            for _ in range(self._children_per_family()):
+                created_at = self.now - timedelta(days=self.rng.randint(0, self.days))
+                children.append(Child(
+                    name=f'{self.rng.choice(FIRST_NAMES)} {last_name}',
+                    age=age or self.rng.randint(2, 12),
+                    gender=self.rng.choice(['male', 'female', 'other']),
+                    clinic=clinic, parent_id=parent_id,
+                    assigned_therapist_id=therapist_id,
+                    created_at=created_at,
+                ))
+        with explicit_timestamps(Child, 'created_at'):
+            Child.objects.bulk_create(children, batch_size=self.batch_size)
+
+        # Assignments are streamed in batches so millions of rows never sit in memory
+        child_rows = Child.objects.filter(clinic=clinic).values_list('id', 'assigned_therapist_id')
+        with explicit_timestamps(Assignment, 'assigned_date'):
+            for batch in batched(self._assignments(child_rows.iterator()), self.batch_size):
+                Assignment.objects.bulk_create(batch)
+                self.counts['assignments'] += len(batch)
+
+        # Their history, read back because MySQL bulk inserts don't return ids
+        assignment_rows = Assignment.objects.filter(child__clinic=clinic).values_list(
+            'id', 'child_id', 'therapist_id', 'task_id', 'task__speech_area_id', 'assigned_date', 'completed'
+        )
+        for batch in batched(self._events(clinic.id, assignment_rows.iterator()), self.batch_size):
+            AssignmentEvent.objects.bulk_create(batch)
+            self.counts['events'] += len(batch)
+
+        self.counts['therapists'] += len(therapists)
+        self.counts['parents'] += len(parents)
+        self.counts['children'] += len(children)
+        self.counts['users'] += len(therapists) + len(parents)
+
+    def _assignments(self, child_rows):
+        for child_id, therapist_id in child_rows:
+            if therapist_id is None:
+                continue
+            count = self._assignments_per_child()
+            if self.realistic:
+                task_ids = self.rng.choices(self.task_ids, cum_weights=self.task_cum_weights, k=count)
+            else:
+                task_ids = [self.task_ids[i % len(self.task_ids)] for i in range(count)]
+
+            for task_id in task_ids:
+                age_days = self.rng.randint(0, self.days) if self.realistic else 0
+                assigned = self.now - timedelta(days=age_days, minutes=self.rng.randint(0, 600))
+                due_date = None
+                if self.rng.random() < 0.7:
+                    due_date = (assigned + timedelta(days=self.rng.randint(7, 28))).date()
+                # Older assignments are much more likely to have been completed
+                completed = self.rng.random() < min(0.9, 0.15 + age_days / 60)
+                yield Assignment(
+                    child_id=child_id, therapist_id=therapist_id, task_id=task_id,
+                    assigned_date=assigned, due_date=due_date, completed=completed,
+                )
+
+    def _events(self, clinic_id, assignment_rows):
+        for assignment_id, child_id, therapist_id, task_id, speech_area_id, assigned, completed in assignment_rows:
+            ids = dict(
+                assignment_id=assignment_id, child_id=child_id, therapist_id=therapist_id, task_id=task_id,
+                clinic_id=clinic_id, speech_area_id=speech_area_id,
+            )
+            yield AssignmentEvent(kind=AssignmentEvent.ASSIGNED, created_at=assigned, **ids)
+            if completed:
+                done = min(self.now, assigned + timedelta(days=self.rng.randint(1, 14), hours=self.rng.randint(0, 12)))
+                yield AssignmentEvent(kind=AssignmentEvent.STARTED, created_at=assigned + (done - assigned) / 2, **ids)
+                yield AssignmentEvent(kind=AssignmentEvent.COMPLETED, created_at=done, **ids)
+
+
+def delete_synthetic_data():
+    """Remove everything created by previous generator runs"""
+    clinics = Clinic.objects.filter(name__startswith=SYNTHETIC_CLINIC_PREFIX)
+    # Events and rollups have no foreign keys, so they don't cascade with the clinics
+    AssignmentEvent.objects.filter(clinic_id__in=clinics.values('id')).delete()
+    DailyRollup.objects.filter(clinic_id__in=clinics.values('id')).delete()
+    deleted, _ = clinics.delete()
+    users, _ = User.objects.filter(email__endswith=f'@{SYNTHETIC_DOMAIN}').delete()
+    return deleted + users
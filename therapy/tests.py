@@ -1,3 +1,327 @@
-from django.test import TestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
 
-# Create your tests here.
+from . import hierarchy
+from .catalog_import import CatalogImportError, import_catalog
+from .models import SpeechArea, LongTermGoal, ShortTermGoal, Task, Assignment, AssignmentEvent
+from .services import assign_tasks_to_child
+from .text import TITLE_KEY_LENGTH, title_key
+
+
+def build_catalog():
+    area = SpeechArea.objects.create(name='Articulation')
+    ltg = LongTermGoal.objects.create(speech_area=area, title='Produce /s/')
+    stg = ShortTermGoal.objects.create(long_term_goal=ltg, title='Initial position')
+    task = Task.objects.create(short_term_goal=stg, title='Say "sun"')
+    return area, ltg, stg, task
+
+
+class TitleKeyTests(TestCase):
+    def test_ignores_case_punctuation_and_accents(self):
+        self.assertEqual(title_key('Follow 2-step  Directions.'), 'follow 2 step directions')
+        self.assertEqual(title_key('Zoë'), title_key('zoe'))
+
+    def test_keeps_non_latin_words(self):
+        self.assertEqual(title_key('Говорить слова'), 'говорить слова')
+        self.assertNotEqual(title_key('Говорить'), title_key('Слушать'))
+
+    def test_titles_without_words_key_as_written(self):
+        self.assertEqual(title_key('  ??? '), '???')
+        self.assertNotEqual(title_key('???'), title_key('!!!'))
+
+    def test_long_titles_differing_past_the_cut_keep_distinct_keys(self):
+        first, second = title_key('x' * 300 + 'a'), title_key('x' * 300 + 'b')
+        self.assertEqual(len(first), TITLE_KEY_LENGTH)
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, title_key('X' * 300 + 'A'))
+
+
+class SearchIndexMigrationTests(TransactionTestCase):
+    """therapy 0002 indexes the rows that existed before the search index"""
+    before = [('therapy', '0001_initial')]
+    after = [('therapy', '0002_search_term')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_rows_are_searchable(self):
+        Task = self.apps.get_model('therapy', 'Task')
+        TherapistProfile = self.apps.get_model('therapy', 'TherapistProfile')
+        task = Task.objects.create(title='Say "sun"', description='Initial /s/', is_active=False)
+        therapist = TherapistProfile.objects.create(
+            first_name='Zoë', last_name='Smith', email='zoe@example.com', phone_number='+1 (555) 123-4567'
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        SearchTerm = executor.loader.project_state(self.after).apps.get_model('therapy', 'SearchTerm')
+
+        self.assertEqual(
+            set(SearchTerm.objects.filter(kind='task').values_list('object_id', 'term', 'weight')),
+            {(task.id, 'say', 8), (task.id, 'sun', 8), (task.id, 'initial', 2), (task.id, 's', 2)},
+        )
+        terms = SearchTerm.objects.filter(kind='therapist', object_id=therapist.id)
+        self.assertEqual(terms.get(term='zoe').weight, 10)
+        self.assertTrue(terms.filter(term='15551234567', therapist_id=therapist.id).exists())
+
+
+class MergeDuplicatesMigrationTests(TransactionTestCase):
+    """therapy 0003 fills title_key and merges duplicate siblings"""
+    before = [('therapy', '0002_search_term')]
+    after = [('therapy', '0003_catalog_title_key')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.apps = executor.loader.project_state(self.before).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        return executor.loader.project_state(self.after).apps
+
+    def test_merges_duplicates_and_keeps_distinct_titles(self):
+        SpeechArea = self.apps.get_model('therapy', 'SpeechArea')
+        LongTermGoal = self.apps.get_model('therapy', 'LongTermGoal')
+        ShortTermGoal = self.apps.get_model('therapy', 'ShortTermGoal')
+        Task = self.apps.get_model('therapy', 'Task')
+
+        area = SpeechArea.objects.create(name='Articulation')
+        duplicate_area = SpeechArea.objects.create(name='articulation.')
+        russian = SpeechArea.objects.create(name='Говорить')
+        other_russian = SpeechArea.objects.create(name='Слушать')
+        LongTermGoal.objects.create(speech_area=area, title='Goal')
+        moved = LongTermGoal.objects.create(speech_area=duplicate_area, title='Other goal')
+        stg = ShortTermGoal.objects.create(long_term_goal=moved, title='Short')
+        orphans = [Task.objects.create(short_term_goal=None, title=title) for title in ('Orphan', 'orphan')]
+        long_titles = [Task.objects.create(short_term_goal=stg, title='x' * 300 + end) for end in 'ab']
+        blank = [Task.objects.create(short_term_goal=stg, title='') for _ in range(2)]
+        Task.objects.create(short_term_goal=stg, title='Dup')
+        Task.objects.create(short_term_goal=stg, title='dup!')
+
+        apps = self.migrate()
+        SpeechArea = apps.get_model('therapy', 'SpeechArea')
+        LongTermGoal = apps.get_model('therapy', 'LongTermGoal')
+        Task = apps.get_model('therapy', 'Task')
+
+        self.assertEqual(
+            set(SpeechArea.objects.values_list('id', flat=True)), {area.id, russian.id, other_russian.id}
+        )
+        self.assertEqual(LongTermGoal.objects.get(id=moved.id).speech_area_id, area.id)
+        tasks = Task.objects.all()
+        for task in orphans + long_titles + blank:
+            self.assertTrue(tasks.filter(id=task.id).exists())
+        self.assertEqual(tasks.filter(title_key='dup').count(), 1)
+        self.assertEqual(
+            set(tasks.filter(id__in=[task.id for task in blank]).values_list('title_key', flat=True)),
+            {f'#{task.id}' for task in blank},
+        )
+
+    def short_term_goal(self):
+        area = self.apps.get_model('therapy', 'SpeechArea').objects.create(name='Articulation')
+        ltg = self.apps.get_model('therapy', 'LongTermGoal').objects.create(speech_area=area, title='Goal')
+        return self.apps.get_model('therapy', 'ShortTermGoal').objects.create(long_term_goal=ltg, title='Short')
+
+    def assignment_models(self):
+        Clinic = self.apps.get_model('clinic', 'Clinic')
+        clinic = Clinic.objects.create(name='North')
+        parent = self.apps.get_model('therapy', 'ParentProfile').objects.create(
+            first_name='Pat', last_name='Lee', clinic=clinic
+        )
+        child = self.apps.get_model('therapy', 'Child').objects.create(
+            name='Sam', age=5, gender='M', clinic=clinic, parent=parent
+        )
+        therapist = self.apps.get_model('therapy', 'TherapistProfile').objects.create(
+            first_name='Tess', last_name='Ray', email='tess@example.com', clinic=clinic
+        )
+        return self.apps.get_model('therapy', 'Assignment'), child, therapist
+
+    def test_merged_tasks_keep_their_description_and_assignments(self):
+        Task = self.apps.get_model('therapy', 'Task')
+        Assignment, child, therapist = self.assignment_models()
+        stg = self.short_term_goal()
+        kept = Task.objects.create(short_term_goal=stg, title='Say sun')
+        duplicate = Task.objects.create(short_term_goal=stg, title='say "sun"', description='Initial /s/')
+        assignment = Assignment.objects.create(child=child, therapist=therapist, task=duplicate)
+
+        Task = self.migrate().get_model('therapy', 'Task')
+
+        self.assertEqual(list(Task.objects.values_list('id', 'description')), [(kept.id, 'Initial /s/')])
+        self.assertEqual(Assignment.objects.get(id=assignment.id).task_id, kept.id)
+
+    def test_conflicting_duplicates_stop_the_migration_before_any_change(self):
+        Task = self.apps.get_model('therapy', 'Task')
+        Assignment, child, therapist = self.assignment_models()
+        stg = self.short_term_goal()
+        tasks = [Task.objects.create(short_term_goal=stg, title=title) for title in ('Say sun', 'say sun.')]
+        for task in tasks:
+            Assignment.objects.create(child=child, therapist=therapist, task=task)
+        Task.objects.create(short_term_goal=stg, title='Dup', description='One')
+        Task.objects.create(short_term_goal=stg, title='dup', description='Two')
+
+        with self.assertRaises(RuntimeError) as raised:
+            self.migrate()
+
+        message = str(raised.exception)
+        self.assertIn(f'child {child.id} has assignments', message)
+        self.assertIn('descriptions differ', message)
+        self.assertEqual(Task.objects.count(), 4)
+        with connection.cursor() as cursor:
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, 'therapy_task')]
+        self.assertNotIn('title_key', columns)
+        # Merged by hand, so tearDown() can migrate forward
+        Task.objects.all().delete()
+
+
+class HierarchyTests(TestCase):
+    def setUp(self):
+        self.area, self.ltg, self.stg, self.task = build_catalog()
+
+    def test_paths_and_denormalized_parents(self):
+        self.assertEqual(self.task.path, ''.join(map(hierarchy.segment, [self.area.id, self.ltg.id, self.stg.id])))
+        self.assertEqual((self.task.speech_area_id, self.task.long_term_goal_id), (self.area.id, self.ltg.id))
+        self.assertEqual(
+            hierarchy.subtree_counts(self.area), {'longtermgoal': 1, 'shorttermgoal': 1, 'task': 1}
+        )
+
+    def test_moving_a_goal_moves_its_subtree(self):
+        other = SpeechArea.objects.create(name='Fluency')
+        self.ltg.speech_area = other
+        self.ltg.save()
+
+        self.task.refresh_from_db()
+        self.assertEqual(hierarchy.ancestor_ids(self.task.path), [other.id, self.ltg.id, self.stg.id])
+        self.assertEqual(self.task.speech_area_id, other.id)
+        self.assertEqual(hierarchy.subtree_counts(self.area), {'longtermgoal': 0, 'shorttermgoal': 0, 'task': 0})
+
+    def test_deactivate_takes_the_subtree(self):
+        sibling = SpeechArea.objects.create(name='Fluency')
+        result = self.ltg.deactivate()
+
+        self.assertEqual(result, {'longtermgoal': 1, 'shorttermgoal': 1, 'task': 1})
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+        self.assertTrue(Task.all_objects.filter(pk=self.task.pk).exists())
+        self.assertTrue(SpeechArea.objects.filter(pk=sibling.pk).exists())
+
+    def test_saving_a_node_inactive_takes_the_subtree(self):
+        area = SpeechArea.objects.get(pk=self.area.pk)
+        area.is_active = False
+        area.save()
+
+        self.assertFalse(ShortTermGoal.objects.filter(pk=self.stg.pk).exists())
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+
+
+class CatalogImportTests(TestCase):
+    document = {'speech_areas': [{
+        'name': 'Articulation',
+        'long_term_goals': [{
+            'title': 'Produce /s/',
+            'short_term_goals': [{
+                'title': 'Initial position',
+                'tasks': [
+                    {'title': 'Say "sun"', 'difficulty': 'beginner'},
+                    {'title': 'Say "sock"', 'difficulty': 'intermediate'},
+                ],
+            }],
+        }],
+    }]}
+
+    def test_import_creates_the_tree(self):
+        result = import_catalog(self.document)
+
+        self.assertEqual(result['tasks']['created'], 2)
+        task = Task.objects.get(title='Say "sock"')
+        self.assertEqual(task.difficulty, 'intermediate')
+        self.assertEqual(task.speech_area.name, 'Articulation')
+        self.assertEqual(hierarchy.ancestor_ids(task.path)[-1], task.short_term_goal_id)
+
+    def test_reimport_matches_by_normalized_title(self):
+        area, ltg, stg, task = build_catalog()
+        document = {'speech_areas': [{'name': 'ARTICULATION', 'long_term_goals': [{
+            'title': 'produce s', 'short_term_goals': [{'title': 'Initial position', 'tasks': [
+                {'title': 'say sun', 'difficulty': 'advanced'},
+            ]}],
+        }]}]}
+
+        result = import_catalog(document)
+
+        self.assertEqual(result['tasks'], {'created': 0, 'updated': 1, 'unchanged': 0, 'deactivated': 0})
+        self.assertEqual(Task.all_objects.count(), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.difficulty, 'advanced')
+
+    def test_deactivate_missing_and_inactive_nodes_take_their_subtrees(self):
+        import_catalog(self.document)
+        ShortTermGoal.objects.create(long_term_goal=LongTermGoal.objects.get(), title='Final position')
+        document = {'speech_areas': [{'name': 'Articulation', 'long_term_goals': [{
+            'title': 'Produce /s/', 'short_term_goals': [{'title': 'Initial position', 'is_active': False}],
+        }]}]}
+
+        result = import_catalog(document, deactivate_missing=True)
+
+        self.assertEqual(result['short_term_goals']['deactivated'], 3)
+        self.assertFalse(ShortTermGoal.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_invalid_documents_change_nothing(self):
+        document = {'speech_areas': [{'name': 'A'}, {'name': 'a.'}, {'name': ''}]}
+        with self.assertRaises(CatalogImportError) as raised:
+            import_catalog(document)
+        self.assertEqual(len(raised.exception.errors), 2)
+        self.assertFalse(SpeechArea.all_objects.exists())
+
+    def test_dry_run_rolls_back(self):
+        result = import_catalog(self.document, dry_run=True)
+        self.assertEqual(result['speech_areas']['created'], 1)
+        self.assertFalse(SpeechArea.all_objects.exists())
+
+
+class AssignTasksTests(TestCase):
+    def setUp(self):
+        from api.benchmark import build_fixtures
+        self.fixtures = build_fixtures(1, 1, 1, 1)
+
+    def test_creates_assignments_with_events_and_skips_existing(self):
+        child, therapist = self.fixtures.child, self.fixtures.therapist
+        Assignment.objects.filter(child=child).delete()
+        task_ids = list(Task.objects.values_list('id', flat=True)[:3])
+
+        created = assign_tasks_to_child(child, therapist, task_ids[:2] + task_ids[:1])
+        self.assertEqual([task.id for _, task in created], task_ids[:2])
+        created = assign_tasks_to_child(child, therapist, task_ids)
+        self.assertEqual([task.id for _, task in created], task_ids[2:])
+
+        assignments = Assignment.objects.filter(child=child, therapist=therapist)
+        self.assertEqual(assignments.count(), 3)
+        self.assertEqual(
+            AssignmentEvent.objects.filter(assignment_id__in=assignments.values('id'), kind=AssignmentEvent.ASSIGNED).count(), 3
+        )
+
+    def test_assignments_of_deactivated_tasks_stay_editable(self):
+        from api.serializers import AssignmentSerializer
+        from .admin import AssignmentForm
+
+        assignment = self.fixtures.assignment
+        assignment.task.deactivate()
+        data = {
+            'child': assignment.child_id, 'therapist': assignment.therapist_id, 'task': assignment.task_id,
+            'completed': True, 'notes': 'Done',
+        }
+
+        self.assertTrue(AssignmentForm(data, instance=assignment).is_valid())
+        serializer = AssignmentSerializer(assignment, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertFalse(AssignmentForm(data).is_valid())
+        self.assertFalse(AssignmentSerializer(data=data).is_valid())
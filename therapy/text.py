@@ -0,0 +1,33 @@
+"""Text normalization shared by the search index, typeahead and duplicate checks"""
+import hashlib
+import re
+import unicodedata
+
+# Letters and digits in any script
+WORD = re.compile(r'[^\W_]+')
+TITLE_KEY_LENGTH = 255
+
+
+def words(text):
+    """'Zoë O'Brien' -> ['zoe', 'o', 'brien']"""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    return WORD.findall(folded)
+
+
+def title_key(text):
+    """
+    Comparison key for catalog titles: 'Follow 2-step  Directions.' and
+    'follow 2 step directions' share the key 'follow 2 step directions'.
+
+    A title without letters or digits ('???') keys as written, casefolded.
+    Keys longer than the column end in a digest of the whole key, so titles
+    that differ only past the cut don't collide.
+    """
+    key = ' '.join(words(text)) or ' '.join(str(text or '').casefold().split())
+    if len(key) > TITLE_KEY_LENGTH:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        key = f'{key[:TITLE_KEY_LENGTH - len(digest) - 1]} {digest}'
+    return key
@@ -0,0 +1,184 @@
+"""
+Trigram typeahead over the active catalog titles.
+
+`TrigramIndex` turns every active long-term goal, short-term goal and task
+title into trigrams, padded the way pg_trgm pads words ("  ta", " tas",
+"ask", "sk "), except that the last query word is left open so partially
+typed words match. Each trigram's posting list is a bitset (a Python int
+with one bit per entry), and a query adds its trigrams' bitsets into
+bit-sliced counters. That gives, for every entry at once, how many query
+trigrams it contains, in a few dozen big-int operations rather than a loop
+over entries. Titles starting with the query come from a sorted list via
+bisect.
+
+Entries are numbered in tie-break order (tasks first, then shorter titles),
+so the lowest set bits of a match level are its best entries and only
+`limit` of them are ever materialized.
+
+The index is derived from the cached `Catalog` snapshot and is rebuilt
+with it whenever the catalog version changes.
+"""
+import bisect
+import math
+from collections import namedtuple
+
+from .catalog import get_catalog
+from .search import normalize_words
+
+KINDS = ('task', 'short_term_goal', 'long_term_goal')
+# Ties on similarity go to the level the wizard is usually looking for
+KIND_PRIORITY = {'task': 0, 'short_term_goal': 1, 'long_term_goal': 2}
+MIN_SIMILARITY = 0.5
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 100
+
+Entry = namedtuple('Entry', 'kind id title text speech_area_id long_term_goal_id short_term_goal_id difficulty')
+
+
+def trigrams(words, prefix=False):
+    """Padded trigrams of `words`; with `prefix`, the last word is left open-ended"""
+    grams = set()
+    for position, word in enumerate(words):
+        padded = f'  {word}' if prefix and position == len(words) - 1 else f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _bitset(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _lowest_bits(bitset, count):
+    """Positions of the `count` lowest set bits"""
+    positions = []
+    while bitset and len(positions) < count:
+        lowest = bitset & -bitset
+        positions.append(lowest.bit_length() - 1)
+        bitset ^= lowest
+    return positions
+
+
+class TrigramIndex:
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda entry: (KIND_PRIORITY[entry.kind], len(entry.text), entry.id))
+        size = len(self.entries)
+        self.all = (1 << size) - 1
+
+        postings, kinds, areas = {}, {}, {}
+        for position, entry in enumerate(self.entries):
+            for gram in trigrams(entry.text.split()):
+                postings.setdefault(gram, []).append(position)
+            kinds.setdefault(entry.kind, []).append(position)
+            areas.setdefault(entry.speech_area_id, []).append(position)
+        self.postings = {gram: _bitset(positions, size) for gram, positions in postings.items()}
+        self.kind_masks = {kind: _bitset(positions, size) for kind, positions in kinds.items()}
+        self.speech_area_masks = {area: _bitset(positions, size) for area, positions in areas.items()}
+        self.sorted_texts = sorted((entry.text, position) for position, entry in enumerate(self.entries))
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        entries = []
+
+        def add(kind, node, speech_area_id, long_term_goal_id, short_term_goal_id, difficulty=None):
+            words = normalize_words(node.title)
+            if words:
+                entries.append(Entry(
+                    kind, node.id, node.title, ' '.join(words),
+                    speech_area_id, long_term_goal_id, short_term_goal_id, difficulty,
+                ))
+
+        for goal in catalog.long_term_goals.values():
+            add('long_term_goal', goal, goal.speech_area_id, goal.id, None)
+        for goal in catalog.short_term_goals.values():
+            parent = catalog.long_term_goals.get(goal.long_term_goal_id)
+            add('short_term_goal', goal, parent.speech_area_id if parent else None, goal.long_term_goal_id, goal.id)
+        for task in catalog.tasks.values():
+            speech_area_id, long_term_goal_id = catalog.path(task)
+            add('task', task, speech_area_id, long_term_goal_id, task.short_term_goal_id, task.difficulty)
+        return cls(entries)
+
+    def _allowed(self, kinds, speech_area_id):
+        allowed = self.all
+        if kinds:
+            allowed = 0
+            for kind in kinds:
+                allowed |= self.kind_masks.get(kind, 0)
+        if speech_area_id is not None:
+            allowed &= self.speech_area_masks.get(speech_area_id, 0)
+        return allowed
+
+    def _prefix_matches(self, text, allowed, limit):
+        start = bisect.bisect_left(self.sorted_texts, (text,))
+        positions = []
+        for candidate, position in self.sorted_texts[start:]:
+            if not candidate.startswith(text):
+                break
+            if allowed >> position & 1:
+                positions.append(position)
+        return sorted(positions)[:limit]
+
+    def suggest(self, query, kinds=None, speech_area_id=None, limit=10):
+        """
+        Entries most similar to `query`, best first, as (score, entry) pairs.
+
+        Titles starting with the query rank first (score 1.5); the rest rank
+        by the share of the query's trigrams they contain, at least
+        MIN_SIMILARITY. Ties go to tasks, then shorter titles.
+        """
+        words = normalize_words(query[:MAX_QUERY_LENGTH])
+        text = ' '.join(words)
+        if len(text) < MIN_QUERY_LENGTH:
+            return []
+        allowed = self._allowed(kinds, speech_area_id)
+        if not allowed:
+            return []
+
+        results = [(1.5, position) for position in self._prefix_matches(text, allowed, limit)]
+        taken = _bitset([position for _, position in results], len(self.entries))
+
+        # counters[i] holds bit i of every entry's matched-trigram count
+        query_grams = trigrams(words, prefix=True)
+        counters = []
+        for gram in query_grams:
+            carry = self.postings.get(gram, 0) & allowed
+            level = 0
+            while carry:
+                if level == len(counters):
+                    counters.append(carry)
+                    break
+                counters[level], carry = counters[level] ^ carry, counters[level] & carry
+                level += 1
+
+        def at_least(threshold):
+            greater, equal = 0, self.all
+            for bit in range(max(len(counters), threshold.bit_length()) - 1, -1, -1):
+                counter = counters[bit] if bit < len(counters) else 0
+                if threshold >> bit & 1:
+                    equal &= counter
+                else:
+                    greater |= equal & counter
+                    equal &= ~counter
+            return greater | equal
+
+        total = len(query_grams)
+        needed = max(1, math.ceil(total * MIN_SIMILARITY))
+        above = 0
+        for count in range(total, needed - 1, -1):
+            if len(results) >= limit:
+                break
+            matched = at_least(count)
+            level = matched & ~above & ~taken
+            above = matched
+            results.extend(
+                (round(count / total, 4), position) for position in _lowest_bits(level, limit - len(results))
+            )
+
+        return [(score, self.entries[position]) for score, position in results]
+
+
+def suggest(query, kinds=None, speech_area_id=None, limit=10):
+    index = get_catalog().derived('typeahead', TrigramIndex.from_catalog)
+    return index.suggest(query, kinds=kinds, speech_area_id=speech_area_id, limit=limit)
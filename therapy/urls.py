@@ -1,14 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# The catalog lookups are served by async views in the ASGI deployment
+lookups = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('assign-task-wizard/', views.assign_task_wizard, name='assign_task_wizard'),
     path('select-client-for-assignment/', views.select_client_for_assignment, name='select_client_for_assignment'),
-    path('api/long-term-goals/', views.get_long_term_goals, name='get_long_term_goals'),
-    path('api/short-term-goals/', views.get_short_term_goals, name='get_short_term_goals'),
-    path('api/tasks/', views.get_tasks, name='get_tasks'),
+    path('api/long-term-goals/', lookups.get_long_term_goals, name='get_long_term_goals'),
+    path('api/short-term-goals/', lookups.get_short_term_goals, name='get_short_term_goals'),
+    path('api/tasks/', lookups.get_tasks, name='get_tasks'),
+    path('api/catalog-suggestions/', views.suggest_catalog_items, name='suggest_catalog_items'),
     path('api/assign-tasks/', views.assign_tasks, name='assign_tasks'),
-    path('api/speech-areas/', views.get_speech_areas, name='get_speech_areas'),
+    path('api/speech-areas/', lookups.get_speech_areas, name='get_speech_areas'),
     path('api/create-speech-area/', views.create_speech_area, name='create_speech_area'),
     path('api/create-long-term-goal/', views.create_long_term_goal, name='create_long_term_goal'),
     path('api/create-short-term-goal/', views.create_short_term_goal, name='create_short_term_goal'),
@@ -1,16 +1,52 @@
+import logging
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods, require_POST
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from django.utils.http import urlencode
 from .models import (
     ParentProfile, Child, SpeechArea, LongTermGoal,
-    ShortTermGoal, Task, Assignment, TherapistProfile
+    ShortTermGoal, Task, TherapistProfile
 )
+from .services import assign_tasks_to_child
+from .catalog import get_catalog
+from .duplicates import find_existing, similar_siblings
+from .typeahead import KINDS as SUGGESTION_KINDS, suggest
+from neuvii_backend.throttling import throttle
 import json
 
+logger = logging.getLogger(__name__)
+
+
+def _goal_json(goal):
+    return {'id': goal.id, 'title': goal.title, 'description': goal.description}
+
+
+def _goals_json(goals):
+    return [{'id': goal.id, 'title': goal.title} for goal in goals]
+
+
+def _tasks_json(tasks):
+    return [
+        {'id': task.id, 'title': task.title, 'description': task.description, 'difficulty': task.difficulty}
+        for task in tasks
+    ]
+
+
+def _speech_areas_json(speech_areas):
+    return [{'id': area.id, 'name': area.name, 'description': area.description} for area in speech_areas]
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 
 @login_required
 def assign_task_wizard(request):
@@ -82,12 +118,9 @@ def get_long_term_goals(request):
     if not speech_area_id:
         return JsonResponse({'goals': []})
 
-    goals = LongTermGoal.objects.filter(
-        speech_area_id=speech_area_id,
-        is_active=True
-    ).values('id', 'title')
+    goals = get_catalog().long_term_goals_for(_int_or_none(speech_area_id))
 
-    return JsonResponse({'goals': list(goals)})
+    return JsonResponse({'goals': _goals_json(goals)})
 
 
 @login_required
@@ -98,12 +131,9 @@ def get_short_term_goals(request):
     if not long_term_goal_id:
         return JsonResponse({'goals': []})
 
-    goals = ShortTermGoal.objects.filter(
-        long_term_goal_id=long_term_goal_id,
-        is_active=True
-    ).values('id', 'title')
+    goals = get_catalog().short_term_goals_for(_int_or_none(long_term_goal_id))
 
-    return JsonResponse({'goals': list(goals)})
+    return JsonResponse({'goals': _goals_json(goals)})
 
 
 @login_required
@@ -114,16 +144,49 @@ def get_tasks(request):
     if not short_term_goal_id:
         return JsonResponse({'tasks': []})
 
-    tasks = Task.objects.filter(
-        short_term_goal_id=short_term_goal_id,
-        is_active=True
-    ).values('id', 'title', 'description', 'difficulty')
+    tasks = get_catalog().tasks_for(_int_or_none(short_term_goal_id))
 
-    return JsonResponse({'tasks': list(tasks)})
+    return JsonResponse({'tasks': _tasks_json(tasks)})
+
+
+@login_required
+@require_http_methods(["GET"])
+def suggest_catalog_items(request):
+    """
+    AJAX typeahead for the wizard's "create or pick a task" step.
+
+    ?q=               text typed so far
+    ?type=            comma-separated: task, short_term_goal, long_term_goal
+    ?speech_area_id=  only suggest items under this speech area
+    ?limit=           number of suggestions (default 10, max 25)
+    """
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.get('type', '').split(',') if kind in SUGGESTION_KINDS]
+    limit = min(max(_int_or_none(request.GET.get('limit')) or 10, 1), 25)
+    if not query:
+        return JsonResponse({'suggestions': []})
+
+    suggestions = suggest(
+        query, kinds=kinds, speech_area_id=_int_or_none(request.GET.get('speech_area_id')), limit=limit
+    )
+    return JsonResponse({'suggestions': [
+        {
+            'type': entry.kind,
+            'id': entry.id,
+            'title': entry.title,
+            'score': score,
+            'speech_area_id': entry.speech_area_id,
+            'long_term_goal_id': entry.long_term_goal_id,
+            'short_term_goal_id': entry.short_term_goal_id,
+            'difficulty': entry.difficulty,
+        }
+        for score, entry in suggestions
+    ]})
 
 
 @login_required
 @require_http_methods(["POST"])
+@throttle('assign_tasks_user', key=lambda request: request.user.pk, json=True)
 def assign_tasks(request):
     """Process task assignment"""
     try:
@@ -148,7 +211,7 @@ def assign_tasks(request):
                 parent=parent,
                 assigned_therapist=parent.assigned_therapist
             )
-            print(f"Auto-created child record for client: {child.name}")
+            logger.info('Auto-created child %s for client %s', child.pk, parent.pk)
 
         # Get therapist
         therapist = TherapistProfile.objects.filter(email=request.user.email).first()
@@ -159,21 +222,14 @@ def assign_tasks(request):
         if not request.user.is_superuser and parent.assigned_therapist != therapist:
             return JsonResponse({'success': False, 'error': 'Permission denied'})
 
-        # Create assignments
-        assignments_created = 0
+        # Create assignments (existing ones are skipped)
         child_name = child.name
-        for task_id in selected_tasks:
-            task = get_object_or_404(Task, id=task_id)
-
-            # Check if assignment already exists
-            if not Assignment.objects.filter(child=child, task=task, therapist=therapist).exists():
-                Assignment.objects.create(
-                    child=child,
-                    task=task,
-                    therapist=therapist
-                )
-                assignments_created += 1
-                print(f"Created assignment: {task.title} for {child.name}")
+        created = assign_tasks_to_child(child, therapist, selected_tasks)
+        assignments_created = len(created)
+        logger.info(
+            'Assigned %d of %d selected tasks to child %s', assignments_created, len(selected_tasks), child.pk,
+            extra={'therapist_id': therapist.pk},
+        )
 
         return JsonResponse({
             'success': True,
@@ -183,7 +239,7 @@ def assign_tasks(request):
         })
 
     except Exception as e:
-        print(f"Error in assign_tasks: {e}")  # Debug logging
+        logger.exception('assign_tasks failed')
         return JsonResponse({'success': False, 'error': str(e)})
 
 
@@ -191,8 +247,54 @@ def assign_tasks(request):
 @require_http_methods(["GET"])
 def get_speech_areas(request):
     """AJAX endpoint to get all active speech areas"""
-    speech_areas = SpeechArea.objects.filter(is_active=True).values('id', 'name', 'description')
-    return JsonResponse({'speech_areas': list(speech_areas)})
+    speech_areas = get_catalog().speech_areas.values()
+    return JsonResponse({'speech_areas': _speech_areas_json(speech_areas)})
+
+
+def _create_catalog_node(request, model, parent, fields, siblings, serialize, response_key, noun):
+    """
+    Create a catalog row unless it duplicates one under the same parent.
+
+    An exact duplicate (same normalized title) is returned instead, and
+    reactivated if it had been deactivated. Near duplicates among the
+    siblings are returned as `similar` for the user to pick from, unless the
+    request sets allow_similar=1.
+    """
+    title = fields[model.title_source]
+    existing = find_existing(model, title, **parent)
+
+    if existing is None and request.POST.get('allow_similar') != '1':
+        similar = similar_siblings(title, siblings, attr=model.title_source)
+        if similar:
+            return JsonResponse({
+                'success': False,
+                'error': f'A similar {noun} already exists',
+                'similar': [
+                    {'id': node.id, 'title': getattr(node, model.title_source), 'similarity': similarity}
+                    for similarity, node in similar
+                ],
+            })
+
+    if existing is None:
+        try:
+            with transaction.atomic():
+                node = model.objects.create(**parent, **fields)
+            return JsonResponse({'success': True, 'created': True, response_key: serialize(node)})
+        except IntegrityError:
+            # Created concurrently by someone else
+            existing = find_existing(model, title, **parent)
+            if existing is None:
+                raise
+
+    if not existing.is_active:
+        existing.is_active = True
+        existing.save(update_fields=['is_active'])
+    return JsonResponse({
+        'success': True,
+        'created': False,
+        'message': f'This {noun} already exists; using the existing one',
+        response_key: serialize(existing),
+    })
 
 
 @login_required
@@ -206,24 +308,14 @@ def create_speech_area(request):
         if not name:
             return JsonResponse({'success': False, 'error': 'Name is required'})
 
-        # Check if speech area already exists
-        if SpeechArea.objects.filter(name__iexact=name).exists():
-            return JsonResponse({'success': False, 'error': 'Speech area with this name already exists'})
-
-        speech_area = SpeechArea.objects.create(
-            name=name,
-            description=description if description else None
+        return _create_catalog_node(
+            request, SpeechArea, {},
+            {'name': name, 'description': description if description else None},
+            siblings=get_catalog().speech_areas.values(),
+            serialize=lambda area: {'id': area.id, 'name': area.name, 'description': area.description},
+            response_key='speech_area', noun='speech area',
         )
 
-        return JsonResponse({
-            'success': True,
-            'speech_area': {
-                'id': speech_area.id,
-                'name': speech_area.name,
-                'description': speech_area.description
-            }
-        })
-
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
@@ -245,21 +337,13 @@ def create_long_term_goal(request):
 
         speech_area = get_object_or_404(SpeechArea, id=speech_area_id)
 
-        long_term_goal = LongTermGoal.objects.create(
-            speech_area=speech_area,
-            title=title,
-            description=description if description else None
+        return _create_catalog_node(
+            request, LongTermGoal, {'speech_area': speech_area},
+            {'title': title, 'description': description if description else None},
+            siblings=get_catalog().long_term_goals_for(speech_area.id),
+            serialize=_goal_json, response_key='goal', noun='long-term goal',
         )
 
-        return JsonResponse({
-            'success': True,
-            'goal': {
-                'id': long_term_goal.id,
-                'title': long_term_goal.title,
-                'description': long_term_goal.description
-            }
-        })
-
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
@@ -281,21 +365,13 @@ def create_short_term_goal(request):
 
         long_term_goal = get_object_or_404(LongTermGoal, id=long_term_goal_id)
 
-        short_term_goal = ShortTermGoal.objects.create(
-            long_term_goal=long_term_goal,
-            title=title,
-            description=description if description else None
+        return _create_catalog_node(
+            request, ShortTermGoal, {'long_term_goal': long_term_goal},
+            {'title': title, 'description': description if description else None},
+            siblings=get_catalog().short_term_goals_for(long_term_goal.id),
+            serialize=_goal_json, response_key='goal', noun='short-term goal',
         )
 
-        return JsonResponse({
-            'success': True,
-            'goal': {
-                'id': short_term_goal.id,
-                'title': short_term_goal.title,
-                'description': short_term_goal.description
-            }
-        })
-
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
@@ -324,22 +400,15 @@ def create_task(request):
 
         short_term_goal = get_object_or_404(ShortTermGoal, id=short_term_goal_id)
 
-        task = Task.objects.create(
-            short_term_goal=short_term_goal,
-            title=title,
-            description=description if description else None,
-            difficulty=difficulty
+        return _create_catalog_node(
+            request, Task, {'short_term_goal': short_term_goal},
+            {'title': title, 'description': description if description else None, 'difficulty': difficulty},
+            siblings=get_catalog().tasks_for(short_term_goal.id),
+            serialize=lambda task: {
+                'id': task.id, 'title': task.title, 'description': task.description, 'difficulty': task.difficulty
+            },
+            response_key='task', noun='task',
         )
 
-        return JsonResponse({
-            'success': True,
-            'task': {
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'difficulty': task.difficulty
-            }
-        })
-
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)})
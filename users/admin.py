@@ -1,12 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.contrib import admin
 from .models import User, Role
 from django import forms
 from neuvii_backend.admin_sites import neuvii_admin_site
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .utils import send_welcome_email
 
 admin.site.register(Role)
 
@@ -18,6 +18,7 @@ class CustomUserAdmin(UserAdmin):
     model = User
 
     list_display = ['id', 'email', 'get_full_name', 'role', 'is_active', 'password_reset_required', 'created_at']
+    list_select_related = ['role']
     list_filter = ['role', 'is_active', 'is_staff', 'is_superuser', 'password_reset_required', 'created_at']
     search_fields = ['email', 'first_name', 'last_name']
     ordering = ['id']
@@ -90,8 +91,8 @@ class CustomUserAdmin(UserAdmin):
             # Save the user first
             super().save_model(request, obj, form, change)
 
-            # Send email with temporary password
-            self.send_welcome_email(obj, temp_password)
+            # Queue the email with the temporary password
+            send_welcome_email(obj, temp_password)
 
             messages.success(
                 request,
@@ -100,45 +101,6 @@ class CustomUserAdmin(UserAdmin):
         else:
             super().save_model(request, obj, form, change)
 
-    def send_welcome_email(self, user, temp_password):
-        """Send welcome email with temporary password"""
-        subject = 'Welcome to Neuvii - Your Account Details'
-
-        # Create password reset link
-        reset_link = f"http://127.0.0.1:8000/auth/reset-password/?email={user.email}&temp_password={temp_password}"
-
-        message = f"""
-Welcome to Neuvii!
-
-Your account has been created successfully. Here are your login details:
-
-Email: {user.email}
-Temporary Password: {temp_password}
-
-Please click the link below to set your new password:
-{reset_link}
-
-Alternatively, you can login at: http://127.0.0.1:8000/auth/login/
-
-IMPORTANT: You will be required to change your password upon first login for security reasons.
-
-If you have any questions, please contact our support team.
-
-Best regards,
-Neuvii Team
-        """
-
-        try:
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Failed to send email: {e}")
-
 
 # Custom admin site titles
 admin.site.site_header = "Neuvii Administration"
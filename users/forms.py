@@ -1,6 +1,16 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import User, Role
+from .models import User, Role, canonicalize_email
+
+
+def validate_unique_email(email, instance=None):
+    """Refuse an address another account already has, ignoring case and whitespace"""
+    others = User.objects.filter(email_canonical=canonicalize_email(email))
+    if instance is not None and instance.pk is not None:
+        others = others.exclude(pk=instance.pk)
+    if others.exists():
+        raise forms.ValidationError('A user with this email already exists.')
+    return email
 
 
 class CustomUserCreationForm(forms.ModelForm):
@@ -40,6 +50,9 @@ class CustomUserCreationForm(forms.ModelForm):
         model = User
         fields = ('email', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser')
 
+    def clean_email(self):
+        return validate_unique_email(self.cleaned_data['email'])
+
     def save(self, commit=True):
         # Don't set a password here; admin's save_model() will handle it
         user = super().save(commit=False)
@@ -61,6 +74,12 @@ class CustomUserChangeForm(UserChangeForm):
         model = User
         fields = ('email', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser')
 
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if 'email' not in self.changed_data:
+            return email
+        return validate_unique_email(email, self.instance)
+
 
 class LoginForm(forms.Form):
     email = forms.EmailField(
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from the
+    PASSWORD_HASH_ITERATIONS setting.
+
+    It keeps the standard `pbkdf2_sha256` algorithm name, so existing hashes
+    verify unchanged. When a stored hash uses a different iteration count
+    (or a hasher further down PASSWORD_HASHERS), Django re-hashes the
+    password with this hasher on the user's next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,15 @@
+"""Background jobs for user accounts (see jobs.queue)"""
+from jobs.queue import register
+
+from .models import User
+from .utils import deliver_welcome_email
+
+
+@register('users.welcome_email', secret_args=('temp_password',))
+def welcome_email(user_id, temp_password, role_name=None):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        # Deleted before the email went out
+        return
+    deliver_welcome_email(user, temp_password, role_name)
+
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+import re
+
+from django.db import migrations, models
+
+
+def populate_email_canonical(apps, schema_editor):
+    """
+    Strip stray whitespace from stored emails and fill email_canonical.
+
+    When two accounts clean up to the same address, an account whose email
+    was already clean wins, then the oldest; the others keep their stored
+    email and no canonical value (so they are still reachable by exact email)
+    until an admin merges them.
+    """
+    User = apps.get_model('users', 'User')
+    whitespace = re.compile(r'\s+')
+
+    users = list(User.objects.only('id', 'email'))
+    users.sort(key=lambda user: (whitespace.sub('', user.email or '') != user.email, user.id))
+
+    taken_emails = {user.email for user in users}
+    taken_canonical = set()
+    batch = []
+    for user in users:
+        cleaned = whitespace.sub('', user.email or '')
+        canonical = cleaned.lower() or None
+        if canonical in taken_canonical:
+            continue
+        if cleaned != user.email and cleaned not in taken_emails:
+            taken_emails.discard(user.email)
+            taken_emails.add(cleaned)
+            user.email = cleaned
+        user.email_canonical = canonical
+        taken_canonical.add(canonical)
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ['email', 'email_canonical'])
+            batch = []
+    User.objects.bulk_update(batch, ['email', 'email_canonical'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_remove_duplicate_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_canonical',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(populate_email_canonical, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='email_canonical',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True, unique=True),
+        ),
+    ]
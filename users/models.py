@@ -1,9 +1,22 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.contrib.auth.base_user import BaseUserManager
+import re
 import secrets
 import string
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def clean_email(email):
+    """Strip whitespace (including stray newlines/tabs) anywhere in an address"""
+    return _WHITESPACE_RE.sub('', email or '')
+
+
+def canonicalize_email(email):
+    """Lookup key for an address: whitespace removed and lower-cased"""
+    return clean_email(email).lower() or None
+
 
 class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -12,7 +25,26 @@ class Role(models.Model):
         return self.name
 
 
-class CustomUserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def get_by_email(self, email):
+        """
+        The user for an address as typed, or None: the account stored with
+        exactly this email if there is one, else the one with its canonical
+        email. The exact match also finds accounts that migration 0007 left
+        without a canonical email because another account claimed it.
+        """
+        match = models.Q(email=email)
+        canonical = canonicalize_email(email)
+        if canonical:
+            match |= models.Q(email_canonical=canonical)
+        users = list(self.filter(match)[:2])
+        for user in users:
+            if user.email == email:
+                return user
+        return users[0] if users else None
+
+
+class CustomUserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
@@ -37,6 +69,8 @@ class CustomUserManager(BaseUserManager):
 class User(AbstractUser):
     username = None
     email = models.EmailField(unique=True)
+    # Normalized copy of `email` maintained by save(); look users up by this
+    email_canonical = models.CharField(max_length=254, unique=True, null=True, blank=True, editable=False)
     role = models.ForeignKey(Role, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     password_reset_required = models.BooleanField(default=True)
@@ -46,6 +80,23 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    def save(self, *args, **kwargs):
+        canonical = canonicalize_email(self.email)
+        if (
+            self.pk is not None and self.email_canonical is None and canonical
+            and User.objects.filter(email_canonical=canonical).exclude(pk=self.pk).exists()
+        ):
+            # Left without a canonical email by a collision (migration 0007);
+            # keep the stored email as is until an admin merges the accounts
+            canonical = None
+        else:
+            self.email = clean_email(self.email)
+        self.email_canonical = canonical
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'email_canonical'}
+        super().save(*args, **kwargs)
+
     def generate_temp_password(self):
         """Generate a temporary password for new users"""
         alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
@@ -1,3 +1,78 @@
-from django.test import TestCase
+from django.contrib.auth import authenticate
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from jobs.models import Job
+from .forms import CustomUserCreationForm
+from .models import Role, User
+from .utils import create_user_with_role
+
+
+class EmailLookupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(' Ann@Example.com\n', password='pass-123', first_name='Ann')
+        # An older account a collision left without a canonical email (migration 0007)
+        self.loser = User.objects.create_user('ann@example.org', password='other-123')
+        User.objects.filter(pk=self.loser.pk).update(email='ANN@example.com', email_canonical=None)
+        self.loser.refresh_from_db()
+
+    def test_save_cleans_and_canonicalizes(self):
+        self.assertEqual((self.user.email, self.user.email_canonical), ('Ann@example.com', 'ann@example.com'))
+
+    def test_exact_match_wins_over_the_canonical_one(self):
+        self.assertEqual(User.objects.get_by_email('ANN@example.com'), self.loser)
+        self.assertEqual(User.objects.get_by_email('ann@EXAMPLE.com'), self.user)
+        self.assertIsNone(User.objects.get_by_email('nobody@example.com'))
+
+    def test_both_accounts_can_log_in(self):
+        self.assertEqual(authenticate(username='ANN@example.com', password='other-123'), self.loser)
+        self.assertEqual(authenticate(username=' ann@example.COM', password='pass-123'), self.user)
+        self.assertIsNone(authenticate(username='ann@example.com', password='other-123'))
+
+    def test_collision_loser_keeps_no_canonical_email_until_it_is_free(self):
+        self.loser.first_name = 'Annie'
+        self.loser.save()
+        self.loser.refresh_from_db()
+        self.assertEqual((self.loser.email, self.loser.email_canonical), ('ANN@example.com', None))
+
+        self.user.delete()
+        self.loser.save()
+        self.loser.refresh_from_db()
+        self.assertEqual(self.loser.email_canonical, 'ann@example.com')
+
+    def test_creation_form_refuses_a_case_only_duplicate(self):
+        role = Role.objects.create(name='Parent')
+        form = CustomUserCreationForm(data={
+            'email': 'ANN@example.COM', 'first_name': 'A', 'last_name': 'B', 'role': role.pk,
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+
+
+@override_settings(JOBS_EAGER=False)
+class CreateUserWithRoleTests(TestCase):
+    def setUp(self):
+        self.therapist = Role.objects.create(name='Therapist')
+        self.parent = Role.objects.create(name='Parent')
+
+    def test_new_user_gets_permissions_and_a_queued_welcome_email(self):
+        user = create_user_with_role(' new@example.com ', 'New', 'User', 'therapist')
+
+        self.assertEqual((user.email, user.role, user.password_reset_required), ('new@example.com', self.therapist, True))
+        self.assertTrue(user.has_perm('therapy.add_assignment'))
+        job = Job.objects.get(name='users.welcome_email')
+        self.assertEqual((job.args['user_id'], job.args['role_name']), (user.pk, 'therapist'))
+
+    def test_existing_user_is_reused_with_the_new_role(self):
+        existing = User.objects.create_user('old@example.com', role=self.parent)
+
+        user = create_user_with_role('OLD@example.com', 'Old', 'User', 'therapist', send_credentials=False)
+
+        self.assertEqual(user, existing)
+        user = User.objects.get(pk=existing.pk)
+        self.assertEqual(user.role, self.therapist)
+        self.assertTrue(user.has_perm('therapy.add_assignment'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_role_creates_nothing(self):
+        self.assertIsNone(create_user_with_role('x@example.com', 'X', 'Y', 'janitor'))
+        self.assertFalse(User.objects.exists())
@@ -5,5 +5,6 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('reset-password/', views.reset_password_view, name='reset_password'),
+    path('reset-password/<uidb64>/<token>/', views.reset_password_view, name='reset_password_confirm'),
     path('change-password/', views.change_password_view, name='change_password'),
 ]
\ No newline at end of file
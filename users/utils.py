@@ -1,10 +1,21 @@
+import logging
+
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from jobs.queue import enqueue
+from neuvii_backend.metrics import EMAILS
 from .models import User, Role
 
+logger = logging.getLogger(__name__)
+
 
 def create_user_with_role(email, first_name, last_name, role_name, request=None, send_credentials=True):
     """
@@ -31,8 +42,8 @@ def create_user_with_role(email, first_name, last_name, role_name, request=None,
         return None
     
     # Check if user already exists
-    if User.objects.filter(email=email).exists():
-        existing_user = User.objects.get(email=email)
+    existing_user = User.objects.get_by_email(email)
+    if existing_user is not None:
         
         # Update role if different
         try:
@@ -62,7 +73,7 @@ def create_user_with_role(email, first_name, last_name, role_name, request=None,
                     f'User {existing_user.get_full_name()} already exists. New login credentials sent to {email}.'
                 )
             else:
-                print(f'New login credentials sent to existing user: {email}')
+                logger.info('New login credentials sent to existing user %s', existing_user.pk)
         else:
             if request:
                 messages.warning(
@@ -82,19 +93,28 @@ def create_user_with_role(email, first_name, last_name, role_name, request=None,
                 f'Role "{role_name}" does not exist. Please create this role first.'
             )
         else:
-            print(f'Error: Role "{role_name}" does not exist.')
+            logger.error('Role "%s" does not exist; user not created', role_name)
         return None
     
     # Create new user with staff permissions for admin access
-    user = User.objects.create(
-        email=email,
-        first_name=first_name,
-        last_name=last_name,
-        role=role,
-        is_active=True,
-        is_staff=True,  # Required for admin access
-        password_reset_required=True
-    )
+    try:
+        with transaction.atomic():
+            user = User.objects.create(
+                email=email,
+                first_name=first_name,
+                last_name=last_name,
+                role=role,
+                is_active=True,
+                is_staff=True,  # Required for admin access
+                password_reset_required=True
+            )
+    except IntegrityError:
+        # The address (in another case or spacing) was taken since the lookup above
+        if request:
+            messages.error(request, f'A user with email {email} already exists.')
+        else:
+            logger.error('A user with this email already exists; user not created')
+        return None
     
     # Generate temporary password
     temp_password = user.generate_temp_password()
@@ -112,7 +132,7 @@ def create_user_with_role(email, first_name, last_name, role_name, request=None,
             f'User {user.get_full_name()} ({email}) created successfully as {role_name}. Welcome email sent with temporary password.'
         )
     else:
-        print(f'User {user.get_full_name()} ({email}) created successfully as {role_name}. Welcome email sent.')
+        logger.info('User %s created as %s; welcome email sent', user.pk, role_name)
     
     return user
 
@@ -127,9 +147,6 @@ def assign_role_permissions(user, role_name):
     """
     role_name_lower = role_name.lower()
     
-    # Clear existing permissions
-    user.user_permissions.clear()
-    
     if role_name_lower == 'clinic admin':
         # Clinic Admin permissions - full access to clinic-related models
         permissions = [
@@ -186,44 +203,71 @@ def assign_role_permissions(user, role_name):
         # Default permissions for unknown roles
         permissions = ['clinic.view_clinic']
     
-    # Assign permissions to user
-    for perm_codename in permissions:
-        try:
-            app_label, codename = perm_codename.split('.')
-            permission = Permission.objects.get(
-                content_type__app_label=app_label,
-                codename=codename
-            )
-            user.user_permissions.add(permission)
-        except Permission.DoesNotExist:
-            print(f"Permission {perm_codename} does not exist")
-            continue
-    
-    print(f"Assigned {len(permissions)} permissions to {user.email} as {role_name}")
+    # One query for the permissions and one diff against the current ones
+    wanted = {tuple(name.split('.')) for name in permissions}
+    found = list(Permission.objects.filter(
+        content_type__app_label__in={app_label for app_label, _ in wanted},
+        codename__in={codename for _, codename in wanted},
+    ).values_list('id', 'content_type__app_label', 'codename'))
+    permission_ids = [pk for pk, app_label, codename in found if (app_label, codename) in wanted]
+    for app_label, codename in sorted(wanted - {(app_label, codename) for _, app_label, codename in found}):
+        logger.warning('Permission %s.%s does not exist', app_label, codename)
+    user.user_permissions.set(permission_ids)
 
+    logger.debug('Assigned %d permissions to user %s as %s', len(permissions), user.pk, role_name)
+
+
+def password_setup_link(user):
+    """
+    Absolute one-time link for `user` to set a password. The token is an HMAC
+    over the user's id, current password hash, last login and email, so it
+    stops working once the password changes or after PASSWORD_RESET_TIMEOUT.
+    """
+    path = reverse('reset_password_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    return f'{settings.SITE_URL}{path}'
+
+
+def user_from_setup_link(uidb64, token):
+    """The user a password link was issued for, or None if it is invalid or expired"""
+    try:
+        user_id = int(force_str(urlsafe_base64_decode(uidb64)))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    user = User.objects.select_related('role').filter(pk=user_id).first()
+    if user is None or not default_token_generator.check_token(user, token):
+        return None
+    return user
+
+
+def welcome_email(user, temp_password, role_name=None):
+    """Subject and body of the welcome email; without `role_name`, the generic admin-created variant"""
+    # Signed one-time link; the temporary password is never put in a URL
+    reset_link = password_setup_link(user)
+
+    if role_name:
+        subject = f'Welcome to Neuvii - Your {role_name.title()} Account'
+        created = f'Your {role_name} account has been created successfully.'
+        role_line = f'Role: {role_name.title()}\n'
+    else:
+        subject = 'Welcome to Neuvii - Your Account Details'
+        created = 'Your account has been created successfully.'
+        role_line = ''
 
-def send_welcome_email(user, temp_password, role_name):
-    """Send welcome email with temporary password"""
-    print(f"Attempting to send welcome email to: {user.email}")
-    
-    subject = f'Welcome to Neuvii - Your {role_name.title()} Account'
-    
-    # Create password reset link
-    reset_link = f"http://127.0.0.1:8000/auth/reset-password/?email={user.email}&temp_password={temp_password}"
-    
     message = f"""
 Welcome to Neuvii!
 
-Your {role_name} account has been created successfully. Here are your login details:
+{created} Here are your login details:
 
 Email: {user.email}
 Temporary Password: {temp_password}
-Role: {role_name.title()}
-
+{role_line}
 Please click the link below to set your new password:
 {reset_link}
 
-Alternatively, you can login at: http://127.0.0.1:8000/auth/login/
+Alternatively, you can login at: {settings.SITE_URL}/auth/login/
 
 IMPORTANT: You will be required to change your password upon first login for security reasons.
 
@@ -232,7 +276,23 @@ If you have any questions, please contact our support team.
 Best regards,
 Neuvii Team
     """
-    
+    return subject, message
+
+
+def send_welcome_email(user, temp_password, role_name=None):
+    """
+    Queue the welcome email with the temporary password; the job
+    (users.jobs.welcome_email) sends it after the current transaction
+    commits and retries if SMTP fails
+    """
+    enqueue('users.welcome_email', user_id=user.pk, temp_password=temp_password, role_name=role_name)
+    EMAILS.inc(kind='welcome', status='queued')
+    logger.debug('Queued welcome email to user %s', user.pk)
+
+
+def deliver_welcome_email(user, temp_password, role_name=None):
+    """Send the welcome email now; raises if SMTP fails"""
+    subject, message = welcome_email(user, temp_password, role_name)
     try:
         send_mail(
             subject,
@@ -241,12 +301,11 @@ Neuvii Team
             [user.email],
             fail_silently=False,
         )
-        print(f"Welcome email sent successfully to: {user.email}")
-    except Exception as e:
-        print(f"Failed to send email to {user.email}: {e}")
-        # Try to log more details about the error
-        import traceback
-        print(f"Full error traceback: {traceback.format_exc()}")
+    except Exception:
+        EMAILS.inc(kind='welcome', status='failed')
+        raise
+    EMAILS.inc(kind='welcome', status='sent')
+    logger.info('Welcome email sent to user %s', user.pk)
 
 
 def parse_contact_person_name(contact_person_name):
@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
@@ -8,10 +10,17 @@ from django.http import HttpResponseRedirect
 from django.urls import reverse
 from .forms import LoginForm, PasswordResetForm
 from .models import User
+from .utils import user_from_setup_link
+from neuvii_backend.metrics import LOGIN_ATTEMPTS
+from neuvii_backend.throttling import throttle, normalized_email
+
+logger = logging.getLogger(__name__)
 
 
 @csrf_protect
 @never_cache
+@throttle('login_ip')
+@throttle('login_email', key=lambda request: normalized_email(request.POST.get('email')))
 def login_view(request):
     """Custom login view that handles role-based redirection"""
     if request.user.is_authenticated:
@@ -27,6 +36,7 @@ def login_view(request):
             if user is not None:
                 if user.is_active:
                     login(request, user)
+                    LOGIN_ATTEMPTS.inc(channel='web', outcome='success')
 
                     # Check if password reset is required
                     if user.password_reset_required:
@@ -34,8 +44,10 @@ def login_view(request):
 
                     return redirect_to_dashboard(user)
                 else:
+                    LOGIN_ATTEMPTS.inc(channel='web', outcome='disabled')
                     messages.error(request, 'Your account is disabled.')
             else:
+                LOGIN_ATTEMPTS.inc(channel='web', outcome='invalid')
                 messages.error(request, 'Invalid email or password.')
     else:
         form = LoginForm()
@@ -69,12 +81,25 @@ def redirect_to_dashboard(user):
     return redirect(role_redirects.get(role_name, '/admin/'))
 
 
-def reset_password_view(request):
-    """View to handle password reset for new users"""
+@throttle('password_reset_ip')
+@throttle('password_reset_email', key=lambda request: normalized_email(
+    request.POST.get('email') or request.GET.get('email')
+))
+def reset_password_view(request, uidb64=None, token=None):
+    """
+    View to handle password reset for new users.
+
+    Welcome emails link to reset-password/<uidb64>/<token>/, checked with an
+    HMAC and one primary-key fetch. The older ?email=&temp_password= links
+    are still accepted until they have all been used.
+    """
     # Check if user is already logged in - redirect to change password instead
     if request.user.is_authenticated:
         return redirect('change_password')
-    
+
+    if uidb64 is not None:
+        return _reset_password_from_link(request, uidb64, token)
+
     # Always get email and temp_password from GET parameters first
     email = request.GET.get('email')
     temp_password = request.GET.get('temp_password')
@@ -96,14 +121,11 @@ def reset_password_view(request):
                 # Replace spaces with + signs and remove all whitespace characters
                 final_email = final_email.replace(' ', '+').replace('\n', '').replace('\r', '').replace('\t', '').strip()
 
-            # Debug logging
-            print(f"DEBUG: GET email: '{email}'")
-            print(f"DEBUG: GET temp_password: '{temp_password}'")
-            print(f"DEBUG: POST email: '{post_email}'")
-            print(f"DEBUG: POST temp_password: '{post_temp_password}'")
-            print(f"DEBUG: Final email: '{final_email}'")
-            print(f"DEBUG: Final temp_password: '{final_temp_password}'")
-            print(f"DEBUG: All POST data: {dict(request.POST)}")
+            # Never log the email/password values themselves
+            logger.debug(
+                'Password reset submitted',
+                extra={'email_from': 'post' if post_email else 'query', 'has_temp_password': bool(final_temp_password)},
+            )
 
             if not final_email:
                 messages.error(request, 'Email parameter is missing.')
@@ -113,56 +135,25 @@ def reset_password_view(request):
                     'temp_password': temp_password
                 })
 
-            try:
-                user = User.objects.get(email=final_email)
-                print(f"DEBUG: Found user: {user.email}")
-                # Verify temp password
-                if user.check_password(final_temp_password):
-                    user.set_password(new_password)
-                    user.password_reset_required = False
-                    user.save()
-
-                    # Auto login user
-                    login(request, user)
-                    messages.success(request, 'Password changed successfully!')
-                    return redirect_to_dashboard(user)
-                else:
-                    messages.error(request, 'Invalid temporary password.')
-            except User.DoesNotExist:
-                # Try to find user with corrupted email (contains newlines/whitespace)
-                try:
-                    # Remove common email prefixes and search by partial match
-                    email_base = final_email.replace('+', '').split('@')[0] if '@' in final_email else final_email
-                    users_with_similar_email = User.objects.filter(email__icontains=email_base)
-                    
-                    print(f"DEBUG: Looking for users with email containing: '{email_base}'")
-                    for u in users_with_similar_email:
-                        clean_db_email = u.email.replace('\n', '').replace('\r', '').replace('\t', '').strip()
-                        print(f"DEBUG: Checking user {u.id}: original='{u.email}', cleaned='{clean_db_email}'")
-                        if clean_db_email == final_email:
-                            print(f"DEBUG: Found matching user after cleaning: {u.email}")
-                            user = u
-                            # Verify temp password
-                            if user.check_password(final_temp_password):
-                                user.set_password(new_password)
-                                user.password_reset_required = False
-                                user.save()
-
-                                # Auto login user
-                                login(request, user)
-                                messages.success(request, 'Password changed successfully!')
-                                return redirect_to_dashboard(user)
-                            else:
-                                messages.error(request, 'Invalid temporary password.')
-                            break
-                    else:
-                        print(f"DEBUG: No matching user found even with partial search")
-                        messages.error(request, f'User not found with email: {final_email}')
-                except Exception as e:
-                    print(f"DEBUG: Error in partial search: {e}")
-                    messages.error(request, f'User not found with email: {final_email}')
+            # One indexed lookup; stored emails are normalized on save
+            user = User.objects.get_by_email(final_email)
+            if user is None:
+                logger.info('Password reset for an unknown email')
+                messages.error(request, f'User not found with email: {final_email}')
+            elif user.check_password(final_temp_password):
+                logger.debug('Password reset for user %s', user.pk)
+                user.set_password(new_password)
+                user.password_reset_required = False
+                user.save()
+
+                # Auto login user
+                login(request, user)
+                messages.success(request, 'Password changed successfully!')
+                return redirect_to_dashboard(user)
+            else:
+                messages.error(request, 'Invalid temporary password.')
         else:
-            print(f"DEBUG: Form is not valid. Errors: {form.errors}")
+            logger.debug('Password reset form invalid', extra={'fields': sorted(form.errors)})
     else:
         form = PasswordResetForm()
 
@@ -173,6 +164,32 @@ def reset_password_view(request):
     })
 
 
+def _reset_password_from_link(request, uidb64, token):
+    user = user_from_setup_link(uidb64, token)
+    if user is None:
+        logger.info('Password reset with an invalid or expired link')
+        messages.error(request, 'This password link is invalid or has expired. Please ask your administrator for a new one.')
+        return redirect('login')
+
+    if request.method == 'POST':
+        form = PasswordResetForm(request.POST)
+        if form.is_valid():
+            logger.debug('Password reset for user %s', user.pk)
+            # Changing the password hash also invalidates the link
+            user.set_password(form.cleaned_data['new_password'])
+            user.password_reset_required = False
+            user.save()
+
+            login(request, user)
+            messages.success(request, 'Password changed successfully!')
+            return redirect_to_dashboard(user)
+        logger.debug('Password reset form invalid', extra={'fields': sorted(form.errors)})
+    else:
+        form = PasswordResetForm()
+
+    return render(request, 'auth/reset_password.html', {'form': form, 'email': user.email})
+
+
 @login_required
 def change_password_view(request):
     """View for users to change password after login"""